@@ -0,0 +1,13 @@
+"""
+Benchmarks and load tests for the claim service.
+
+Every benchmark runs against a throwaway SQLite database and an in-process fake
+Redis unless `DATABASE_URL`/`--url` point it elsewhere; see the README.
+"""
+import os
+import tempfile
+
+os.environ.setdefault(
+    'DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='claim-bench-'), 'claim.db')}"
+)
+os.environ.setdefault('REDIS_URL', 'redis://localhost:6379')
@@ -0,0 +1,74 @@
+"""
+Compare two benchmark reports, e.g. of the base and head commits of a change.
+
+Usage:
+    python -m benchmarks.compare base.json head.json [--threshold 0.1]
+
+Exits non-zero if any throughput dropped, or p95 latency grew, by more than the
+threshold.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional, Tuple
+
+
+def compare(base: dict, head: dict, threshold: float) -> Tuple[List[str], bool]:
+    """
+    Compare the throughput and p95 latency of the results both reports have.
+
+    Returns:
+        Tuple[List[str], bool]: a line per result, and whether any of them regressed
+    """
+    lines, regressed = [], False
+
+    for name in sorted(base['results'].keys() & head['results'].keys()):
+        before, after = base['results'][name], head['results'][name]
+        throughput = _change(before['throughput'], after['throughput'])
+        p95 = _change(before['latency_ms'].get('p95'), after['latency_ms'].get('p95'))
+
+        slower = (throughput is not None and throughput < -threshold) or (
+            p95 is not None and p95 > threshold
+        )
+        regressed = regressed or slower
+
+        lines.append(
+            f"{name:<28} throughput {before['throughput']:>12} -> {after['throughput']:>12} "
+            f"({_percent(throughput)})  p95 ms {before['latency_ms'].get('p95')} -> "
+            f"{after['latency_ms'].get('p95')} ({_percent(p95)}){'  REGRESSED' if slower else ''}"
+        )
+
+    return lines, regressed
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def _percent(change: Optional[float]) -> str:
+    return 'n/a' if change is None else f'{change:+.1%}'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare', description=__doc__)
+    parser.add_argument('base', help='the report to compare against')
+    parser.add_argument('head', help='the report of the change')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='tolerated relative change (default: 0.1)'
+    )
+    arguments = parser.parse_args(argv)
+
+    with open(arguments.base) as base, open(arguments.head) as head:
+        base, head = json.load(base), json.load(head)
+
+    print(f"{base['benchmark']}: {base.get('commit')} -> {head.get('commit')}")
+    lines, regressed = compare(base, head, arguments.threshold)
+    print('\n'.join(lines))
+
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Generate a synthetic CSV file of claims in the format accepted by `POST /claims`.
+
+Usage:
+    python -m benchmarks.generate claims.csv [--rows N] [--bad-ratio R] [--seed S]
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import IO, Iterator, List, Optional
+
+HEADER = [
+    'service date',
+    'submitted procedure',
+    'quadrant',
+    'Plan/Group #',
+    'Subscriber#',
+    'Provider NPI',
+    'provider fees',
+    'Allowed fees',
+    'member coinsurance',
+    'member copay',
+]
+
+# common CDT codes, roughly ordered from most to least frequently billed
+PROCEDURES = [
+    'D1110', 'D0120', 'D0274', 'D0150', 'D0140', 'D0220', 'D0210', 'D0330', 'D1120', 'D1206',
+    'D2330', 'D2391', 'D2140', 'D2150', 'D4341', 'D4342', 'D4346', 'D4910', 'D0180', 'D4211',
+    'D2740', 'D2750', 'D3310', 'D7140', 'D7210',
+]
+QUADRANTS = ['UR', 'UL', 'LR', 'LL']
+COPAYS = [0, 0, 0, 10, 20, 25, 50]
+START_DATE = datetime(2018, 1, 1)
+DATE_RANGE_MINUTES = 7 * 365 * 24 * 60
+
+# the ways a bad row is broken, mirroring the checks `ClaimModel` makes
+BAD_ROW_KINDS = ['npi', 'procedure', 'negative_fee', 'service_date', 'currency', 'missing']
+
+
+def npi_check_digit(identifier: str) -> int:
+    """
+    The Luhn check digit of a 9 digit NPI identifier, including the `80840` prefix.
+    """
+    total = 0
+    for position, digit in enumerate(reversed('80840' + identifier)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            value = value - 9 if value > 9 else value
+        total += value
+
+    return (10 - total % 10) % 10
+
+
+def random_npi(rng: random.Random) -> str:
+    identifier = str(rng.choice('12')) + ''.join(rng.choices('0123456789', k=8))
+    return identifier + str(npi_check_digit(identifier))
+
+
+def money(cents: int) -> str:
+    # NOTE: formatted like the exports we receive, e.g. `$100.00 `
+    sign = '-' if cents < 0 else ''
+    return f'{sign}${abs(cents) // 100}.{abs(cents) % 100:02d} '
+
+
+def service_date(moment: datetime) -> str:
+    return f'{moment.month}/{moment.day}/{moment.year % 100:02d} {moment.hour}:{moment.minute:02d}'
+
+
+def generate_claims(
+    rows: int, bad_ratio: float = 0.0, seed: Optional[int] = None, providers: Optional[int] = None
+) -> Iterator[List[str]]:
+    """
+    Generate realistic claim rows.
+
+    Providers and procedures follow skewed distributions so the `/providers`
+    leaderboard and the query indexes see realistic cardinalities.
+
+    Arguments:
+        rows (int): the number of rows to generate
+        bad_ratio (float): the share of rows that fail validation, between 0 and 1
+        seed (int): seeds the generator, for reproducible files
+        providers (int): the number of distinct providers; defaults to one per 1000 rows
+
+    Returns:
+        Iterator[List[str]]: the CSV values of each row, in `HEADER` order
+    """
+    rng = random.Random(seed)
+    npis = [random_npi(rng) for _ in range(providers or max(rows // 1000, 10))]
+    provider_weights = [1 / rank for rank in range(1, len(npis) + 1)]
+    procedure_weights = [1 / rank for rank in range(1, len(PROCEDURES) + 1)]
+
+    for _ in range(rows):
+        provider_fees = rng.randrange(5000, 200000, 100)
+        allowed_fees = provider_fees - rng.randrange(0, provider_fees // 2 + 1, 100)
+        coinsurance = allowed_fees * rng.choice([0, 0, 10, 20, 50]) // 100
+
+        row = [
+            service_date(START_DATE + timedelta(minutes=rng.randrange(DATE_RANGE_MINUTES))),
+            rng.choices(PROCEDURES, weights=procedure_weights)[0],
+            rng.choice(QUADRANTS) if rng.random() < 0.2 else '',
+            f'GRP-{rng.randrange(1000, 2000)}',
+            ''.join(rng.choices('0123456789', k=10)),
+            rng.choices(npis, weights=provider_weights)[0],
+            money(provider_fees),
+            money(allowed_fees),
+            money(coinsurance),
+            money(rng.choice(COPAYS) * 100),
+        ]
+
+        if rng.random() < bad_ratio:
+            _break_row(row, rng.choice(BAD_ROW_KINDS))
+
+        yield row
+
+
+def _break_row(row: List[str], kind: str):
+    if kind == 'npi':
+        row[5] = row[5][:9]
+    elif kind == 'procedure':
+        row[1] = 'X' + row[1][1:]
+    elif kind == 'negative_fee':
+        row[7] = '-' + row[7]
+    elif kind == 'service_date':
+        row[0] = '13/45/18 0:00'
+    elif kind == 'currency':
+        row[6] = 'n/a'
+    elif kind == 'missing':
+        row[8] = ''
+
+
+def write_claims(csv_file: IO, rows: int, **options) -> int:
+    """
+    Write generated claims as CSV, including the header.
+
+    Arguments:
+        csv_file (IO): the text file to write to
+        rows (int): the number of rows to generate
+        **options: passed to `generate_claims`
+
+    Returns:
+        int: the number of rows written
+    """
+    writer = csv.writer(csv_file, lineterminator='\n')
+    writer.writerow(HEADER)
+
+    written = 0
+    for row in generate_claims(rows, **options):
+        writer.writerow(row)
+        written += 1
+
+    return written
+
+
+def claims_csv(rows: int, **options) -> bytes:
+    """
+    Generate claims as the content of an uploaded CSV file.
+    """
+    buffer = io.StringIO()
+    write_claims(buffer, rows, **options)
+    return buffer.getvalue().encode('utf-8')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generate', description=__doc__)
+    parser.add_argument('path', help='the CSV file to write, or - for stdout')
+    parser.add_argument('--rows', type=int, default=10000, help='number of rows (default: 10000)')
+    parser.add_argument(
+        '--bad-ratio', type=float, default=0.01, help='share of invalid rows (default: 0.01)'
+    )
+    parser.add_argument('--seed', type=int, default=None, help='seed, for reproducible files')
+    parser.add_argument('--providers', type=int, default=None, help='number of distinct providers')
+    arguments = parser.parse_args(argv)
+
+    options = {'bad_ratio': arguments.bad_ratio, 'seed': arguments.seed, 'providers': arguments.providers}
+
+    if arguments.path == '-':
+        write_claims(sys.stdout, arguments.rows, **options)
+    else:
+        with open(arguments.path, 'w', newline='', encoding='utf-8') as csv_file:
+            write_claims(csv_file, arguments.rows, **options)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
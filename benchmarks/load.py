@@ -0,0 +1,188 @@
+"""
+End-to-end load driver for `POST /claims`, `GET /claims/{claim_id}` and `GET /providers`.
+
+Usage:
+    python -m benchmarks.load [--url URL] [--requests N] [--concurrency N]
+                              [--mix post=1,get=8,providers=1] [--output results.json]
+
+Without `--url` the application is served in process against a throwaway SQLite
+database and a fake Redis, with the `/providers` rate limit disabled; with `--url`
+requests go to a running service, whose rate limit shows up as 429 responses.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from benchmarks.generate import claims_csv
+from benchmarks.report import build_report, status_counts, summarize, write_report
+
+OPERATIONS = ('post', 'get', 'providers')
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    Parse a request mix such as `post=1,get=8,providers=1` into operation weights.
+    """
+    weights = {}
+    for part in mix.split(','):
+        operation, _, weight = part.partition('=')
+        if operation not in OPERATIONS:
+            raise ValueError(f'Unknown operation {operation!r}; expected one of {OPERATIONS}')
+        weights[operation] = float(weight)
+
+    return weights
+
+
+@asynccontextmanager
+async def in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Serve the application in process, against the benchmark database and a fake Redis.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from fakeredis import FakeAsyncRedis
+
+    from src.cache import cache
+    from src.db import MIGRATIONS_DIRECTORY, dispose_engine
+    from src.main import app, providers_rate_limiter
+
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIRECTORY)
+    await asyncio.to_thread(command.upgrade, config, 'head')
+
+    # NOTE: the rate limiter isn't connected, and `/providers`' limit is lifted, so the
+    # benchmark measures the service rather than its limits
+    cache.connect(FakeAsyncRedis(decode_responses=True))
+    app.dependency_overrides[providers_rate_limiter] = lambda: None
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://claim-service') as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(providers_rate_limiter, None)
+        await dispose_engine()
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    requests: int,
+    concurrency: int,
+    weights: Dict[str, float],
+    seed_rows: int,
+    upload_rows: int,
+    bad_ratio: float,
+) -> dict:
+    """
+    Seed the service with claims, then send `requests` requests at `concurrency`.
+
+    Returns:
+        dict: per operation and overall throughput, latency percentiles and status codes
+    """
+    rng = random.Random(0)
+    uploads = iter(range(1, requests + 1))
+
+    response = await client.post(
+        '/claims', files={'csv_file': ('seed.csv', claims_csv(seed_rows, seed=0), 'text/csv')}
+    )
+    response.raise_for_status()
+
+    claim_ids = [
+        claim['id']
+        for claim in (await client.get('/claims', params={'limit': 1000})).json()['claims']
+    ]
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, List[int]] = defaultdict(list)
+    operations = rng.choices(list(weights), weights=list(weights.values()), k=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(operation: str):
+        if operation == 'post':
+            # NOTE: a distinct seed per upload, so the claims aren't skipped as duplicates
+            content = claims_csv(upload_rows, bad_ratio=bad_ratio, seed=next(uploads))
+            request = client.post(
+                '/claims', files={'csv_file': ('load.csv', content, 'text/csv')}
+            )
+        elif operation == 'get':
+            request = client.get(f'/claims/{rng.choice(claim_ids)}')
+        else:
+            request = client.get('/providers', params={'limit': rng.choice([5, 10, 25])})
+
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request
+            latencies[operation].append(time.perf_counter() - started)
+            statuses[operation].append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(operation) for operation in operations))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for operation in weights:
+        results[operation] = summarize(latencies[operation], elapsed)
+        results[operation]['status'] = status_counts(statuses[operation])
+        results[operation]['errors'] = sum(status >= 400 for status in statuses[operation])
+
+    overall = summarize([latency for values in latencies.values() for latency in values], elapsed)
+    overall['errors'] = sum(result['errors'] for result in results.values())
+    overall['elapsed_seconds'] = round(elapsed, 3)
+    results['all'] = overall
+
+    return results
+
+
+async def run(arguments: argparse.Namespace) -> dict:
+    weights = parse_mix(arguments.mix)
+    options = {
+        'requests': arguments.requests,
+        'concurrency': arguments.concurrency,
+        'weights': weights,
+        'seed_rows': arguments.seed_rows,
+        'upload_rows': arguments.upload_rows,
+        'bad_ratio': arguments.bad_ratio,
+    }
+
+    if arguments.url:
+        async with httpx.AsyncClient(base_url=arguments.url, timeout=arguments.timeout) as client:
+            return await run_load(client, **options)
+
+    async with in_process_client() as client:
+        return await run_load(client, **options)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description=__doc__)
+    parser.add_argument('--url', help='base URL of a running service (default: in process)')
+    parser.add_argument('--requests', type=int, default=1000, help='number of requests')
+    parser.add_argument('--concurrency', type=int, default=16, help='requests in flight')
+    parser.add_argument(
+        '--mix', default='post=1,get=8,providers=1', help='relative weight of each operation'
+    )
+    parser.add_argument('--seed-rows', type=int, default=10000, help='claims loaded up front')
+    parser.add_argument('--upload-rows', type=int, default=100, help='claims per POST /claims')
+    parser.add_argument('--bad-ratio', type=float, default=0.01, help='share of invalid rows')
+    parser.add_argument('--timeout', type=float, default=60, help='request timeout in seconds')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    arguments = parser.parse_args(argv)
+
+    results = asyncio.run(run(arguments))
+    parameters = {
+        name: getattr(arguments, name)
+        for name in ('url', 'requests', 'concurrency', 'mix', 'seed_rows', 'upload_rows', 'bad_ratio')
+    }
+    write_report(build_report('load', parameters, results), arguments.output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Micro-benchmarks of the ingest pipeline: CSV parsing, validation and persistence.
+
+Usage:
+    python -m benchmarks.micro [--rows N] [--repeat N] [--output results.json]
+
+Persistence is measured against a throwaway SQLite database, or `--database-url`;
+its claim tables are emptied between runs, so never point it at real data.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, delete
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.generate import claims_csv
+from benchmarks.report import build_report, summarize, write_report
+from common.utilities import iter_csv_rows, parse_csv_file_to_json
+from src.bulk import insert_claims
+from src.db import Base, build_engine
+from src.ingest import _next_validated_batch, ingest_claims, validate_claims
+from src.partitions import create_future_partitions
+from src.repo import Claim, ClaimDailyStats, OutboxEvent, ProviderStats
+from src.responses import dumps
+from src.validation import validate_claim_columns
+
+BENCHMARKS = [
+    'parse_csv_file_to_json',
+    'iter_csv_rows',
+    'validate_claims',
+    'validate_claim_columns',
+    'jsonable_encoder',
+    'orjson_dumps',
+    'insert_claims',
+    'ingest_claims',
+]
+
+
+async def measure(
+    run: Callable[[], Awaitable],
+    repeat: int,
+    units: int,
+    reset: Optional[Callable[[], Awaitable]] = None,
+) -> dict:
+    """
+    Time `run` `repeat` times, calling `reset` (untimed) before each run.
+    """
+    latencies = []
+    for _ in range(repeat):
+        if reset is not None:
+            await reset()
+
+        started = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - started)
+
+    return summarize(latencies, sum(latencies), units=units)
+
+
+async def run_benchmarks(
+    rows: int, repeat: int, bad_ratio: float, batch_size: int, database_url: str, names: List[str]
+) -> dict:
+    content = claims_csv(rows, bad_ratio=bad_ratio, seed=0)
+    numbered = list(enumerate(iter_csv_rows(io.BytesIO(content)), start=1))
+    batches = [numbered[start:start + batch_size] for start in range(0, rows, batch_size)]
+
+    def validated_records() -> List[dict]:
+        records = []
+        for batch in batches:
+            records.extend(_next_validated_batch(iter([batch]), validate_claim_columns)[2])
+        return records
+
+    sync_engine = create_engine(database_url)
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+
+    engine = build_engine(database_url)
+    session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    # NOTE: `create_all` leaves a partitioned `claim` without partitions on PostgreSQL
+    async with session() as db:
+        await create_future_partitions(db)
+        await db.commit()
+
+    async def reset():
+        async with session() as db:
+            for model in (OutboxEvent, ClaimDailyStats, ProviderStats, Claim):
+                await db.execute(delete(model))
+            await db.commit()
+
+    async def persist():
+        async with session() as db:
+            for start in range(0, len(records), batch_size):
+                await insert_claims(db, records[start:start + batch_size])
+            await db.commit()
+
+    async def ingest():
+        async with session() as db:
+            await ingest_claims(db, io.BytesIO(content), batch_size=batch_size)
+            await db.commit()
+
+    async def in_thread(function, *args):
+        await asyncio.to_thread(function, *args)
+
+    serialized = {'insert_claims', 'jsonable_encoder', 'orjson_dumps'}
+    records = validated_records() if serialized & set(names) else []
+    benchmarks = {
+        'parse_csv_file_to_json': (
+            lambda: in_thread(parse_csv_file_to_json, io.BytesIO(content)), None
+        ),
+        'iter_csv_rows': (lambda: in_thread(lambda: list(iter_csv_rows(io.BytesIO(content)))), None),
+        'validate_claims': (
+            lambda: in_thread(lambda: [validate_claims(batch) for batch in batches]), None
+        ),
+        'validate_claim_columns': (
+            lambda: in_thread(lambda: [validate_claim_columns(batch) for batch in batches]), None
+        ),
+        # NOTE: FastAPI's default response encoding, against the orjson fast path
+        'jsonable_encoder': (
+            lambda: in_thread(lambda: json.dumps(jsonable_encoder(records)).encode()), None
+        ),
+        'orjson_dumps': (lambda: in_thread(dumps, records), None),
+        'insert_claims': (persist, reset),
+        'ingest_claims': (ingest, reset),
+    }
+
+    try:
+        return {
+            name: await measure(benchmarks[name][0], repeat, rows, benchmarks[name][1])
+            for name in names
+        }
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.micro', description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000, help='rows per run (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark (default: 5)')
+    parser.add_argument('--bad-ratio', type=float, default=0.01, help='share of invalid rows')
+    parser.add_argument('--batch-size', type=int, default=1000, help='ingest batch size')
+    parser.add_argument(
+        '--database-url',
+        default=f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='claim-bench-'), 'micro.db')}",
+        help='database the persistence benchmarks write to (default: a temporary SQLite file)',
+    )
+    parser.add_argument(
+        '--benchmark',
+        action='append',
+        choices=BENCHMARKS,
+        help='only run this benchmark; may be repeated (default: all)',
+    )
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    arguments = parser.parse_args(argv)
+
+    parameters = {
+        'rows': arguments.rows,
+        'repeat': arguments.repeat,
+        'bad_ratio': arguments.bad_ratio,
+        'batch_size': arguments.batch_size,
+    }
+    results = asyncio.run(
+        run_benchmarks(
+            arguments.rows,
+            arguments.repeat,
+            arguments.bad_ratio,
+            arguments.batch_size,
+            arguments.database_url,
+            arguments.benchmark or BENCHMARKS,
+        )
+    )
+    write_report(build_report('micro', parameters, results), arguments.output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import json
+import platform
+import subprocess
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+def summarize(latencies: Sequence[float], elapsed: float, units: int = 1) -> dict:
+    """
+    Summarize the timings of a benchmark.
+
+    Arguments:
+        latencies (Sequence[float]): the seconds each operation took
+        elapsed (float): the wall clock seconds the operations ran for
+        units (int): the number of units (e.g. rows) each operation processed
+
+    Returns:
+        dict: the operation count, the throughput in units per second, and the
+        latency percentiles in milliseconds
+    """
+    if not len(latencies):
+        return {'count': 0, 'throughput': 0.0, 'latency_ms': {}}
+
+    milliseconds = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+
+    return {
+        'count': len(milliseconds),
+        'throughput': round(len(milliseconds) * units / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(float(milliseconds.mean()), 3),
+            'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3),
+            'p99': round(float(p99), 3),
+            'max': round(float(milliseconds.max()), 3),
+        },
+    }
+
+
+def status_counts(statuses: Sequence[int]) -> Dict[str, int]:
+    return {str(status): count for status, count in sorted(Counter(statuses).items())}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(benchmark: str, parameters: dict, results: dict) -> dict:
+    """
+    Wrap benchmark results with the metadata needed to compare them across commits.
+    """
+    return {
+        'benchmark': benchmark,
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parameters,
+        'results': results,
+    }
+
+
+def write_report(report: dict, path: Optional[str]):
+    """
+    Write a report as JSON to `path`, or to stdout if there's no path.
+    """
+    content = json.dumps(report, indent=2)
+
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content + '\n')
+    else:
+        sys.stdout.write(content + '\n')
@@ -1,5 +1,12 @@
 import csv
-from typing import IO, List
+import io
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, TypeVar
+
+T = TypeVar('T')
 
 
 def parse_csv_file_to_json(csv_file: IO) -> List[dict]:
@@ -28,3 +35,64 @@ def parse_csv_file_to_json(csv_file: IO) -> List[dict]:
 
     except Exception as error:
         raise ValueError(f'Error parsing CSV file: {str(error)}')
+
+
+def iter_csv_rows(csv_file: IO, encoding: str = 'utf-8') -> Iterator[dict]:
+    """
+    Lazily parse an uploaded CSV file, yielding one row at a time.
+
+    Unlike `parse_csv_file_to_json`, the file is decoded incrementally so only a
+    small read buffer is held in memory regardless of the size of the upload.
+
+    Arguments:
+        csv_file (IO): a binary or text file-like object containing CSV data
+        encoding (str): the text encoding used to decode binary content
+
+    Yields:
+        dict: the key-value pairs of a single CSV row, keyed by the header values
+
+    Raises:
+        ValueError: if the CSV content is invalid or can't be parsed
+    """
+    binary = not isinstance(csv_file, io.TextIOBase)
+    text_file = (
+        io.TextIOWrapper(csv_file, encoding=encoding, newline='') if binary else csv_file
+    )
+
+    try:
+        yield from csv.DictReader(text_file)
+
+    except (csv.Error, UnicodeDecodeError) as error:
+        raise ValueError(f'Error parsing CSV file: {str(error)}')
+
+    # NOTE: raised while reading a corrupt or truncated gzip or zip compressed file
+    except (EOFError, OSError, zlib.error, zipfile.BadZipFile) as error:
+        raise ValueError(f'Error decompressing CSV file: {str(error)}')
+
+    finally:
+        # NOTE: detach so the wrapper doesn't close the caller's file when collected
+        if binary:
+            text_file.detach()
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Split an iterable into lists of at most `size` items without materializing it.
+
+    Arguments:
+        iterable (Iterable): the items to split into batches
+        size (int): the maximum number of items in each batch
+
+    Yields:
+        List: the next batch of items
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def utcnow() -> datetime:
+    """
+    The current UTC time as a naive datetime, the way `DateTime` columns store it.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
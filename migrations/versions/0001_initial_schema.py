@@ -0,0 +1,49 @@
+"""
+Initial schema: the claim table and the provider_stats rollup.
+
+Databases created by the service's former `create_all` at startup already have these
+tables; mark them as migrated with `alembic stamp 0001` instead of upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'claim',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('allowed_fees', sa.Float(), nullable=False),
+        sa.Column('member_coinsurance', sa.Float(), nullable=False),
+        sa.Column('member_copay', sa.Float(), nullable=False),
+        sa.Column('net_fee', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('plan_group', sa.String(), nullable=False),
+        sa.Column('provider_fees', sa.Float(), nullable=False),
+        sa.Column('provider_npi', sa.String(), nullable=False),
+        sa.Column('quadrant', sa.String(), nullable=True),
+        sa.Column('service_date', sa.DateTime(), nullable=False),
+        sa.Column('submitted_procedure', sa.String(), nullable=False),
+        sa.Column('subscriber_number', sa.String(), nullable=False),
+    )
+    op.create_table(
+        'provider_stats',
+        sa.Column('provider_npi', sa.String(), primary_key=True),
+        sa.Column('claim_count', sa.Integer(), nullable=False),
+        sa.Column('total_net_fee', sa.Numeric(precision=16, scale=2), nullable=False),
+    )
+    op.create_index('ix_provider_stats_total_net_fee', 'provider_stats', ['total_net_fee'])
+
+
+def downgrade():
+    op.drop_index('ix_provider_stats_total_net_fee', table_name='provider_stats')
+    op.drop_table('provider_stats')
+    op.drop_table('claim')
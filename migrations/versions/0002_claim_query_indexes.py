@@ -0,0 +1,44 @@
+"""
+Index the claim columns used to filter and group queries.
+
+On PostgreSQL the indexes are built `CONCURRENTLY` so ingest isn't blocked while
+they're created on a large table.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_claim_provider_npi', ['provider_npi'], {'postgresql_include': ['net_fee']}),
+    ('ix_claim_subscriber_number_service_date', ['subscriber_number', 'service_date'], {}),
+    ('ix_claim_plan_group_service_date', ['plan_group', 'service_date'], {}),
+    ('ix_claim_service_date', ['service_date'], {}),
+]
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(
+                name,
+                'claim',
+                columns,
+                postgresql_concurrently=concurrently,
+                if_not_exists=True,
+                **options,
+            )
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='claim')
@@ -0,0 +1,31 @@
+"""
+Backfill the provider_stats rollup from existing claims.
+
+Claims ingested before the rollup existed aren't reflected in it, so `/providers`
+would come back empty on an upgraded database. Only an empty rollup is filled; use
+`python -m src.admin rebuild-provider-stats` to repair one that has drifted.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'INSERT INTO provider_stats (provider_npi, claim_count, total_net_fee) '
+        'SELECT provider_npi, COUNT(id), COALESCE(SUM(net_fee), 0) FROM claim '
+        'WHERE NOT EXISTS (SELECT 1 FROM provider_stats) '
+        'GROUP BY provider_npi'
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,50 @@
+"""
+Index the keyset `(service_date, id)` used to page through claim listings.
+
+The single column `service_date` index is replaced by `(service_date, id)`, and a
+`(provider_npi, service_date, id)` index serves a provider's claim history in order.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_claim_service_date_id', ['service_date', 'id']),
+    ('ix_claim_provider_npi_service_date_id', ['provider_npi', 'service_date', 'id']),
+]
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name,
+                'claim',
+                columns,
+                postgresql_concurrently=concurrently,
+                if_not_exists=True,
+            )
+
+        op.drop_index(
+            'ix_claim_service_date',
+            table_name='claim',
+            postgresql_concurrently=concurrently,
+            if_exists=True,
+        )
+
+
+def downgrade():
+    op.create_index('ix_claim_service_date', 'claim', ['service_date'])
+
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='claim')
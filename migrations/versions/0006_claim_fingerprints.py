@@ -0,0 +1,44 @@
+"""
+Fingerprint claims so resubmitted ones are skipped at ingest.
+
+Existing claims keep a NULL fingerprint, which the unique index doesn't compare;
+fill them in with `python -m src.admin backfill-fingerprints`.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('claim', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    op.add_column(
+        'ingest_job',
+        sa.Column('duplicates', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_claim_fingerprint',
+            'claim',
+            ['fingerprint'],
+            unique=True,
+            postgresql_concurrently=concurrently,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_claim_fingerprint', table_name='claim')
+    op.drop_column('ingest_job', 'duplicates')
+    op.drop_column('claim', 'fingerprint')
@@ -0,0 +1,61 @@
+"""
+The transactional outbox of claim events and its dead-letter table.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+EventId = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def upgrade():
+    op.create_table(
+        'outbox',
+        sa.Column('id', EventId, primary_key=True, autoincrement=True),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+    )
+    op.create_index(
+        'ix_outbox_pending',
+        'outbox',
+        ['id'],
+        postgresql_where=sa.text('published_at IS NULL'),
+        sqlite_where=sa.text('published_at IS NULL'),
+    )
+    op.create_index('ix_outbox_created_at', 'outbox', ['created_at'])
+
+    op.create_table(
+        'dead_letter',
+        sa.Column('id', EventId, primary_key=True, autoincrement=False),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('failed_at', sa.DateTime(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+    )
+    op.create_index('ix_dead_letter_created_at', 'dead_letter', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_dead_letter_created_at', table_name='dead_letter')
+    op.drop_table('dead_letter')
+    op.drop_index('ix_outbox_created_at', table_name='outbox')
+    op.drop_index('ix_outbox_pending', table_name='outbox')
+    op.drop_table('outbox')
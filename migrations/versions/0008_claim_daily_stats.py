@@ -0,0 +1,38 @@
+"""
+The claim_daily_stats rollup behind /analytics, backfilled from existing claims.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'claim_daily_stats',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('provider_npi', sa.String(), primary_key=True),
+        sa.Column('plan_group', sa.String(), primary_key=True),
+        sa.Column('submitted_procedure', sa.String(), primary_key=True),
+        sa.Column('claim_count', sa.Integer(), nullable=False),
+        sa.Column('total_net_fee', sa.Numeric(precision=16, scale=2), nullable=False),
+    )
+    op.execute(
+        'INSERT INTO claim_daily_stats '
+        '(day, provider_npi, plan_group, submitted_procedure, claim_count, total_net_fee) '
+        'SELECT date(service_date), provider_npi, plan_group, submitted_procedure, '
+        'COUNT(id), COALESCE(SUM(net_fee), 0) FROM claim '
+        'GROUP BY date(service_date), provider_npi, plan_group, submitted_procedure'
+    )
+
+
+def downgrade():
+    op.drop_table('claim_daily_stats')
@@ -0,0 +1,144 @@
+"""
+Partition the claim table by month of service_date on PostgreSQL.
+
+A table can't be partitioned in place, so `claim` is recreated, partitioned on
+PostgreSQL and plain on SQLite, and its rows copied over. Unique indexes of a
+partitioned table must include the partition key, so the primary key becomes
+`(id, service_date)` and the fingerprint index `(fingerprint, service_date)`.
+
+On PostgreSQL, a partition is created for every month with claims and for the next
+`CLAIM_PARTITION_PREMAKE` months, plus a default partition for any other date; later
+months are created by the service at startup and by `python -m src.admin create-partitions`.
+In offline mode (`alembic upgrade --sql`) the claims can't be read, so the script only
+creates the partitions of the current and coming months.
+The copy rewrites the whole table, so schedule the upgrade accordingly.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+"""
+import os
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+CLAIM_PARTITION_PREMAKE = int(os.environ.get('CLAIM_PARTITION_PREMAKE', 3))
+
+COLUMNS = [
+    'id',
+    'allowed_fees',
+    'member_coinsurance',
+    'member_copay',
+    'net_fee',
+    'plan_group',
+    'provider_fees',
+    'provider_npi',
+    'quadrant',
+    'service_date',
+    'submitted_procedure',
+    'subscriber_number',
+    'fingerprint',
+]
+
+
+def _indexes(fingerprint_columns):
+    return [
+        ('ix_claim_provider_npi', ['provider_npi'], {'postgresql_include': ['net_fee']}),
+        ('ix_claim_subscriber_number_service_date', ['subscriber_number', 'service_date'], {}),
+        ('ix_claim_plan_group_service_date', ['plan_group', 'service_date'], {}),
+        ('ix_claim_service_date_id', ['service_date', 'id'], {}),
+        ('ix_claim_provider_npi_service_date_id', ['provider_npi', 'service_date', 'id'], {}),
+        ('ix_claim_fingerprint', fingerprint_columns, {'unique': True}),
+    ]
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _recreate_claim(partitioned, primary_key, fingerprint_columns):
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    for name, _, _ in _indexes(['fingerprint']):
+        op.drop_index(name, table_name='claim')
+    op.rename_table('claim', 'claim_previous')
+    if postgresql:
+        op.execute('ALTER TABLE claim_previous RENAME CONSTRAINT claim_pkey TO claim_previous_pkey')
+
+    op.create_table(
+        'claim',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('allowed_fees', sa.Float(), nullable=False),
+        sa.Column('member_coinsurance', sa.Float(), nullable=False),
+        sa.Column('member_copay', sa.Float(), nullable=False),
+        sa.Column('net_fee', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('plan_group', sa.String(), nullable=False),
+        sa.Column('provider_fees', sa.Float(), nullable=False),
+        sa.Column('provider_npi', sa.String(), nullable=False),
+        sa.Column('quadrant', sa.String(), nullable=True),
+        sa.Column('service_date', sa.DateTime(), nullable=False),
+        sa.Column('submitted_procedure', sa.String(), nullable=False),
+        sa.Column('subscriber_number', sa.String(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=True),
+        sa.PrimaryKeyConstraint(*primary_key, name='claim_pkey' if postgresql else None),
+        **({'postgresql_partition_by': 'RANGE (service_date)'} if partitioned else {}),
+    )
+
+    if partitioned and postgresql:
+        _create_partitions()
+
+    # NOTE: the indexes are built after the copy rather than maintained row by row
+    columns = ', '.join(COLUMNS)
+    op.execute(f'INSERT INTO claim ({columns}) SELECT {columns} FROM claim_previous')
+    op.drop_table('claim_previous')
+
+    for name, columns, options in _indexes(fingerprint_columns):
+        op.create_index(name, 'claim', columns, **options)
+
+
+def _create_partitions():
+    if context.is_offline_mode():
+        # NOTE: the script can't read the claims' dates, so only the coming months are
+        # partitioned; claims of other months go to the default partition
+        first = last = None
+    else:
+        first, last = op.get_bind().execute(
+            sa.text('SELECT MIN(service_date), MAX(service_date) FROM claim_previous')
+        ).one()
+
+    today = datetime.now(timezone.utc).date()
+    month = date((first or today).year, (first or today).month, 1)
+    end = date(today.year, today.month, 1)
+    for _ in range(CLAIM_PARTITION_PREMAKE):
+        end = _next_month(end)
+    if last is not None:
+        end = max(end, date(last.year, last.month, 1))
+
+    while month <= end:
+        op.execute(
+            f'CREATE TABLE claim_y{month.year:04d}m{month.month:02d} PARTITION OF claim '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+
+    op.execute('CREATE TABLE claim_default PARTITION OF claim DEFAULT')
+
+
+def upgrade():
+    _recreate_claim(
+        partitioned=True,
+        primary_key=['id', 'service_date'],
+        fingerprint_columns=['fingerprint', 'service_date'],
+    )
+
+
+def downgrade():
+    # NOTE: fails if claims of different dates share an id or a fingerprint
+    _recreate_claim(partitioned=False, primary_key=['id'], fingerprint_columns=['fingerprint'])
@@ -0,0 +1,75 @@
+"""
+Store amounts of money as BIGINT cents.
+
+The fees of `claim` were floats and the net fees and rollup totals numerics; every
+amount becomes an integer number of cents, rounded half up, so sums are exact integer
+arithmetic. On PostgreSQL each table is rewritten once by its `ALTER TABLE`, which
+recurses into the partitions of `claim`; on SQLite the tables are recreated.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+# the amount columns of each table, with their type before the upgrade
+MONEY_COLUMNS = {
+    'claim': {
+        'allowed_fees': sa.Float(),
+        'member_coinsurance': sa.Float(),
+        'member_copay': sa.Float(),
+        'net_fee': sa.Numeric(precision=10, scale=2),
+        'provider_fees': sa.Float(),
+    },
+    'provider_stats': {'total_net_fee': sa.Numeric(precision=16, scale=2)},
+    'claim_daily_stats': {'total_net_fee': sa.Numeric(precision=16, scale=2)},
+}
+
+
+def _convert(to_cents):
+    bind = op.get_bind()
+
+    for table, columns in MONEY_COLUMNS.items():
+        if bind.dialect.name == 'postgresql':
+            alterations = [
+                f'ALTER COLUMN {name} TYPE BIGINT USING round({name}::numeric * 100)::bigint'
+                if to_cents
+                else f'ALTER COLUMN {name} TYPE {type_.compile(dialect=bind.dialect)} '
+                f'USING {name} / 100.0'
+                for name, type_ in columns.items()
+            ]
+            op.execute(f"ALTER TABLE {table} {', '.join(alterations)}")
+            continue
+
+        # NOTE: SQLite can't alter the type of a column, so the values are converted
+        # first and the table is then recreated with the new types
+        values = [
+            f'{name} = CAST(round({name} * 100) AS INTEGER)'
+            if to_cents
+            else f'{name} = {name} / 100.0'
+            for name in columns
+        ]
+        op.execute(f"UPDATE {table} SET {', '.join(values)}")
+
+        with op.batch_alter_table(table) as batch:
+            for name, type_ in columns.items():
+                batch.alter_column(
+                    name,
+                    existing_type=type_ if to_cents else sa.BigInteger(),
+                    type_=sa.BigInteger() if to_cents else type_,
+                )
+
+
+def upgrade():
+    _convert(to_cents=True)
+
+
+def downgrade():
+    _convert(to_cents=False)
@@ -0,0 +1,36 @@
+"""
+The ingest_batch table behind idempotent uploads to POST /claims.
+
+Each claim is linked to the upload that inserted it by `claim.ingest_batch_id`; on
+PostgreSQL, adding the nullable column only changes the catalog, so existing claims
+aren't rewritten.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingest_batch',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('content_sha256', sa.String(length=64), nullable=False),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.add_column('claim', sa.Column('ingest_batch_id', sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('claim') as batch:
+        batch.drop_column('ingest_batch_id')
+    op.drop_table('ingest_batch')
@@ -0,0 +1,272 @@
+"""
+Administrative commands for the claim service.
+
+Usage:
+    python -m src.admin rebuild-provider-stats [--check]
+    python -m src.admin backfill-fingerprints [--batch-size N]
+    python -m src.admin rebuild-daily-stats [--start YYYY-MM-DD --end YYYY-MM-DD]
+    python -m src.admin purge-outbox [--older-than-days N]
+    python -m src.admin create-partitions [--months N]
+    python -m src.admin purge-claims --before YYYY-MM-DD [--detach-only]
+    python -m src.admin export-claims --output PATH [--format parquet|arrow|csv] [filters]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from common.utilities import utcnow
+from src.analytics import month_windows, rebuild_daily_stats
+from src.cache import PROVIDERS_KEY, cache
+from src.db import session
+from src.export import EXPORT_FORMATS, export_claims
+from src.ingest import INGEST_BATCH_SIZE, backfill_fingerprints
+from src.logs import configure_logging, stop_logging
+from src.models import ClaimFilters
+from src.outbox import purge_published
+from src.partitions import CLAIM_PARTITION_PREMAKE, create_future_partitions, drop_partitions
+from src.stats import provider_stats_drift, rebuild_provider_stats
+
+
+async def rebuild_provider_stats_command(arguments: argparse.Namespace) -> int:
+    """
+    Rebuild the `provider_stats` rollup from `claim`, or only report its drift.
+    """
+    async with session() as db:
+        drift = await provider_stats_drift(db)
+        logging.info('provider_stats drift: %s provider(s)', len(drift))
+
+        for provider in drift:
+            logging.info('Drifted provider: %s', provider)
+
+        if arguments.check:
+            return 1 if drift else 0
+
+        await rebuild_provider_stats(db)
+        await db.commit()
+        logging.info('Rebuilt provider_stats')
+
+    redis_connection = redis.from_url(
+        os.environ['REDIS_URL'], encoding='utf-8', decode_responses=True
+    )
+    try:
+        cache.connect(redis_connection)
+        await cache.invalidate(PROVIDERS_KEY)
+    finally:
+        await redis_connection.aclose()
+
+    return 0
+
+
+async def backfill_fingerprints_command(arguments: argparse.Namespace) -> int:
+    """
+    Fingerprint the claims stored before duplicate detection was introduced.
+    """
+    async with session() as db:
+        filled, duplicates = await backfill_fingerprints(db, arguments.batch_size)
+
+    logging.info(
+        'Fingerprinted %s claim(s); %s duplicate(s) left unfingerprinted', filled, duplicates
+    )
+    return 0
+
+
+async def rebuild_daily_stats_command(arguments: argparse.Namespace) -> int:
+    """
+    Recompute the `claim_daily_stats` rollup behind `/analytics` from `claim`.
+
+    With a range, the rollup is rebuilt one month per transaction, so historical data
+    can be backfilled without holding a lock on `claim` for the whole run.
+    """
+    if (arguments.start is None) != (arguments.end is None):
+        logging.error('--start and --end must be given together')
+        return 2
+
+    windows = (
+        month_windows(arguments.start, arguments.end) if arguments.start else [(None, None)]
+    )
+
+    async with session() as db:
+        for start, end in windows:
+            # NOTE: a window of `(None, None)` rebuilds every day
+            written = await rebuild_daily_stats(db, start, end)
+            await db.commit()
+            logging.info('Rebuilt claim_daily_stats in [%s, %s): %s row(s)', start, end, written)
+
+    return 0
+
+
+async def purge_outbox_command(arguments: argparse.Namespace) -> int:
+    """
+    Delete published outbox events older than the replay window.
+    """
+    async with session() as db:
+        purged = await purge_published(db, utcnow() - timedelta(days=arguments.older_than_days))
+
+    logging.info('Purged %s published outbox event(s)', purged)
+    return 0
+
+
+async def create_partitions_command(arguments: argparse.Namespace) -> int:
+    """
+    Create the monthly `claim` partitions of the coming months; run it e.g. daily.
+    """
+    async with session() as db:
+        created = await create_future_partitions(db, arguments.months)
+        await db.commit()
+
+    logging.info('Created %s claim partition(s)', len(created))
+    return 0
+
+
+async def purge_claims_command(arguments: argparse.Namespace) -> int:
+    """
+    Remove the claims serviced before the retention cutoff, a partition at a time.
+    """
+    async with session() as db:
+        partitions, deleted = await drop_partitions(db, arguments.before, arguments.detach_only)
+        await db.commit()
+
+    action = 'Detached' if arguments.detach_only else 'Dropped'
+    logging.info('%s %s claim partition(s): %s', action, len(partitions), ', '.join(partitions))
+    logging.info('Deleted %s claim(s) outside of monthly partitions', deleted)
+    return 0
+
+
+async def export_claims_command(arguments: argparse.Namespace) -> int:
+    """
+    Export the matching claims to a Parquet, Arrow IPC or gzip CSV file.
+    """
+    filters = ClaimFilters(
+        provider_npi=arguments.provider_npi,
+        subscriber_number=arguments.subscriber_number,
+        plan_group=arguments.plan_group,
+        service_date_from=arguments.start,
+        service_date_to=arguments.end,
+    )
+
+    size = 0
+    with open(arguments.output, 'wb') as output:
+        async for chunk in export_claims(session, filters, arguments.format):
+            output.write(chunk)
+            size += len(chunk)
+
+    logging.info('Exported claims to %s (%s bytes)', arguments.output, size)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.admin', description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser(
+        'rebuild-provider-stats', help='recompute the provider_stats rollup from claim'
+    )
+    rebuild.add_argument(
+        '--check',
+        action='store_true',
+        help='only report drift; exits non-zero if the rollup is out of date',
+    )
+    rebuild.set_defaults(handler=rebuild_provider_stats_command)
+
+    backfill = commands.add_parser(
+        'backfill-fingerprints', help='fingerprint claims stored without one'
+    )
+    backfill.add_argument(
+        '--batch-size',
+        type=int,
+        default=INGEST_BATCH_SIZE,
+        help='number of claims fingerprinted per transaction',
+    )
+    backfill.set_defaults(handler=backfill_fingerprints_command)
+
+    daily = commands.add_parser(
+        'rebuild-daily-stats', help='recompute the claim_daily_stats rollup from claim'
+    )
+    daily.add_argument(
+        '--start', type=date.fromisoformat, help='the first day to rebuild (default: all days)'
+    )
+    daily.add_argument(
+        '--end', type=date.fromisoformat, help='the day after the last day to rebuild'
+    )
+    daily.set_defaults(handler=rebuild_daily_stats_command)
+
+    purge = commands.add_parser(
+        'purge-outbox', help='delete published outbox events, which can then no longer be replayed'
+    )
+    purge.add_argument(
+        '--older-than-days',
+        type=float,
+        default=7,
+        help='only purge events created this many days ago or earlier (default: 7)',
+    )
+    purge.set_defaults(handler=purge_outbox_command)
+
+    partitions = commands.add_parser(
+        'create-partitions', help='create the claim partitions of the coming months'
+    )
+    partitions.add_argument(
+        '--months',
+        type=int,
+        default=CLAIM_PARTITION_PREMAKE,
+        help=f'number of months after the current one (default: {CLAIM_PARTITION_PREMAKE})',
+    )
+    partitions.set_defaults(handler=create_partitions_command)
+
+    retention = commands.add_parser(
+        'purge-claims', help='drop the claims serviced before a month, a partition at a time'
+    )
+    retention.add_argument(
+        '--before',
+        type=date.fromisoformat,
+        required=True,
+        help='remove the claims serviced before the first day of this month',
+    )
+    retention.add_argument(
+        '--detach-only',
+        action='store_true',
+        help='detach the partitions from claim but keep them, e.g. to archive them',
+    )
+    retention.set_defaults(handler=purge_claims_command)
+
+    export = commands.add_parser('export-claims', help='export claims to a columnar or CSV file')
+    export.add_argument('--output', required=True, help='the path of the file to write')
+    export.add_argument(
+        '--format',
+        choices=list(EXPORT_FORMATS),
+        default='parquet',
+        help='parquet, arrow (an Arrow IPC stream) or csv (gzip compressed); default: parquet',
+    )
+    export.add_argument('--provider-npi', help='only export the claims of this provider')
+    export.add_argument('--subscriber-number', help='only export the claims of this subscriber')
+    export.add_argument('--plan-group', help='only export the claims of this plan group')
+    export.add_argument(
+        '--start',
+        type=datetime.fromisoformat,
+        help='only export claims serviced at or after this date',
+    )
+    export.add_argument(
+        '--end', type=datetime.fromisoformat, help='only export claims serviced before this date'
+    )
+    export.set_defaults(handler=export_claims_command)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = build_parser().parse_args(argv)
+
+    configure_logging()
+    try:
+        return asyncio.run(arguments.handler(arguments))
+    finally:
+        stop_logging()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Date, DateTime, Row, cast, delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bulk import upsert_insert
+from src.repo import Claim, ClaimDailyStats
+
+DIMENSIONS = ('provider_npi', 'plan_group', 'submitted_procedure')
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def claim_day():
+    """
+    The day of a Claim's `service_date`; `date()` is understood by both PostgreSQL and SQLite.
+    """
+    return func.date(Claim.service_date, type_=Date)
+
+
+async def update_daily_stats(db: AsyncSession, records: List[dict]):
+    """
+    Fold newly inserted Claims into the `claim_daily_stats` rollup.
+
+    Like `update_provider_stats`, the batch's totals per day, provider, plan group and
+    procedure are applied with a single upsert in the session's current transaction.
+
+    Arguments:
+        db (AsyncSession): the database session the claims were inserted with
+        records (List[dict]): the column values of the inserted claims
+    """
+    if not records:
+        return
+
+    totals = defaultdict(lambda: {'claim_count': 0, 'total_net_fee': 0})
+    for record in records:
+        bucket = totals[
+            (
+                record['service_date'].date(),
+                record['provider_npi'],
+                record['plan_group'],
+                record['submitted_procedure'],
+            )
+        ]
+        bucket['claim_count'] += 1
+        bucket['total_net_fee'] += record['net_fee']
+
+    statement = upsert_insert(db, ClaimDailyStats.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            ClaimDailyStats.day,
+            ClaimDailyStats.provider_npi,
+            ClaimDailyStats.plan_group,
+            ClaimDailyStats.submitted_procedure,
+        ],
+        set_={
+            'claim_count': ClaimDailyStats.claim_count + statement.excluded.claim_count,
+            'total_net_fee': ClaimDailyStats.total_net_fee + statement.excluded.total_net_fee,
+        },
+    )
+
+    # NOTE: upsert in a consistent order so concurrent ingests lock rows in the same order
+    await db.execute(
+        statement,
+        [
+            {
+                'day': day,
+                'provider_npi': provider_npi,
+                'plan_group': plan_group,
+                'submitted_procedure': submitted_procedure,
+                **totals[(day, provider_npi, plan_group, submitted_procedure)],
+            }
+            for day, provider_npi, plan_group, submitted_procedure in sorted(totals)
+        ],
+    )
+
+
+async def rebuild_daily_stats(
+    db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None
+) -> int:
+    """
+    Recompute the `claim_daily_stats` rollup from the `claim` table, for the days in
+    `[start, end)` or for every day.
+
+    Arguments:
+        db (AsyncSession): the database session used to rebuild the rollup; the
+            caller is responsible for committing the transaction
+        start (date): the first day to rebuild
+        end (date): the day after the last day to rebuild
+
+    Returns:
+        int: the number of rollup rows written
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        # NOTE: block concurrent ingests so none of their claims are missed
+        await db.execute(text(f'LOCK TABLE {Claim.__tablename__} IN SHARE MODE'))
+
+    stale = delete(ClaimDailyStats)
+    claims = select(
+        claim_day(),
+        Claim.provider_npi,
+        Claim.plan_group,
+        Claim.submitted_procedure,
+        func.count(Claim.id),
+        func.coalesce(func.sum(Claim.net_fee), 0),
+    ).group_by(claim_day(), Claim.provider_npi, Claim.plan_group, Claim.submitted_procedure)
+
+    # NOTE: the range is applied to `service_date` itself so it can use its index
+    if start is not None:
+        stale = stale.where(ClaimDailyStats.day >= start)
+        claims = claims.where(Claim.service_date >= start)
+    if end is not None:
+        stale = stale.where(ClaimDailyStats.day < end)
+        claims = claims.where(Claim.service_date < end)
+
+    await db.execute(stale)
+    result = await db.execute(
+        insert(ClaimDailyStats).from_select(
+            [
+                'day',
+                'provider_npi',
+                'plan_group',
+                'submitted_procedure',
+                'claim_count',
+                'total_net_fee',
+            ],
+            claims,
+        )
+    )
+    return result.rowcount
+
+
+def period_start(db: AsyncSession, granularity: str):
+    """
+    The first day of the day, week (starting Monday) or month a rollup row falls in.
+    """
+    if granularity == 'day':
+        return ClaimDailyStats.day
+
+    if db.get_bind().dialect.name == 'postgresql':
+        # NOTE: `date_trunc` of a date returns a timestamp with time zone; truncate a naive one
+        return cast(func.date_trunc(granularity, cast(ClaimDailyStats.day, DateTime)), Date)
+
+    if granularity == 'week':
+        return func.date(ClaimDailyStats.day, '-6 days', 'weekday 1', type_=Date)
+    return func.date(ClaimDailyStats.day, 'start of month', type_=Date)
+
+
+async def query_daily_stats(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    granularity: str = 'day',
+    group_by: Sequence[str] = (),
+    filters: Optional[dict] = None,
+) -> List[Row]:
+    """
+    Sum the `claim_daily_stats` rollup into periods, rather than scanning `claim`.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the rollup
+        start (date): the first day of the range
+        end (date): the day after the last day of the range
+        granularity (str): `day`, `week` or `month`
+        group_by (Sequence[str]): the dimensions to break the totals down by, out of
+            `provider_npi`, `plan_group` and `submitted_procedure`
+        filters (dict): the values of the dimensions to restrict the totals to
+
+    Returns:
+        List[Row]: the `period_start`, dimensions, `claim_count` and `total_net_fee`
+        of every period and group, in that order
+    """
+    period = period_start(db, granularity).label('period_start')
+    dimensions = [getattr(ClaimDailyStats, name) for name in group_by]
+
+    query = (
+        select(
+            period,
+            *dimensions,
+            func.sum(ClaimDailyStats.claim_count).label('claim_count'),
+            func.sum(ClaimDailyStats.total_net_fee).label('total_net_fee'),
+        )
+        .where(ClaimDailyStats.day >= start, ClaimDailyStats.day < end)
+        .group_by(period, *dimensions)
+        .order_by(period, *dimensions)
+    )
+    for name, value in (filters or {}).items():
+        if value is not None:
+            query = query.where(getattr(ClaimDailyStats, name) == value)
+
+    return (await db.execute(query)).all()
+
+
+def month_windows(start: date, end: date) -> List[tuple]:
+    """
+    Split `[start, end)` at month boundaries, e.g. to rebuild one month per transaction.
+    """
+    windows = []
+    while start < end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        windows.append((start, min(next_month, end)))
+        start = next_month
+
+    return windows
@@ -0,0 +1,155 @@
+import abc
+import asyncio
+import importlib
+import json
+import os
+from typing import List, Optional, Sequence
+from urllib.parse import urlparse
+
+import redis.asyncio as redis
+
+OUTBOX_CONCURRENCY = int(os.environ.get('OUTBOX_CONCURRENCY', 64))
+OUTBOX_STREAM_PREFIX = os.environ.get('OUTBOX_STREAM_PREFIX', 'claim-service:events')
+OUTBOX_STREAM_MAXLEN = int(os.environ.get('OUTBOX_STREAM_MAXLEN', 1000000))
+
+
+def encode_event(event) -> str:
+    return json.dumps(
+        {'id': event.id, 'topic': event.topic, 'key': event.key, 'payload': event.payload},
+        separators=(',', ':'),
+    )
+
+
+class Broker(abc.ABC):
+    """
+    The message broker outbox events are published to.
+
+    Subclasses implement `publish_one`, which is called for up to
+    `OUTBOX_CONCURRENCY` events at a time, or extend `BatchBroker` to send a whole
+    batch at once. Events carry `id`, `topic`, `key` and a JSON `payload`.
+    """
+
+    def __init__(self, concurrency: int = OUTBOX_CONCURRENCY):
+        self.concurrency = concurrency
+
+    async def publish(self, events: Sequence) -> List[Optional[BaseException]]:
+        """
+        Publish a batch of events.
+
+        Returns:
+            List[Optional[BaseException]]: the error publishing each event, or `None`
+            for the events that were published
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def publish(event):
+            async with semaphore:
+                await self.publish_one(event)
+
+        return list(
+            await asyncio.gather(*(publish(event) for event in events), return_exceptions=True)
+        )
+
+    @abc.abstractmethod
+    async def publish_one(self, event):
+        """
+        Publish one event, raising the error if it isn't published.
+        """
+
+    async def close(self):
+        pass
+
+
+class BatchBroker(Broker):
+    """
+    A broker that sends a whole batch of events at once; subclasses implement `publish`.
+    """
+
+    @abc.abstractmethod
+    async def publish(self, events: Sequence) -> List[Optional[BaseException]]:
+        """
+        Publish a batch of events in one go; see `Broker.publish`.
+        """
+
+    async def publish_one(self, event):
+        error, = await self.publish([event])
+        if error is not None:
+            raise error
+
+
+class FileBroker(BatchBroker):
+    """
+    Appends events to a local file as JSON lines; a stand-in for development and tests.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    async def publish(self, events: Sequence) -> List[Optional[BaseException]]:
+        lines = ''.join(encode_event(event) + '\n' for event in events)
+
+        try:
+            await asyncio.to_thread(self._append, lines)
+        except OSError as error:
+            return [error] * len(events)
+
+        return [None] * len(events)
+
+    def _append(self, lines: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class RedisStreamBroker(BatchBroker):
+    """
+    Appends events to a Redis stream per topic, pipelining each batch in one round trip.
+    """
+
+    def __init__(self, redis_connection: redis.Redis, prefix: str = OUTBOX_STREAM_PREFIX):
+        super().__init__()
+        self.redis = redis_connection
+        self.prefix = prefix
+
+    async def publish(self, events: Sequence) -> List[Optional[BaseException]]:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipeline:
+                for event in events:
+                    pipeline.xadd(
+                        f'{self.prefix}:{event.topic}',
+                        {'key': event.key, 'event': encode_event(event)},
+                        maxlen=OUTBOX_STREAM_MAXLEN,
+                        approximate=True,
+                    )
+                results = await pipeline.execute(raise_on_error=False)
+
+        except redis.RedisError as error:
+            return [error] * len(events)
+
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def build_broker(url: str) -> Broker:
+    """
+    Create the broker events are published to.
+
+    Arguments:
+        url (str): `redis://...` for Redis streams, `file:///path` for a JSON lines
+            file, or `package.module:factory` for a custom broker, called with no
+            arguments
+
+    Returns:
+        Broker: the broker
+    """
+    scheme = urlparse(url).scheme
+
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisStreamBroker(redis.from_url(url, encoding='utf-8', decode_responses=True))
+    if scheme == 'file':
+        return FileBroker(urlparse(url).path)
+
+    module, _, factory = url.partition(':')
+    return getattr(importlib.import_module(module), factory)()
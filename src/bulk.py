@@ -0,0 +1,145 @@
+import csv
+import io
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Table, column, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Insert
+
+from src.repo import Claim
+
+CLAIM_COLUMNS = [column.name for column in Claim.__table__.columns]
+COPY_NULL = '\\N'
+
+# per-transaction table the claims are copied to before being merged into `claim`
+CLAIM_STAGING = table('claim_staging', *[column(name) for name in CLAIM_COLUMNS])
+
+# dialect specific inserts supporting `ON CONFLICT` upserts
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+async def insert_claims(db: AsyncSession, records: List[dict]) -> List[dict]:
+    """
+    Bulk insert Claim records, skipping those whose fingerprint is already stored.
+
+    Duplicates are skipped by the `ON CONFLICT (fingerprint, service_date) DO NOTHING`
+    clause of a single statement per batch, which probes the unique fingerprint index
+    once per record, so the check costs O(batch) regardless of the size of the table.
+
+    PostgreSQL connections stream the records through `COPY ... FROM STDIN` into a
+    staging table that is merged into `claim`; every other dialect (e.g. SQLite in
+    tests) uses a single Core executemany insert. The records are written in the
+    session's current transaction.
+
+    Arguments:
+        db (AsyncSession): the database session used to persist the claims
+        records (List[dict]): the column values of each Claim to insert; their
+            fingerprints must be unique within the batch
+
+    Returns:
+        List[dict]: the records that were inserted, i.e. weren't duplicates
+    """
+    if not records:
+        return []
+
+    if db.get_bind().dialect.name == 'postgresql':
+        fingerprints = await _copy_claims(db, records)
+    else:
+        statement = upsert_insert(db, Claim.__table__)
+        statement = statement.on_conflict_do_nothing(index_elements=[Claim.fingerprint, Claim.service_date])
+        fingerprints = (
+            await db.execute(statement.returning(Claim.fingerprint), records)
+        ).scalars().all()
+
+    inserted = set(fingerprints)
+    return [record for record in records if record['fingerprint'] in inserted]
+
+
+async def _copy_claims(db: AsyncSession, records: List[dict]) -> List[str]:
+    """
+    Insert Claim records using PostgreSQL's `COPY FROM STDIN` protocol.
+
+    `COPY` can't skip conflicting rows, so the records are copied to a temporary
+    staging table and merged into `claim` with `INSERT ... SELECT ... ON CONFLICT`.
+
+    Returns:
+        List[str]: the fingerprints of the inserted claims
+    """
+    connection = await db.connection()
+    # NOTE: this also begins SQLAlchemy's asyncpg transaction, which otherwise only
+    # starts on the first statement it executes; without one, the raw COPY would run
+    # (and commit) on its own instead of in the session's transaction
+    await connection.exec_driver_sql(
+        'CREATE TEMPORARY TABLE IF NOT EXISTS claim_staging '
+        '(LIKE claim INCLUDING DEFAULTS) ON COMMIT DROP'
+    )
+    raw_connection = await connection.get_raw_connection()
+
+    await raw_connection.driver_connection.copy_to_table(
+        CLAIM_STAGING.name,
+        source=io.BytesIO(_to_copy_buffer(records).getvalue().encode('utf-8')),
+        columns=CLAIM_COLUMNS,
+        format='csv',
+        null=COPY_NULL,
+    )
+
+    statement = (
+        postgresql.insert(Claim.__table__)
+        .from_select(CLAIM_COLUMNS, select(*CLAIM_STAGING.columns))
+        .on_conflict_do_nothing(index_elements=[Claim.fingerprint, Claim.service_date])
+        .returning(Claim.fingerprint)
+    )
+    fingerprints = (await connection.execute(statement)).scalars().all()
+    await connection.execute(text('TRUNCATE claim_staging'))
+
+    return fingerprints
+
+
+def _to_copy_buffer(records: List[dict]) -> io.StringIO:
+    """
+    Serialize records to the CSV format read by `COPY`.
+
+    NOTE: NULLs are written as an explicit marker so empty strings (e.g. a blank
+    quadrant) are not read back as NULL, `COPY`'s default for an empty value.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows(
+        [_copy_value(record.get(column)) for column in CLAIM_COLUMNS] for record in records
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_value(value):
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def upsert_insert(db: AsyncSession, table: Table) -> Insert:
+    """
+    Build an insert supporting `on_conflict_do_*` clauses for the session's dialect.
+
+    Arguments:
+        db (AsyncSession): the database session the statement will be executed on
+        table (Table): the table to insert into
+
+    Raises:
+        NotImplementedError: if the dialect doesn't support upserts
+
+    Returns:
+        Insert: the dialect specific insert statement
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise NotImplementedError(f'Upserts are not supported for {dialect}.')
+
+    return UPSERT_INSERTS[dialect](table)
@@ -0,0 +1,215 @@
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Hashable, Optional, Union
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.responses import dumps, loads
+
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true') == 'true'
+CACHE_PREFIX = os.environ.get('CACHE_PREFIX', 'claim-service:cache')
+CACHE_LOCAL_SIZE = int(os.environ.get('CACHE_LOCAL_SIZE', 1024))
+CACHE_LOCAL_TTL = float(os.environ.get('CACHE_LOCAL_TTL', 5))
+CACHE_CLAIM_TTL = int(os.environ.get('CACHE_CLAIM_TTL', 300))
+CACHE_PROVIDERS_TTL = int(os.environ.get('CACHE_PROVIDERS_TTL', 30))
+
+PROVIDERS_KEY = 'providers'
+
+
+def claim_key(claim_id: str) -> str:
+    return f'claim:{claim_id}'
+
+
+class LocalCache:
+    """
+    A small in-process LRU cache whose entries expire after a fixed TTL.
+    """
+
+    def __init__(self, size: int = CACHE_LOCAL_SIZE, ttl: float = CACHE_LOCAL_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def delete_group(self, group: Hashable):
+        """
+        Delete every entry keyed by a `(group, ...)` tuple.
+        """
+        for key in [key for key in self._entries if isinstance(key, tuple) and key[0] == group]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized responses, backed by Redis with a local LRU tier.
+
+    Entries are stored under `key`, or under a `field` of the `key` hash for groups of
+    responses that are invalidated together (e.g. the provider leaderboard for every
+    `limit`). Redis failures are logged and treated as cache misses.
+    """
+
+    def __init__(
+        self,
+        redis_connection: Optional[Redis] = None,
+        enabled: bool = CACHE_ENABLED,
+        local: Optional[LocalCache] = None,
+        prefix: str = CACHE_PREFIX,
+    ):
+        self.redis = redis_connection
+        self.enabled = enabled
+        self.local = local or LocalCache()
+        self.prefix = prefix
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def connect(self, redis_connection: Redis):
+        self.redis = redis_connection
+
+    async def get(self, key: str, field: Optional[str] = None) -> Optional[Any]:
+        """
+        Look up a cached response, checking the local tier before Redis.
+
+        Arguments:
+            key (str): the cache key, e.g. `claim:<claim_id>`
+            field (str): the field of the `key` hash, if the entry belongs to a group
+
+        Returns:
+            Optional[Any]: the cached (JSON compatible) response, or `None` on a miss
+        """
+        serialized = await self.get_serialized(key, field)
+        return None if serialized is None else loads(serialized)
+
+    async def get_serialized(self, key: str, field: Optional[str] = None) -> Optional[bytes]:
+        """
+        Look up a cached response as the JSON body it's stored as, so it can be returned as is.
+        """
+        if not self.enabled:
+            return None
+
+        namespace = key.split(':', 1)[0]
+        local_key = (key, field)
+
+        serialized = self.local.get(local_key)
+        if serialized is not None:
+            self.hits[f'{namespace}.local'] += 1
+            return serialized
+
+        serialized = await self._redis_get(key, field)
+        if serialized is None:
+            self.misses[namespace] += 1
+            return None
+
+        self.hits[f'{namespace}.redis'] += 1
+        if isinstance(serialized, str):
+            serialized = serialized.encode()
+        self.local.set(local_key, serialized)
+        return serialized
+
+    async def set(self, key: str, value: Any, ttl: int, field: Optional[str] = None):
+        """
+        Store a response in both cache tiers.
+
+        Arguments:
+            key (str): the cache key
+            value (Any): the response to cache; it's JSON encoded for storage
+            ttl (int): the number of seconds to keep the entry in Redis
+            field (str): the field of the `key` hash, if the entry belongs to a group
+        """
+        if self.enabled:
+            await self.set_serialized(key, dumps(value), ttl, field)
+
+    async def set_serialized(
+        self, key: str, serialized: bytes, ttl: int, field: Optional[str] = None
+    ):
+        """
+        Store an already serialized JSON response in both cache tiers.
+        """
+        if not self.enabled:
+            return
+
+        self.local.set((key, field), serialized, ttl)
+
+        if self.redis is None:
+            return
+
+        try:
+            redis_key = self._redis_key(key)
+
+            if field is None:
+                await self.redis.set(redis_key, serialized, ex=ttl)
+            else:
+                async with self.redis.pipeline(transaction=True) as pipeline:
+                    pipeline.hset(redis_key, field, serialized)
+                    pipeline.expire(redis_key, ttl, nx=True)
+                    await pipeline.execute()
+
+        except RedisError as error:
+            logging.warning('Failed to cache %s: %s', key, error)
+
+    async def invalidate(self, key: str):
+        """
+        Drop a cache entry, or every field of a grouped entry, from both tiers.
+
+        NOTE: the local tiers of other workers keep serving the entry for at most
+        `CACHE_LOCAL_TTL` seconds.
+        """
+        self.local.delete_group(key)
+
+        if not self.enabled or self.redis is None:
+            return
+
+        try:
+            await self.redis.delete(self._redis_key(key))
+        except RedisError as error:
+            logging.warning('Failed to invalidate cached %s: %s', key, error)
+
+    def stats(self) -> dict:
+        return {'hits': dict(self.hits), 'misses': dict(self.misses)}
+
+    def _redis_key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    async def _redis_get(self, key: str, field: Optional[str]) -> Optional[Union[bytes, str]]:
+        if self.redis is None:
+            return None
+
+        try:
+            if field is None:
+                return await self.redis.get(self._redis_key(key))
+            return await self.redis.hget(self._redis_key(key), field)
+
+        except RedisError as error:
+            logging.warning('Failed to read cached %s: %s', key, error)
+            return None
+
+
+cache = ResponseCache()
@@ -1,36 +1,440 @@
+import asyncio
+import itertools
+import logging
 import os
-from typing import Generator, Annotated
+import time
+from typing import AsyncGenerator, Annotated, Dict, List, Optional
 
-from fastapi import Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from alembic.script import ScriptDirectory
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import declarative_base
 
+from src.metrics import DB_SESSION_SECONDS, DB_SESSIONS_ACTIVE, TimedQueuePool
+
+# async DBAPI drivers used for each database backend
+ASYNC_DRIVERS = {
+    'postgresql': 'asyncpg',
+    'sqlite': 'aiosqlite',
+}
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true') == 'true'
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_WARMUP = int(os.environ.get('DB_POOL_WARMUP', DB_POOL_SIZE))
+DB_REPLICA_POOL_SIZE = int(os.environ.get('DB_REPLICA_POOL_SIZE', DB_POOL_SIZE))
+DB_REPLICA_MAX_OVERFLOW = int(os.environ.get('DB_REPLICA_MAX_OVERFLOW', DB_MAX_OVERFLOW))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5))
+DB_REPLICA_CHECK_TIMEOUT = float(os.environ.get('DB_REPLICA_CHECK_TIMEOUT', 2))
+# NOTE: a replica further behind the primary than this many seconds isn't read from
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 10))
+# NOTE: requests with this cookie, set for this many seconds after a write, or with
+# this header read from the primary, so clients see their own writes
+DB_READ_PRIMARY_COOKIE = os.environ.get('DB_READ_PRIMARY_COOKIE', 'claim-service-read-primary')
+DB_READ_PRIMARY_SECONDS = int(os.environ.get('DB_READ_PRIMARY_SECONDS', 5))
+DB_READ_PRIMARY_HEADER = os.environ.get('DB_READ_PRIMARY_HEADER', 'X-Read-Primary')
+# NOTE: disabled by `src.server` in its workers, once it has checked the schema itself
+DB_CHECK_SCHEMA = os.environ.get('DB_CHECK_SCHEMA', 'true') == 'true'
+
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+
+def async_database_url(database_url: str) -> URL:
+    """
+    Convert a database URL to one using the backend's async driver.
+
+    Arguments:
+        database_url (str): the database URL, e.g. `postgresql://user:pass@db/claim`
+
+    Returns:
+        URL: the database URL using the async driver, e.g. `postgresql+asyncpg://...`
+    """
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+
+    if driver:
+        url = url.set(drivername=f'{url.get_backend_name()}+{driver}')
+
+    return url
+
+
+def build_engine(
+    database_url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW
+) -> AsyncEngine:
+    """
+    Create an async engine with the configured connection pool settings.
+
+    Arguments:
+        database_url (str): the database URL to connect to
+        pool_size (int): the number of connections the pool keeps open
+        max_overflow (int): the number of connections opened beyond the pool size
+
+    Returns:
+        AsyncEngine: the engine used to open database connections
+    """
+    url = async_database_url(database_url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+
+    # NOTE: SQLite uses a static/null pool that doesn't accept sizing options
+    if url.get_backend_name() != 'sqlite':
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    return create_async_engine(url, **options)
+
+
+def _build_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+class Replica:
+    """
+    A read replica's engine, and whether its last health check passed.
+    """
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = _build_session_factory(engine)
+        self.healthy = True
+
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+_replicas: List[Replica] = []
+_replica_turns = itertools.count()
+_engine_pid: Optional[int] = None
+
+
+def get_engine() -> AsyncEngine:
+    """
+    The process's primary engine, built from `DATABASE_URL` on first use, together
+    with an engine per read replica in `DATABASE_REPLICA_URLS` (comma separated).
+
+    Importing the application doesn't connect or read the environment, and a process
+    forked from one that already used the engines builds its own rather than sharing
+    the parent's pooled connections.
+    """
+    global _engine, _session_factory, _replicas, _engine_pid
+
+    if _engine is not None and _engine_pid != os.getpid():
+        # NOTE: drop the inherited pools without closing the parent's connections
+        for engine in [_engine, *(replica.engine for replica in _replicas)]:
+            engine.sync_engine.dispose(close=False)
+        _engine = None
+
+    if _engine is None:
+        _engine = build_engine(os.environ['DATABASE_URL'])
+        _session_factory = _build_session_factory(_engine)
+        _replicas = [
+            Replica(
+                f'replica-{index}',
+                build_engine(url.strip(), DB_REPLICA_POOL_SIZE, DB_REPLICA_MAX_OVERFLOW),
+            )
+            for index, url in enumerate(
+                filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1
+            )
+        ]
+        _engine_pid = os.getpid()
+
+    return _engine
+
+
+def get_engines() -> Dict[str, AsyncEngine]:
+    """
+    The process's engines by name: `primary`, then `replica-1`, `replica-2`, ...
+    """
+    return {'primary': get_engine(), **{replica.name: replica.engine for replica in _replicas}}
+
+
+def get_replicas() -> List[Replica]:
+    get_engine()
+    return _replicas
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    The session factory bound to the process's primary engine.
+    """
+    get_engine()
+    return _session_factory
+
+
+def get_read_session_factory() -> async_sessionmaker:
+    """
+    The session factory of the next healthy replica, round-robin, or of the primary
+    if there are no replicas or none is healthy.
+    """
+    healthy = [replica for replica in get_replicas() if replica.healthy]
+    if not healthy:
+        return get_session_factory()
+
+    return healthy[next(_replica_turns) % len(healthy)].session_factory
+
+
+def session() -> AsyncSession:
+    """
+    Open a session on the process's primary engine, e.g. `async with session() as db: ...`.
+    """
+    return get_session_factory()()
+
+
+async def dispose_engine():
+    """
+    Close the process's pooled connections; the engines are rebuilt if they're used again.
+    """
+    global _engine, _session_factory, _replicas, _engine_pid
+
+    if _engine is not None:
+        for engine in [_engine, *(replica.engine for replica in _replicas)]:
+            await engine.dispose()
+        _engine = _session_factory = _engine_pid = None
+        _replicas = []
+
+
+async def _check_replica(replica: Replica) -> bool:
+    async with replica.engine.connect() as connection:
+        if connection.dialect.name != 'postgresql':
+            await connection.execute(text('SELECT 1'))
+            return True
+
+        # NOTE: the time since the last replayed transaction grows while the primary is
+        # idle, so a replica that has replayed all the WAL it received isn't lagging;
+        # NULL until the replica has replayed a transaction, or on a primary
+        lag = await connection.scalar(
+            text(
+                'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+        )
+        return lag is None or lag <= DB_REPLICA_MAX_LAG
+
+
+async def check_replicas() -> List[str]:
+    """
+    Check that each replica accepts connections and is at most `DB_REPLICA_MAX_LAG`
+    seconds behind the primary; reads are only routed to those that are.
+
+    Returns:
+        List[str]: the names of the healthy replicas
+    """
+    for replica in get_replicas():
+        try:
+            healthy = await asyncio.wait_for(_check_replica(replica), DB_REPLICA_CHECK_TIMEOUT)
+        except (asyncio.TimeoutError, DBAPIError, OSError) as error:
+            logging.debug('Health check of %s failed: %s', replica.name, error)
+            healthy = False
+
+        if healthy != replica.healthy:
+            state = 'healthy' if healthy else 'unhealthy'
+            logging.warning('Read replica %s is %s', replica.name, state)
+        replica.healthy = healthy
+
+    return [replica.name for replica in _replicas if replica.healthy]
+
+
+async def monitor_replicas(interval: float = DB_REPLICA_CHECK_INTERVAL):
+    """
+    Check the replicas every `interval` seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await check_replicas()
+        except Exception:
+            # NOTE: the replicas keep their last state until the next round
+            logging.exception('Failed to check the read replicas')
+
+
+async def warm_pool(connections: int = DB_POOL_WARMUP) -> int:
+    """
+    Open pooled connections up front on every engine, so the first requests don't
+    pay for connecting.
+
+    Arguments:
+        connections (int): the number of connections to open per engine; at most the
+            pool size, since overflow connections are closed when they're returned
+
+    Returns:
+        int: the number of connections opened
+    """
+    opened = 0
+    for name, engine in get_engines().items():
+        try:
+            opened += await _warm_engine(engine, connections)
+        except (DBAPIError, OSError) as error:
+            # NOTE: a replica that's down is skipped by the health checks until it's back
+            if name == 'primary':
+                raise
+            logging.warning('Failed to warm the pool of %s: %s', name, error)
+
+    return opened
+
+
+async def _warm_engine(engine: AsyncEngine, connections: int) -> int:
+    connections = min(connections, engine.pool.size()) if hasattr(engine.pool, 'size') else 0
+    if connections <= 0:
+        return 0
+
+    opened = 0
+    all_opened = asyncio.Event()
+
+    async def connect():
+        nonlocal opened
+        async with engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+            opened += 1
+            if opened == connections:
+                all_opened.set()
+            # NOTE: hold the connection until all are open, so each task opens its own
+            await all_opened.wait()
+
+    tasks = [asyncio.create_task(connect()) for _ in range(connections)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        all_opened.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return opened
 
-engine = create_engine(os.environ['DATABASE_URL'])
-session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def init_db():
+def schema_head() -> str:
+    """
+    The latest migration revision, i.e. the schema version the code expects.
+    """
+    return ScriptDirectory(MIGRATIONS_DIRECTORY).get_current_head()
+
+
+async def schema_version(bind: AsyncEngine) -> Optional[str]:
     """
-    Set up the database for the application to use.
+    The migration revision the database is at, or `None` if it was never migrated.
     """
-    # NOTE: import necessary for table creation
-    import src.repo
-    Base.metadata.create_all(bind=engine)
+    async with bind.connect() as connection:
+        try:
+            return await connection.scalar(text('SELECT version_num FROM alembic_version'))
+        except DBAPIError:
+            return None
 
 
-def _get_db() -> Generator:
+async def init_db(bind: Optional[AsyncEngine] = None):
     """
-    Dependency that provides a new database session for each request.
+    Verify the database schema is at the version the application expects.
+
+    Schema changes are applied out of band with `alembic upgrade head`; starting a
+    worker only reads the current revision.
+
+    Arguments:
+        bind (AsyncEngine): the engine to check; defaults to the application engine
+
+    Raises:
+        RuntimeError: if the database hasn't been migrated to the latest revision
     """
-    DB = session()
+    current, head = await schema_version(bind or get_engine()), schema_head()
+
+    if current != head:
+        raise RuntimeError(
+            f'Database schema is at revision {current}, expected {head}; '
+            f'run `alembic upgrade head`.'
+        )
+
+
+async def _request_session(session_factory: async_sessionmaker) -> AsyncGenerator:
+    started = time.perf_counter()
+
     try:
-        yield DB
+        with DB_SESSIONS_ACTIVE.track_inprogress():
+            async with session_factory() as DB:
+                yield DB
     finally:
-        DB.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started)
+
+
+async def _get_db() -> AsyncGenerator:
+    """
+    Dependency that provides a new database session on the primary for each request.
+    """
+    async for DB in _request_session(get_session_factory()):
+        yield DB
+
+
+def reads_primary(request: Request) -> bool:
+    """
+    Whether a request's reads must see the client's own recent writes.
+    """
+    return (
+        DB_READ_PRIMARY_COOKIE in request.cookies
+        or request.headers.get(DB_READ_PRIMARY_HEADER, '').lower() == 'true'
+    )
+
+
+def _read_session_factory(request: Request) -> async_sessionmaker:
+    return get_session_factory() if reads_primary(request) else get_read_session_factory()
+
+
+async def _get_read_db(request: Request) -> AsyncGenerator:
+    """
+    Dependency that provides a new read-only database session for each request, on a
+    replica unless the request reads its own writes.
+    """
+    # NOTE: so reads sent as POST requests (e.g. batch lookups) don't pin the client
+    request.state.read_only = True
+    async for DB in _request_session(_read_session_factory(request)):
+        yield DB
+
+
+def _get_session_factory() -> async_sessionmaker:
+    """
+    Dependency that provides the session factory, for responses that outlive the
+    request's session (e.g. streamed ones).
+    """
+    return get_session_factory()
+
+
+def _get_read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Dependency that provides the read session factory of a streamed response.
+    """
+    return _read_session_factory(request)
+
+
+async def pin_writers_to_primary(request: Request, call_next):
+    """
+    Middleware pointing the reads of a client that just wrote to the primary for
+    `DB_READ_PRIMARY_SECONDS`, while replicas may not have caught up.
+    """
+    response = await call_next(request)
+
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        if get_replicas() and not getattr(request.state, 'read_only', False):
+            response.set_cookie(
+                DB_READ_PRIMARY_COOKIE, '1', max_age=DB_READ_PRIMARY_SECONDS, httponly=True
+            )
+
+    return response
 
 
-# dependency that can be used in route handlers
-db_dependency = Annotated[session, Depends(_get_db)]
+# dependencies that can be used in route handlers
+db_dependency = Annotated[AsyncSession, Depends(_get_db)]
+session_factory_dependency = Annotated[async_sessionmaker, Depends(_get_session_factory)]
+# NOTE: for routes that only read, and can do so from a replica
+read_db_dependency = Annotated[AsyncSession, Depends(_get_read_db)]
+read_session_factory_dependency = Annotated[
+    async_sessionmaker, Depends(_get_read_session_factory)
+]
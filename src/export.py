@@ -0,0 +1,176 @@
+import asyncio
+import os
+import zlib
+from typing import AsyncIterator, Sequence
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.parquet
+from sqlalchemy import Date, DateTime, Float, Integer, Numeric, Row, String
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.listing import claims_query
+from src.models import ClaimFilters
+from src.money import Money
+from src.repo import CLAIM_INTERNAL_COLUMNS, Claim
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 10000))
+
+# the media type and file extension of each export format
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'csv': ('application/gzip', 'csv.gz'),
+}
+
+EXPORT_COLUMNS = [
+    column for column in Claim.__table__.columns if column.name not in CLAIM_INTERNAL_COLUMNS
+]
+# NOTE: the dollar amounts of every cent a BIGINT holds
+DOLLARS = pa.decimal128(19, 2)
+
+
+def arrow_type(column_type) -> pa.DataType:
+    """
+    The Arrow type holding the values of a column of `repo.Claim`.
+    """
+    if isinstance(column_type, Money):
+        return DOLLARS
+    # NOTE: `Float` is a `Numeric` too
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Numeric):
+        return pa.decimal128(column_type.precision, column_type.scale)
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, String):
+        return pa.string()
+
+    raise TypeError(f'No Arrow type for {column_type!r}')
+
+
+EXPORT_SCHEMA = pa.schema(
+    [
+        pa.field(column.name, arrow_type(column.type), nullable=column.nullable)
+        for column in EXPORT_COLUMNS
+    ]
+)
+
+
+def _column(values: list, type: pa.DataType) -> pa.Array:
+    if type == DOLLARS:
+        # NOTE: a decimal holds its unscaled value, so cents are viewed as dollars as is
+        return pa.array(values, type=pa.int64()).cast(pa.decimal128(19, 0)).view(DOLLARS)
+
+    return pa.array(values, type=type)
+
+
+def record_batch(rows: Sequence[Row]) -> pa.RecordBatch:
+    """
+    Convert rows selected with `EXPORT_COLUMNS` to a record batch of `EXPORT_SCHEMA`;
+    amounts are selected in cents and exported as decimal dollars.
+    """
+    return pa.RecordBatch.from_arrays(
+        [
+            _column([row[index] for row in rows], field.type)
+            for index, field in enumerate(EXPORT_SCHEMA)
+        ],
+        schema=EXPORT_SCHEMA,
+    )
+
+
+class _Sink:
+    """
+    A write-only file collecting what a writer wrote since it was last drained.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def _open_writer(format: str, sink: _Sink):
+    if format == 'parquet':
+        # NOTE: every batch is written as a row group, so only one is held in memory
+        return pyarrow.parquet.ParquetWriter(sink, EXPORT_SCHEMA)
+    if format == 'arrow':
+        return pyarrow.ipc.new_stream(sink, EXPORT_SCHEMA)
+    if format == 'csv':
+        return pyarrow.csv.CSVWriter(sink, EXPORT_SCHEMA)
+
+    raise ValueError(f'Unsupported export format: {format}')
+
+
+def export_claims(
+    session_factory: async_sessionmaker, filters: ClaimFilters, format: str
+) -> AsyncIterator[bytes]:
+    """
+    Stream every matching Claim as a Parquet file, an Arrow IPC stream or a gzip CSV.
+
+    Rows are fetched from a server-side cursor `EXPORT_BATCH_SIZE` at a time, and each
+    batch is encoded and yielded before the next is fetched, so memory use doesn't grow
+    with the size of the export. Columns keep the types of `repo.Claim`, but amounts are
+    exact decimal dollars rather than cents. The stream opens its own session because
+    it outlives the request's.
+
+    Arguments:
+        session_factory (async_sessionmaker): opens the session the claims are read with
+        filters (ClaimFilters): the filters the Claims must match
+        format (str): `parquet`, `arrow` or `csv`
+
+    Raises:
+        ValueError: if the format is unsupported
+
+    Returns:
+        AsyncIterator[bytes]: the chunks of the exported file
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {format}')
+
+    query = claims_query(filters, columns=EXPORT_COLUMNS).execution_options(
+        yield_per=EXPORT_BATCH_SIZE
+    )
+
+    async def chunks() -> AsyncIterator[bytes]:
+        sink = _Sink()
+        writer = _open_writer(format, sink)
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if format == 'csv' else None
+
+        def encode(data: bytes) -> bytes:
+            return compressor.compress(data) if compressor else data
+
+        def write(rows: Sequence[Row]) -> bytes:
+            writer.write_batch(record_batch(rows))
+            return encode(sink.drain())
+
+        async with session_factory() as db:
+            async for rows in (await db.stream(query)).partitions():
+                # NOTE: encoding and compression run off the event loop
+                chunk = await asyncio.to_thread(write, rows)
+                if chunk:
+                    yield chunk
+
+        writer.close()
+        yield encode(sink.drain()) + (compressor.flush() if compressor else b'')
+
+    return chunks()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from typing import IO, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.utilities import utcnow
+from src.bulk import upsert_insert
+from src.models import UploadSummary
+from src.repo import IngestBatch
+
+IDEMPOTENCY_KEY_HEADER = os.environ.get('IDEMPOTENCY_KEY_HEADER', 'Idempotency-Key')
+UPLOAD_HASH_CHUNK_SIZE = int(os.environ.get('UPLOAD_HASH_CHUNK_SIZE', 1024 * 1024))
+
+
+def upload_digest(files: Sequence[IO]) -> str:
+    """
+    Hash the content of an upload's files with SHA-256, reading them a chunk at a time.
+
+    The files are rewound afterwards, so they can be ingested. An upload of several
+    files is hashed as the list of their own hashes, so the same files in the same
+    order always hash the same.
+
+    Returns:
+        str: the hex encoded SHA-256 digest
+    """
+    digests = []
+    for file in files:
+        digest = hashlib.sha256()
+        while chunk := file.read(UPLOAD_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        file.seek(0)
+        digests.append(digest.hexdigest())
+
+    if len(digests) == 1:
+        return digests[0]
+
+    return hashlib.sha256(','.join(digests).encode('ascii')).hexdigest()
+
+
+def ingest_batch_id(idempotency_key: Optional[str], digest: str) -> str:
+    """
+    Identify an upload by the client's idempotency key if it sent one, by its content otherwise.
+    """
+    return f'key:{idempotency_key}' if idempotency_key else f'sha256:{digest}'
+
+
+async def find_ingest_batch(db: AsyncSession, batch_id: str) -> Optional[IngestBatch]:
+    """
+    Read the committed upload of a batch, if any.
+    """
+    return await db.scalar(
+        select(IngestBatch).where(IngestBatch.id == batch_id).execution_options(
+            populate_existing=True
+        )
+    )
+
+
+async def begin_ingest_batch(db: AsyncSession, batch_id: str, digest: str) -> bool:
+    """
+    Record an upload of a batch in the session's transaction, before its claims are ingested.
+
+    The row is the lock of the batch: on PostgreSQL, inserting it waits for any
+    concurrent upload of the same batch to commit or roll back, so only one of them
+    ingests it. If that upload committed, nothing is inserted and the batch is
+    found by `find_ingest_batch`; if it rolled back, this upload goes ahead.
+
+    Arguments:
+        db (AsyncSession): the database session the claims are ingested with
+        batch_id (str): the `ingest_batch_id` of the upload
+        digest (str): the `upload_digest` of the upload
+
+    Returns:
+        bool: whether the upload was recorded, i.e. it's the one to ingest the batch
+    """
+    statement = (
+        upsert_insert(db, IngestBatch.__table__)
+        .values(id=batch_id, content_sha256=digest, created_at=utcnow())
+        .on_conflict_do_nothing(index_elements=[IngestBatch.id])
+        .returning(IngestBatch.id)
+    )
+    return (await db.execute(statement)).first() is not None
+
+
+async def complete_ingest_batch(db: AsyncSession, batch_id: str, summary: UploadSummary):
+    """
+    Store the summary returned for an upload, to be returned to its retries as is.
+    """
+    await db.execute(
+        update(IngestBatch)
+        .where(IngestBatch.id == batch_id)
+        .values(summary=summary.model_dump(mode='json'))
+    )
@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from itertools import islice
+from typing import IO, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.utilities import batched, iter_csv_rows
+from src.analytics import update_daily_stats
+from src.bulk import insert_claims
+from src.metrics import INGEST_ROWS, INGEST_STAGE_SECONDS
+from src.money import format_cents
+from src.models import ClaimModel, IngestSummary, RowError
+from src.outbox import enqueue_claim_events
+from src.repo import Claim
+from src.stats import update_provider_stats
+from src.validation import validate_claim_columns
+
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 1000))
+INGEST_MAX_BATCH_SIZE = int(os.environ.get('INGEST_MAX_BATCH_SIZE', 50000))
+INGEST_MAX_REPORTED_ERRORS = int(os.environ.get('INGEST_MAX_REPORTED_ERRORS', 1000))
+INGEST_VECTORIZED_VALIDATION = os.environ.get('INGEST_VECTORIZED_VALIDATION', 'true') == 'true'
+
+FINGERPRINT_FIELDS = ('submitted_procedure', 'quadrant', 'provider_npi', 'subscriber_number')
+FINGERPRINT_FEES = ('provider_fees', 'allowed_fees', 'member_coinsurance', 'member_copay')
+
+
+def claim_fingerprint(record: dict) -> str:
+    """
+    Hash the content identifying a Claim, so resubmitted claims can be detected.
+
+    The hash covers the service date, procedure, quadrant, provider, subscriber and
+    fees; amounts are compared in cents, so `$100` and `100.00` are the same claim.
+
+    Arguments:
+        record (dict): the `claim` column values of the Claim
+
+    Returns:
+        str: the hex encoded SHA-256 fingerprint
+    """
+    values = [record['service_date'].isoformat()]
+    values.extend(str(record[field] or '') for field in FINGERPRINT_FIELDS)
+    values.extend(format_cents(record[fee]) for fee in FINGERPRINT_FEES)
+
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+async def backfill_fingerprints(
+    db: AsyncSession, batch_size: int = INGEST_BATCH_SIZE
+) -> Tuple[int, int]:
+    """
+    Fingerprint the claims stored before fingerprints were introduced.
+
+    Claims are processed `batch_size` at a time in `id` order, committing after each
+    batch. A claim duplicating one that's already fingerprinted keeps a NULL
+    fingerprint; it's counted but left in place.
+
+    Arguments:
+        db (AsyncSession): the database session used to update the claims
+        batch_size (int): the number of claims fingerprinted per transaction
+
+    Returns:
+        Tuple[int, int]: the number of fingerprinted claims and of duplicates
+    """
+    filled = duplicates = 0
+    after = ''
+
+    while True:
+        claims = (
+            await db.execute(
+                select(Claim.__table__)
+                .where(Claim.fingerprint.is_(None), Claim.id > after)
+                .order_by(Claim.id)
+                .limit(batch_size)
+            )
+        ).mappings().all()
+        if not claims:
+            return filled, duplicates
+
+        after = claims[-1]['id']
+
+        fingerprints = {}
+        for claim in claims:
+            fingerprints.setdefault(claim_fingerprint(claim), claim)
+
+        stored = set(
+            await db.scalars(select(Claim.fingerprint).where(Claim.fingerprint.in_(fingerprints)))
+        )
+        updates = [
+            {
+                'claim_id': claim['id'],
+                'claim_service_date': claim['service_date'],
+                'claim_fingerprint': fingerprint,
+            }
+            for fingerprint, claim in fingerprints.items()
+            if fingerprint not in stored
+        ]
+
+        if updates:
+            # NOTE: matching on the whole primary key lets PostgreSQL prune to one partition
+            await db.execute(
+                update(Claim.__table__)
+                .where(
+                    Claim.id == bindparam('claim_id'),
+                    Claim.service_date == bindparam('claim_service_date'),
+                )
+                .values(fingerprint=bindparam('claim_fingerprint')),
+                updates,
+            )
+        await db.commit()
+
+        filled += len(updates)
+        duplicates += len(claims) - len(updates)
+
+
+def validate_claims(rows: Iterable[Tuple[int, dict]]) -> Tuple[List[dict], List[RowError]]:
+    """
+    Validate a batch of raw CSV rows one `ClaimModel` at a time.
+
+    This is the reference implementation of `validate_claim_columns`, used when
+    `INGEST_VECTORIZED_VALIDATION` is disabled.
+
+    Arguments:
+        rows (Iterable[Tuple[int, dict]]): the 1-based row number and raw values of each row
+
+    Returns:
+        Tuple[List[dict], List[RowError]]: the `claim` column values of the valid rows
+        and the errors of the rows that failed validation
+    """
+    records, errors = [], []
+    for row_number, row in rows:
+        try:
+            records.append(ClaimModel(**{**row, 'id': str(uuid.uuid4())}).to_record())
+
+        except ValidationError as error:
+            errors.extend(
+                RowError(
+                    row=row_number,
+                    field='.'.join(str(part) for part in detail['loc']) or None,
+                    message=detail['msg'],
+                )
+                for detail in error.errors()
+            )
+
+    return records, errors
+
+
+async def ingest_claims(
+    db: AsyncSession,
+    csv_file: IO,
+    batch_size: int = INGEST_BATCH_SIZE,
+    summary: Optional[IngestSummary] = None,
+    on_batch: Optional[Callable[[IngestSummary], Awaitable]] = None,
+    ingest_batch_id: Optional[str] = None,
+) -> IngestSummary:
+    """
+    Stream Claims from a CSV file into the database in bounded batches.
+
+    Rows are parsed lazily, validated and flushed `batch_size` at a time so memory
+    stays flat regardless of the size of the file. Invalid rows are skipped and
+    reported; the caller is responsible for committing the transaction, which also
+    holds the outbox events of the inserted claims. Reading, parsing and validating
+    run in a worker thread so the event loop isn't blocked.
+
+    Arguments:
+        db (AsyncSession): the database session used to persist the claims
+        csv_file (IO): the file-like object containing the CSV claims data
+        batch_size (int): the number of rows validated and persisted at a time
+        summary (IngestSummary): the progress of an interrupted ingest to resume; its
+            `rows` are skipped and its counts are added to
+        on_batch (Callable): awaited with the summary after each batch is persisted,
+            e.g. to commit it together with the ingest's progress
+        ingest_batch_id (str): the upload the claims are linked to, see `src.idempotency`
+
+    Raises:
+        ValueError: if the CSV content is invalid or can't be parsed
+
+    Returns:
+        IngestSummary: row counts and the per-row errors of the ingest
+    """
+    summary = summary or IngestSummary()
+    validate = validate_claim_columns if INGEST_VECTORIZED_VALIDATION else validate_claims
+
+    csv_rows = iter_csv_rows(csv_file)
+    batches = batched(islice(enumerate(csv_rows, start=1), summary.rows, None), batch_size)
+
+    try:
+        while validated := await asyncio.to_thread(_next_validated_batch, batches, validate):
+            rows, valid, records, errors = validated
+            if ingest_batch_id is not None:
+                for record in records:
+                    record['ingest_batch_id'] = ingest_batch_id
+
+            with INGEST_STAGE_SECONDS.labels('insert').time():
+                inserted = await insert_claims(db, records)
+            with INGEST_STAGE_SECONDS.labels('provider_stats').time():
+                await update_provider_stats(db, inserted)
+            with INGEST_STAGE_SECONDS.labels('daily_stats').time():
+                await update_daily_stats(db, inserted)
+            with INGEST_STAGE_SECONDS.labels('outbox').time():
+                await enqueue_claim_events(db, inserted)
+
+            summary.rows += rows
+            summary.inserted += len(inserted)
+            summary.failed += rows - valid
+            summary.duplicates += valid - len(inserted)
+            _report_errors(summary, errors)
+
+            INGEST_ROWS.labels('inserted').inc(len(inserted))
+            INGEST_ROWS.labels('failed').inc(rows - valid)
+            INGEST_ROWS.labels('duplicate').inc(valid - len(inserted))
+
+            if on_batch is not None:
+                await on_batch(summary)
+
+    finally:
+        # NOTE: release the CSV reader's hold on `csv_file` if the ingest stops early
+        csv_rows.close()
+
+    return summary
+
+
+def _next_validated_batch(
+    batches: Iterator[List[Tuple[int, dict]]], validate: Callable
+) -> Optional[Tuple[int, int, List[dict], List[RowError]]]:
+    """
+    Read, validate and fingerprint the next batch of rows, returning `None` once the
+    file is exhausted.
+
+    Returns:
+        Optional[Tuple[int, int, List[dict], List[RowError]]]: the number of rows and
+        of valid rows, the records of the valid rows less those repeated within the
+        batch, and the errors of the invalid rows
+    """
+    with INGEST_STAGE_SECONDS.labels('read_parse').time():
+        batch = next(batches, None)
+    if batch is None:
+        return None
+
+    with INGEST_STAGE_SECONDS.labels('validate').time():
+        records, errors = validate(batch)
+
+    with INGEST_STAGE_SECONDS.labels('fingerprint').time():
+        unique = {}
+        for record in records:
+            record['fingerprint'] = claim_fingerprint(record)
+            unique.setdefault(record['fingerprint'], record)
+
+    return len(batch), len(records), list(unique.values()), errors
+
+
+def _report_errors(summary: IngestSummary, errors: List[RowError]):
+    """
+    Record row errors on the summary, capped at `INGEST_MAX_REPORTED_ERRORS`.
+    """
+    remaining = INGEST_MAX_REPORTED_ERRORS - len(summary.errors)
+    if len(errors) > remaining:
+        summary.errors_truncated = True
+
+    summary.errors.extend(errors[:max(remaining, 0)])
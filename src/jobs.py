@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from typing import IO, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from common.utilities import utcnow
+from src.cache import PROVIDERS_KEY, cache
+from src.ingest import ingest_claims
+from src.models import IngestSummary, RowError
+from src.repo import IngestJob
+
+INGEST_SPOOL_DIRECTORY = os.environ.get(
+    'INGEST_SPOOL_DIRECTORY', os.path.join(tempfile.gettempdir(), 'claim-service-ingest')
+)
+INGEST_JOB_LEASE = int(os.environ.get('INGEST_JOB_LEASE', 300))
+INGEST_JOB_MAX_ATTEMPTS = int(os.environ.get('INGEST_JOB_MAX_ATTEMPTS', 3))
+INGEST_WORKER_POLL_INTERVAL = float(os.environ.get('INGEST_WORKER_POLL_INTERVAL', 1))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class LeaseLost(Exception):
+    """
+    Raised when another worker took over a job whose lease expired.
+    """
+
+
+class Interrupted(Exception):
+    """
+    Raised between batches when the worker is asked to stop.
+    """
+
+
+def spool_upload(csv_file: IO, job_id: str) -> str:
+    """
+    Copy an uploaded file to the spool directory shared with the workers.
+
+    Returns:
+        str: the path of the spooled file
+    """
+    os.makedirs(INGEST_SPOOL_DIRECTORY, exist_ok=True)
+    path = os.path.join(INGEST_SPOOL_DIRECTORY, f'{job_id}.csv')
+
+    with open(path, 'wb') as spooled:
+        shutil.copyfileobj(csv_file, spooled)
+
+    return path
+
+
+async def enqueue_ingest_job(
+    db: AsyncSession, csv_file: IO, filename: Optional[str], batch_size: int
+) -> IngestJob:
+    """
+    Spool an uploaded CSV file to disk and queue it for ingest.
+
+    Arguments:
+        db (AsyncSession): the database session the job is added to; the caller commits
+        csv_file (IO): the uploaded CSV claims data
+        filename (str): the name of the uploaded file
+        batch_size (int): the number of rows validated and persisted at a time
+
+    Returns:
+        IngestJob: the queued job
+    """
+    job_id = str(uuid.uuid4())
+    path = await asyncio.to_thread(spool_upload, csv_file, job_id)
+
+    job = IngestJob(
+        id=job_id,
+        status=QUEUED,
+        filename=filename,
+        path=path,
+        batch_size=batch_size,
+        rows=0,
+        inserted=0,
+        failed=0,
+        duplicates=0,
+        errors=[],
+        errors_truncated=False,
+        attempts=0,
+        created_at=utcnow(),
+    )
+    db.add(job)
+    await db.flush()
+
+    return job
+
+
+async def claim_next_job(db: AsyncSession) -> Optional[IngestJob]:
+    """
+    Take the lease of the oldest queued job, or of a running job whose worker died.
+
+    Jobs are claimed with a compare-and-set on `attempts`, so concurrent workers never
+    claim the same job; on PostgreSQL `SKIP LOCKED` also keeps them from contending.
+    Jobs that exhausted `INGEST_JOB_MAX_ATTEMPTS` are failed instead.
+
+    Returns:
+        Optional[IngestJob]: the claimed job, or `None` if there's nothing to do
+    """
+    while True:
+        now = utcnow()
+        job = await db.scalar(
+            select(IngestJob)
+            .where(
+                or_(
+                    IngestJob.status == QUEUED,
+                    and_(IngestJob.status == RUNNING, IngestJob.lease_expires_at < now),
+                )
+            )
+            .order_by(IngestJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if job is None:
+            await db.commit()
+            return None
+
+        if job.attempts >= INGEST_JOB_MAX_ATTEMPTS:
+            values = {
+                'status': FAILED,
+                'error': f'Gave up after {job.attempts} attempt(s)',
+                'finished_at': now,
+            }
+        else:
+            values = {
+                'status': RUNNING,
+                'attempts': job.attempts + 1,
+                'lease_expires_at': now + timedelta(seconds=INGEST_JOB_LEASE),
+                'started_at': job.started_at or now,
+                'updated_at': now,
+            }
+
+        result = await db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job.id, IngestJob.attempts == job.attempts)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        if result.rowcount == 1 and values['status'] == RUNNING:
+            await db.refresh(job)
+            return job
+
+
+async def run_ingest_job(
+    session_factory: async_sessionmaker, job: IngestJob, stop: Optional[asyncio.Event] = None
+) -> str:
+    """
+    Ingest a claimed job's spooled file, resuming after the rows it already processed.
+
+    Each batch of claims commits together with the job's progress, and only while the
+    worker still holds the job's lease, so a job taken over after a crash neither
+    loses nor duplicates rows.
+
+    Arguments:
+        session_factory (async_sessionmaker): opens the worker's database session
+        job (IngestJob): the job returned by `claim_next_job`
+        stop (asyncio.Event): when set, the job is put back on the queue after the
+            current batch, to be resumed by another worker
+
+    Returns:
+        str: the job's final status, `queued` if it was interrupted, or `running` if
+        its lease was lost
+    """
+    logging.info(
+        'Running ingest job %s (attempt %s) from row %s', job.id, job.attempts, job.rows
+    )
+
+    summary = IngestSummary(
+        rows=job.rows,
+        inserted=job.inserted,
+        failed=job.failed,
+        duplicates=job.duplicates,
+        errors=[RowError(**error) for error in job.errors],
+        errors_truncated=job.errors_truncated,
+    )
+
+    async with session_factory() as db:
+
+        async def save_progress(summary: IngestSummary, **values):
+            now = utcnow()
+            result = await db.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job.id, IngestJob.attempts == job.attempts)
+                .values(
+                    rows=summary.rows,
+                    inserted=summary.inserted,
+                    failed=summary.failed,
+                    duplicates=summary.duplicates,
+                    errors=[error.model_dump() for error in summary.errors],
+                    errors_truncated=summary.errors_truncated,
+                    lease_expires_at=now + timedelta(seconds=INGEST_JOB_LEASE),
+                    updated_at=now,
+                    **values,
+                )
+            )
+            if result.rowcount != 1:
+                raise LeaseLost(f'Lost the lease of ingest job {job.id}')
+
+            await db.commit()
+
+            if stop is not None and stop.is_set() and 'status' not in values:
+                raise Interrupted
+
+        try:
+            with open(job.path, 'rb') as csv_file:
+                summary = await ingest_claims(
+                    db, csv_file, batch_size=job.batch_size, summary=summary, on_batch=save_progress
+                )
+            status, error = SUCCEEDED, None
+
+        except ValueError as exception:
+            await db.rollback()
+            status, error = FAILED, f'Error processing file: {exception}'
+
+        except LeaseLost as exception:
+            await db.rollback()
+            logging.warning(str(exception))
+            return RUNNING
+
+        except Interrupted:
+            await db.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job.id, IngestJob.attempts == job.attempts)
+                .values(status=QUEUED, lease_expires_at=None)
+            )
+            await db.commit()
+            logging.info('Returned ingest job %s to the queue at row %s', job.id, summary.rows)
+            return QUEUED
+
+        await save_progress(summary, status=status, error=error, finished_at=utcnow())
+
+    os.remove(job.path)
+
+    if summary.inserted:
+        await cache.invalidate(PROVIDERS_KEY)
+
+    logging.info(
+        f'Ingest job {job.id} {status}; rows: {summary.rows}, inserted: {summary.inserted}, '
+        f'failed: {summary.failed}, duplicates: {summary.duplicates}'
+    )
+    return status
+
+
+async def process_next_job(
+    session_factory: async_sessionmaker, stop: Optional[asyncio.Event] = None
+) -> bool:
+    """
+    Claim and run the next ingest job, if there is one.
+
+    Returns:
+        bool: whether a job was processed
+    """
+    async with session_factory() as db:
+        job = await claim_next_job(db)
+
+    if job is None:
+        return False
+
+    await run_ingest_job(session_factory, job, stop)
+    return True
+
+
+async def run_worker(session_factory: async_sessionmaker, stop: asyncio.Event):
+    """
+    Process ingest jobs until `stop` is set, polling while the queue is empty.
+    """
+    while not stop.is_set():
+        try:
+            if await process_next_job(session_factory, stop):
+                continue
+
+        except Exception:
+            # NOTE: the job's lease expires and it's retried by the next worker to poll
+            logging.exception('Ingest job failed')
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=INGEST_WORKER_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,181 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, Select, String, any_, bindparam, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models import ClaimFilters
+from src.repo import Claim
+from src.responses import CLAIM_COLUMNS, dumps
+
+CLAIMS_PAGE_SIZE = int(os.environ.get('CLAIMS_PAGE_SIZE', 100))
+CLAIMS_MAX_PAGE_SIZE = int(os.environ.get('CLAIMS_MAX_PAGE_SIZE', 1000))
+CLAIMS_STREAM_BATCH_SIZE = int(os.environ.get('CLAIMS_STREAM_BATCH_SIZE', 1000))
+CLAIMS_BATCH_MAX_IDS = int(os.environ.get('CLAIMS_BATCH_MAX_IDS', 5000))
+
+Keyset = Tuple[datetime, str]
+
+
+def encode_cursor(claim: Row) -> str:
+    """
+    Encode the keyset `(service_date, id)` of the last Claim of a page as an opaque cursor.
+    """
+    keyset = json.dumps([claim.service_date.isoformat(), claim.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(keyset.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Keyset:
+    """
+    Decode a cursor returned by `encode_cursor`.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        service_date, claim_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(service_date), str(claim_id)
+
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as error:
+        raise ValueError(f'Invalid cursor: {cursor}') from error
+
+
+def claims_query(
+    filters: ClaimFilters,
+    after: Optional[Keyset] = None,
+    columns: Sequence = CLAIM_COLUMNS,
+    descending: bool = False,
+) -> Select:
+    """
+    Select the columns of the Claims matching `filters` in keyset `(service_date, id)` order.
+
+    Arguments:
+        filters (ClaimFilters): the provider, subscriber, plan group and service date filters
+        after (Keyset): only select Claims after this `(service_date, id)` keyset, in
+            the order of the query
+        columns (Sequence): the columns to select; those of the JSON responses by default
+        descending (bool): select the most recent Claims first
+
+    Returns:
+        Select: the ordered query; it's served by the `(..., service_date, id)` indexes
+    """
+    if descending:
+        query = select(*columns).order_by(Claim.service_date.desc(), Claim.id.desc())
+    else:
+        query = select(*columns).order_by(Claim.service_date, Claim.id)
+
+    if filters.provider_npi is not None:
+        query = query.where(Claim.provider_npi == filters.provider_npi)
+    if filters.subscriber_number is not None:
+        query = query.where(Claim.subscriber_number == filters.subscriber_number)
+    if filters.plan_group is not None:
+        query = query.where(Claim.plan_group == filters.plan_group)
+    if filters.service_date_from is not None:
+        query = query.where(Claim.service_date >= filters.service_date_from)
+    if filters.service_date_to is not None:
+        query = query.where(Claim.service_date < filters.service_date_to)
+
+    if after is not None and descending:
+        query = query.where(tuple_(Claim.service_date, Claim.id) < tuple_(*after))
+    elif after is not None:
+        query = query.where(tuple_(Claim.service_date, Claim.id) > tuple_(*after))
+
+    return query
+
+
+async def list_claims(
+    db: AsyncSession,
+    filters: ClaimFilters,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+) -> Tuple[List[Row], Optional[str]]:
+    """
+    Fetch a page of Claims.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the claims
+        filters (ClaimFilters): the filters the Claims must match
+        limit (int): the maximum number of Claims in the page
+        cursor (str): the `next_cursor` of the previous page, if any
+        descending (bool): list the most recent Claims first
+
+    Raises:
+        ValueError: if the cursor is malformed
+
+    Returns:
+        Tuple[List[Row], Optional[str]]: the page of Claim rows and the cursor of the
+        next page, or `None` if this is the last page
+    """
+    after = decode_cursor(cursor) if cursor else None
+
+    # NOTE: fetch one extra row to tell whether there's a next page
+    query = claims_query(filters, after, descending=descending)
+    claims = (await db.execute(query.limit(limit + 1))).all()
+
+    if len(claims) > limit:
+        claims = claims[:limit]
+        return claims, encode_cursor(claims[-1])
+
+    return claims, None
+
+
+async def get_claims_by_ids(db: AsyncSession, ids: Sequence[str]) -> Tuple[List[Row], List[str]]:
+    """
+    Fetch the Claims of many IDs with a single query.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the claims
+        ids (Sequence[str]): the claim IDs, in the order the Claims are returned in
+
+    Returns:
+        Tuple[List[Row], List[str]]: the Claim rows, in the order of their IDs and,
+        for Claims sharing an ID, of their service date; and the IDs without Claims
+    """
+    ids = list(dict.fromkeys(ids))
+    query = select(*CLAIM_COLUMNS).order_by(Claim.service_date)
+
+    # NOTE: PostgreSQL binds the IDs as one array, so the statement is the same for any count
+    if db.get_bind().dialect.name == 'postgresql':
+        query = query.where(Claim.id == any_(bindparam('ids', ids, type_=ARRAY(String))))
+    else:
+        query = query.where(Claim.id.in_(ids))
+
+    claims = {claim_id: [] for claim_id in ids}
+    for claim in (await db.execute(query)).all():
+        claims[claim.id].append(claim)
+
+    return (
+        [claim for rows in claims.values() for claim in rows],
+        [claim_id for claim_id, rows in claims.items() if not rows],
+    )
+
+
+def stream_claims_ndjson(
+    session_factory: async_sessionmaker, filters: ClaimFilters, cursor: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream every matching Claim as newline delimited JSON.
+
+    Rows are fetched from a server-side cursor `CLAIMS_STREAM_BATCH_SIZE` at a time,
+    so memory use doesn't grow with the size of the result. The stream opens its own
+    session because it outlives the request's.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    after = decode_cursor(cursor) if cursor else None
+    query = claims_query(filters, after).execution_options(yield_per=CLAIMS_STREAM_BATCH_SIZE)
+
+    async def lines() -> AsyncIterator[bytes]:
+        async with session_factory() as db:
+            # NOTE: one chunk per fetched batch rather than per line
+            async for claims in (await db.stream(query)).partitions():
+                yield b''.join(dumps(claim._asdict()) + b'\n' for claim in claims)
+
+    return lines()
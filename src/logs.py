@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Sequence
+
+from src.metrics import LOG_RECORDS_DROPPED
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_PAYLOAD_IDS = int(os.environ.get('LOG_PAYLOAD_IDS', 5))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# NOTE: the attributes every LogRecord has; any other attribute was passed in `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName', 'sample'}
+
+_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+class Summary:
+    """
+    A payload logged as its size and first few IDs, rendered only if the record is emitted.
+    """
+
+    __slots__ = ('items', 'key', 'limit')
+
+    def __init__(self, items: Sequence, key: str, limit: int):
+        self.items = items
+        self.key = key
+        self.limit = limit
+
+    def __str__(self) -> str:
+        ids = [
+            str(item[self.key] if isinstance(item, dict) else getattr(item, self.key))
+            for item in self.items[:self.limit]
+        ]
+        more = len(self.items) - len(ids)
+        return f"{len(self.items)} [{', '.join(ids)}{f', +{more} more' if more else ''}]"
+
+
+def summarize(items: Sequence, key: str = 'id', limit: Optional[int] = None) -> Summary:
+    """
+    Summarize a list of records for a log record, instead of logging every record.
+
+    Arguments:
+        items (Sequence): the records, as dicts or objects
+        key (str): the key or attribute identifying a record
+        limit (int): the number of IDs to include (default: `LOG_PAYLOAD_IDS`)
+
+    Returns:
+        Summary: the count and first IDs of the records, formatted lazily
+    """
+    return Summary(items, key, LOG_PAYLOAD_IDS if limit is None else limit)
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    """
+    The structured fields passed to a log call in `extra`.
+    """
+    return {name: value for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The plain text format, with the record's fields appended as `name=value` pairs.
+    """
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = record_fields(record)
+        if not fields:
+            return message
+
+        return f"{message} {' '.join(f'{name}={value}' for name, value in fields.items())}"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the record's fields as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a share of the records logged with `extra={'sample': True}`.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, 'sample', False) or random.random() < self.rate
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hand records to the listener's thread, dropping them rather than blocking when it falls behind.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # NOTE: records stay in the process, so formatting is left to the listener's
+        # thread; log arguments must not be mutated after they're logged
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(
+    level: str = LOG_LEVEL, format: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE
+) -> bool:
+    """
+    Route the process's log records through a queue to a stream handler on a background thread.
+
+    Log I/O and formatting never run on the caller's thread (the event loop, for the
+    API); the caller only filters the record and puts it on the queue. Called by the
+    entrypoints and the API's lifespan rather than on import, so importing a module
+    starts no thread; the caller that started the listener stops it with `stop_logging`.
+
+    Arguments:
+        level (str): the root logger's level
+        format (str): `text` or `json`
+        sample_rate (float): the share of sampled records that are kept
+
+    Returns:
+        bool: whether the listener was started, i.e. it wasn't running already
+    """
+    global _handler, _listener
+    if _listener is not None:
+        return False
+
+    sink = logging.StreamHandler()
+    sink.setFormatter(JsonFormatter() if format == 'json' else TextFormatter(TEXT_FORMAT))
+
+    _handler = BackgroundHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(SamplingFilter(sample_rate))
+    _listener = QueueListener(_handler.queue, sink)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+
+    _listener.start()
+    return True
+
+
+def stop_logging():
+    """
+    Flush the queued records and stop the background thread.
+    """
+    global _handler, _listener
+    if _listener is None:
+        return
+
+    logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+    _handler = _listener = None
@@ -1,44 +1,293 @@
+import asyncio
 import logging
 import os
-import uuid
-from typing import Dict, Any, List
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Annotated, Dict, Any, List, Literal, Optional
 
 import redis.asyncio as redis
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Query
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy import func, desc
-
-from common.utilities import parse_csv_file_to_json
-from src import repo
-from src.db import init_db, db_dependency
-from src.models import ClaimModel, ProviderQuery
-from src.repo import Claim
-
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from fastapi import FastAPI, Depends, HTTPException, File, Header, UploadFile, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy import select
+
+from src import repo, stats
+from src.analytics import query_daily_stats
+from src.cache import CACHE_CLAIM_TTL, CACHE_PROVIDERS_TTL, PROVIDERS_KEY, cache, claim_key
+from src.db import (
+    DB_CHECK_SCHEMA,
+    check_replicas,
+    db_dependency,
+    dispose_engine,
+    get_engines,
+    init_db,
+    monitor_replicas,
+    pin_writers_to_primary,
+    read_db_dependency,
+    read_session_factory_dependency,
+    warm_pool,
 )
+from src.export import EXPORT_FORMATS, export_claims
+from src.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    begin_ingest_batch,
+    complete_ingest_batch,
+    find_ingest_batch,
+    ingest_batch_id,
+    upload_digest,
+)
+from src.ingest import INGEST_BATCH_SIZE, INGEST_MAX_BATCH_SIZE, ingest_claims
+from src.jobs import enqueue_ingest_job
+from src.listing import (
+    CLAIMS_BATCH_MAX_IDS,
+    CLAIMS_MAX_PAGE_SIZE,
+    CLAIMS_PAGE_SIZE,
+    get_claims_by_ids,
+    list_claims,
+    stream_claims_ndjson,
+)
+from src.logs import configure_logging, stop_logging, summarize
+from src.metrics import (
+    INGEST_STAGE_SECONDS,
+    INGEST_THROUGHPUT,
+    QUERY_SECONDS,
+    UPLOAD_REPLAYS,
+    instrument_request,
+    mark_process_dead,
+    register_collectors,
+    render_metrics,
+)
+from src.models import (
+    AnalyticsBucket,
+    ClaimBatchRequest,
+    ClaimFilters,
+    IngestSummary,
+    ProviderQuery,
+    UploadSummary,
+)
+from src.outbox import replay_events
+from src.ratelimit import ClientAllowance, RateLimit, rate_limiter
+from src.responses import (
+    CLAIM_COLUMNS,
+    ORJSONResponse,
+    analytics_rows,
+    claim_rows,
+    dumps,
+    json_response,
+    provider_rows,
+)
+from src.uploads import add_file_summary, iter_csv_files, upload_format
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare a worker before it accepts traffic, and release its connections once it's drained.
+
+    Startup has no side effects on the database: the schema version is only read, and
+    not at all when `src.server` already checked it for every worker. The pool is
+    warmed so the first requests don't pay for connecting. On shutdown the server
+    first stops accepting connections and waits for in-flight requests.
+    """
+    # NOTE: a single worker runs in the process of `src.server`, which already logs
+    logging_started = configure_logging()
+
+    if DB_CHECK_SCHEMA:
+        await init_db()
+    connections = await warm_pool()
+    await check_replicas()
+    replica_monitor = asyncio.create_task(monitor_replicas())
 
-@app.on_event('startup')
-async def on_startup():
-    init_db()
     redis_connection = redis.from_url(
         os.environ['REDIS_URL'], encoding='utf-8', decode_responses=True
     )
-    await FastAPILimiter.init(redis_connection)
+    cache.connect(redis_connection)
+    rate_limiter.connect(redis_connection)
+
+    logging.info('Worker %s ready with %s pooled connection(s)', os.getpid(), connections)
+
+    try:
+        yield
+    finally:
+        replica_monitor.cancel()
+        await redis_connection.aclose()
+        await dispose_engine()
+        mark_process_dead()
+        if logging_started:
+            stop_logging()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.middleware('http')(pin_writers_to_primary)
+app.middleware('http')(instrument_request)
+
+register_collectors(cache, get_engines)
+
+providers_rate_limiter = RateLimit('providers')
+claim_rows_rate_limiter = RateLimit('claim_rows')
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def metrics() -> Response:
+    """
+    Expose the service's metrics in the Prometheus text format.
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get('/claims')
+async def search_claims(
+    db: read_db_dependency,
+    session_factory: read_session_factory_dependency,
+    provider_npi: Optional[str] = None,
+    subscriber_number: Optional[str] = None,
+    plan_group: Optional[str] = None,
+    service_date_from: Optional[datetime] = None,
+    service_date_to: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description='The `next_cursor` of the previous page'),
+    limit: int = Query(CLAIMS_PAGE_SIZE, ge=1, le=CLAIMS_MAX_PAGE_SIZE),
+    format: Literal['json', 'ndjson'] = 'json',
+):
+    """
+    List Claims in `(service_date, id)` order, optionally filtered.
+
+    Pages are fetched by keyset rather than OFFSET, so deep pages cost as much as the
+    first. With `format=ndjson` every matching Claim after `cursor` is streamed one
+    JSON object per line instead, and `limit` doesn't apply.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the claims
+        session_factory (async_sessionmaker): opens the session of a streamed response
+        provider_npi (str): only list the Claims of this provider
+        subscriber_number (str): only list the Claims of this subscriber
+        plan_group (str): only list the Claims of this plan group
+        service_date_from (datetime): only list Claims serviced at or after this date
+        service_date_to (datetime): only list Claims serviced before this date
+        cursor (str): the opaque cursor of the page to fetch
+        limit (int): the maximum number of Claims in a page
+        format (str): `json` for a page of Claims, `ndjson` to stream them all
+
+    Raises:
+        HTTPException:
+            - 400: if the cursor is malformed
+
+    Returns:
+        Dict[str, Any]: the page of `claims` and the `next_cursor`, which is `None`
+        on the last page; or a streamed NDJSON response
+    """
+    filters = ClaimFilters(
+        provider_npi=provider_npi,
+        subscriber_number=subscriber_number,
+        plan_group=plan_group,
+        service_date_from=service_date_from,
+        service_date_to=service_date_to,
+    )
+    logging.info(
+        'Received GET claims listing request',
+        extra={'sample': True, 'filters': filters, 'format': format},
+    )
+
+    try:
+        if format == 'ndjson':
+            return StreamingResponse(
+                stream_claims_ndjson(session_factory, filters, cursor),
+                media_type='application/x-ndjson',
+            )
+
+        with QUERY_SECONDS.labels('list_claims').time():
+            claims, next_cursor = await list_claims(db, filters, limit, cursor)
+
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    return json_response(dumps({'claims': claim_rows(claims), 'next_cursor': next_cursor}))
+
+
+@app.get('/claims/export')
+async def export_claims_file(
+    session_factory: read_session_factory_dependency,
+    format: Literal['parquet', 'arrow', 'csv'] = 'parquet',
+    provider_npi: Optional[str] = None,
+    subscriber_number: Optional[str] = None,
+    plan_group: Optional[str] = None,
+    service_date_from: Optional[datetime] = None,
+    service_date_to: Optional[datetime] = None,
+) -> StreamingResponse:
+    """
+    Export the matching Claims as a file, for bulk consumers.
+
+    Arguments:
+        session_factory (async_sessionmaker): opens the session of the streamed response
+        format (str): `parquet`, `arrow` (an Arrow IPC stream) or `csv` (gzip compressed)
+        provider_npi (str): only export the Claims of this provider
+        subscriber_number (str): only export the Claims of this subscriber
+        plan_group (str): only export the Claims of this plan group
+        service_date_from (datetime): only export Claims serviced at or after this date
+        service_date_to (datetime): only export Claims serviced before this date
+
+    Returns:
+        StreamingResponse: the file, in `(service_date, id)` order
+    """
+    filters = ClaimFilters(
+        provider_npi=provider_npi,
+        subscriber_number=subscriber_number,
+        plan_group=plan_group,
+        service_date_from=service_date_from,
+        service_date_to=service_date_to,
+    )
+    logging.info('Received claims export request', extra={'filters': filters, 'format': format})
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_claims(session_factory, filters, format),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="claims.{extension}"'},
+    )
+
+
+@app.post('/claims/batch')
+async def get_claims_batch(batch: ClaimBatchRequest, db: read_db_dependency):
+    """
+    Retrieve the claims of many unique identifiers at once.
+
+    The claims are fetched with a single query, in the order of their identifiers;
+    repeated identifiers are only looked up once. It's a `POST` so thousands of
+    identifiers fit in the body, but it only reads and can be served by a replica.
+
+    Arguments:
+        batch (ClaimBatchRequest): the unique identifiers of the claims to retrieve
+        db (AsyncSession): the database session used to query the claims
+
+    Raises:
+        HTTPException:
+            - 400: if more than `CLAIMS_BATCH_MAX_IDS` identifiers are sent
+
+    Returns:
+        Dict[str, Any]: the `claims` found and the identifiers `missing` any claim
+    """
+    if len(batch.ids) > CLAIMS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f'At most {CLAIMS_BATCH_MAX_IDS} claim IDs can be retrieved at once.',
+        )
+
+    logging.info('Received claims batch request', extra={'sample': True, 'ids': len(batch.ids)})
+
+    with QUERY_SECONDS.labels('get_claims_batch').time():
+        claims, missing = await get_claims_by_ids(db, batch.ids)
+
+    return json_response(dumps({'claims': claim_rows(claims), 'missing': missing}))
 
 
 @app.get('/claims/{claim_id}')
-async def get_claims(claim_id: str, db: db_dependency) -> List[dict]:
+async def get_claims(claim_id: str, db: read_db_dependency) -> List[dict]:
     """
     Retrieve a claim by its unique identifier.
 
     Arguments:
         claim_id (str): the unique identifier of the claim to retrieve
-        db (Session): the database session used to query the claims
+        db (AsyncSession): the database session used to query the claims
 
     Raises:
         HTTPException:
@@ -48,154 +297,352 @@ async def get_claims(claim_id: str, db: db_dependency) -> List[dict]:
         List[dict]: a list of dictionaries representing the claim(s) found
         with the specified claim_id
     """
-    logging.info(f'Received GET claims request; claim_id: {claim_id}')
-    result = db.query(repo.Claim).filter(repo.Claim.id == claim_id).all()
-    result_dict = [claim.dict() for claim in result]
+    logging.info('Received GET claims request', extra={'sample': True, 'claim_id': claim_id})
+
+    cached = await cache.get_serialized(claim_key(claim_id))
+    if cached is not None:
+        return json_response(cached)
+
+    with QUERY_SECONDS.labels('get_claim').time():
+        result = (
+            await db.execute(select(*CLAIM_COLUMNS).where(repo.Claim.id == claim_id))
+        ).all()
+    result_dict = claim_rows(result)
 
     if not result:
         raise HTTPException(status_code=404, detail='Claims not found.')
 
-    logging.info(f'GET claims results: {result_dict}')
+    logging.info('GET claims results', extra={'sample': True, 'claims': summarize(result_dict)})
 
-    return result_dict
+    body = dumps(result_dict)
+    await cache.set_serialized(claim_key(claim_id), body, ttl=CACHE_CLAIM_TTL)
+
+    return json_response(body)
+
+
+@app.get('/subscribers/{subscriber_number}/claims')
+async def get_subscriber_claims(
+    subscriber_number: str,
+    db: read_db_dependency,
+    service_date_from: Optional[datetime] = None,
+    service_date_to: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description='The `next_cursor` of the previous page'),
+    limit: int = Query(CLAIMS_PAGE_SIZE, ge=1, le=CLAIMS_MAX_PAGE_SIZE),
+):
+    """
+    List the claim history of a subscriber, most recent first.
+
+    The history is read from the `(subscriber_number, service_date)` index, ordered
+    and limited by the database, and paged by keyset like `GET /claims`.
+
+    Arguments:
+        subscriber_number (str): the subscriber whose Claims are listed
+        db (AsyncSession): the database session used to query the claims
+        service_date_from (datetime): only list Claims serviced at or after this date
+        service_date_to (datetime): only list Claims serviced before this date
+        cursor (str): the opaque cursor of the page to fetch
+        limit (int): the maximum number of Claims in a page
+
+    Raises:
+        HTTPException:
+            - 400: if the cursor is malformed
+
+    Returns:
+        Dict[str, Any]: the page of `claims` in `(service_date, id)` descending order
+        and the `next_cursor`, which is `None` on the last page
+    """
+    filters = ClaimFilters(
+        subscriber_number=subscriber_number,
+        service_date_from=service_date_from,
+        service_date_to=service_date_to,
+    )
+    logging.info('Received subscriber claims request', extra={'sample': True, 'filters': filters})
+
+    try:
+        with QUERY_SECONDS.labels('subscriber_claims').time():
+            claims, next_cursor = await list_claims(db, filters, limit, cursor, descending=True)
+
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    return json_response(dumps({'claims': claim_rows(claims), 'next_cursor': next_cursor}))
 
 
 @app.post('/claims')
 async def post_claims(
-    db: db_dependency, csv_file: UploadFile = File(...)
+    db: db_dependency,
+    allowance: Annotated[ClientAllowance, Depends(claim_rows_rate_limiter)],
+    csv_file: List[UploadFile] = File(
+        ..., description='CSV files, gzip compressed CSV files or zip archives of CSV files'
+    ),
+    batch_size: int = Query(
+        INGEST_BATCH_SIZE,
+        ge=1,
+        le=INGEST_MAX_BATCH_SIZE,
+        description='Number of rows validated and persisted at a time',
+    ),
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias=IDEMPOTENCY_KEY_HEADER,
+        description='Identifies the upload across retries; defaults to a hash of its files',
+    ),
+) -> Dict[str, Any]:
+    """
+    Process and store Claims from one or more CSV files.
+
+    Any number of files can be uploaded at once, each a CSV file, a gzip compressed
+    one or a zip archive of CSV files; compressed files are decompressed as they're
+    parsed. Every file is streamed and persisted in batches; rows that fail validation
+    are skipped and reported in the response rather than failing the whole upload, and
+    claims that were already submitted are skipped and counted as duplicates. All the
+    files are committed together.
+
+    Uploads are idempotent: one identified by the same `Idempotency-Key`, or without a
+    key by the same SHA-256 of its files, as an upload that was already committed gets
+    that upload's summary back, without its files being parsed again. Concurrent
+    uploads of the same batch wait for the first one instead of ingesting it again.
+
+    Arguments:
+        db (AsyncSession): the database session used to persist the claims
+        allowance (ClientAllowance): the client's allowance of rows, spent batch by batch
+        csv_file (List[UploadFile]): the uploaded files containing claims data
+        batch_size (int): the number of rows validated and persisted at a time
+        idempotency_key (str): the client's identifier of the upload, if any
+
+    Raises:
+        HTTPException:
+            - 400: if an uploaded file is not a CSV, gzip or zip file
+            - 400: if an error occurs while processing a file
+            - 422: if the idempotency key was used for an upload of other files
+            - 429: if the client has used up its allowance of rows, before or during the
+              upload, in which case none of its claims are kept
+
+    Returns:
+        Dict[str, Any]: a summary of the processed rows, including row and duplicate
+        counts and the per-row validation errors, in total and for each CSV file
+    """
+    logging.info(
+        'Received POST claims request',
+        extra={'upload': ', '.join(str(upload.filename) for upload in csv_file)},
+    )
+
+    formats = [
+        upload_format(upload.file, upload.filename, upload.content_type) for upload in csv_file
+    ]
+    if None in formats:
+        raise HTTPException(status_code=400, detail='File type must be CSV, gzip or zip.')
+
+    started = time.perf_counter()
+
+    with INGEST_STAGE_SECONDS.labels('hash').time():
+        digest = await asyncio.to_thread(upload_digest, [upload.file for upload in csv_file])
+    batch_id = ingest_batch_id(idempotency_key, digest)
+
+    batch = await find_ingest_batch(db, batch_id)
+    if batch is None and not await begin_ingest_batch(db, batch_id, digest):
+        # NOTE: a concurrent upload of the same batch committed while this one waited
+        batch = await find_ingest_batch(db, batch_id)
+    if batch is not None:
+        return _replay_upload(batch, digest)
+
+    summary = UploadSummary()
+    spent = 0
+
+    async def spend_rows(file_summary: IngestSummary):
+        # NOTE: the rows are spent as they're persisted, so an upload over the allowance
+        # is rejected part way and rolled back rather than accepted in full
+        nonlocal spent
+        rows = summary.rows + file_summary.rows
+        await allowance.spend(rows - spent)
+        spent = rows
+
+    # normalize, validate and persist Claim input in batches, one CSV file at a time
+    try:
+        for upload, format in zip(csv_file, formats):
+            for name, stream in iter_csv_files(upload.file, upload.filename, format):
+                add_file_summary(
+                    summary,
+                    name,
+                    await ingest_claims(
+                        db,
+                        stream,
+                        batch_size=batch_size,
+                        on_batch=spend_rows,
+                        ingest_batch_id=batch_id,
+                    ),
+                )
+
+    except ValueError as error:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f'Error processing file: {error}')
+
+    except HTTPException:
+        await db.rollback()
+        raise
+
+    await complete_ingest_batch(db, batch_id, summary)
+
+    with INGEST_STAGE_SECONDS.labels('commit').time():
+        await db.commit()
+
+    elapsed = time.perf_counter() - started
+    if summary.rows and elapsed > 0:
+        INGEST_THROUGHPUT.observe(summary.rows / elapsed)
+
+    if summary.inserted:
+        await cache.invalidate(PROVIDERS_KEY)
+
+    # NOTE: the claims' events were written to the outbox in the same transaction;
+    # they're published to downstream services by `python -m src.publisher`
+
+    logging.info(
+        'Processed claims',
+        extra={
+            'rows': summary.rows,
+            'inserted': summary.inserted,
+            'failed': summary.failed,
+            'duplicates': summary.duplicates,
+            'files': len(summary.files),
+        },
+    )
+
+    with INGEST_STAGE_SECONDS.labels('serialize').time():
+        return json_response(dumps(summary.dict()))
+
+
+def _replay_upload(batch: repo.IngestBatch, digest: str) -> Response:
+    """
+    Answer a retried upload with the summary stored for the batch.
+    """
+    if batch.content_sha256 != digest:
+        raise HTTPException(
+            status_code=422,
+            detail=f'{IDEMPOTENCY_KEY_HEADER} was already used for an upload of other files.',
+        )
+
+    logging.info('Replaying upload', extra={'batch': batch.id})
+    UPLOAD_REPLAYS.inc()
+
+    response = json_response(dumps(batch.summary))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@app.post('/ingest', status_code=202)
+async def post_ingest(
+    db: db_dependency,
+    response: Response,
+    csv_file: UploadFile = File(...),
+    batch_size: int = Query(
+        INGEST_BATCH_SIZE,
+        ge=1,
+        le=INGEST_MAX_BATCH_SIZE,
+        description='Number of rows validated and persisted at a time',
+    ),
 ) -> Dict[str, Any]:
     """
-    Process and store Claims from a CSV file.
+    Queue a CSV file of Claims to be ingested by the worker pool.
+
+    The upload is spooled to disk and the job returned right away; poll
+    `GET /ingest/{job_id}` for its progress.
 
     Arguments:
-        db (Session): the database session used to persist the claims
+        db (AsyncSession): the database session the job is queued with
+        response (Response): the response, whose `Location` is set to the job's URL
         csv_file (UploadFile): the uploaded CSV file containing claims data
+        batch_size (int): the number of rows validated and persisted at a time
 
     Raises:
         HTTPException:
             - 400: if the uploaded file is not of type CSV
-            - 400: if an error occurs while processing the file
 
     Returns:
-        Dict[str, Any]: a dictionary containing a list of the processed claims data
+        Dict[str, Any]: the queued ingest job
     """
-    logging.info(f'Received POST claims request: {csv_file}')
+    logging.info('Received POST ingest request', extra={'upload': csv_file.filename})
 
     if csv_file.content_type != 'text/csv':
         raise HTTPException(status_code=400, detail='File type must be CSV.')
 
-    # normalize and validate Claim input
-    try:
-        claims = [
-            ClaimModel(**{**claim, 'id': str(uuid.uuid4())})
-            for claim in parse_csv_file_to_json(csv_file.file)
-        ]
-        claim_dict = [claim.dict() for claim in claims]
+    job = await enqueue_ingest_job(db, csv_file.file, csv_file.filename, batch_size)
+    await db.commit()
 
-    except Exception as error:
-        raise HTTPException(status_code=400, detail=f'Error processing file: {error}')
+    logging.info('Queued ingest job %s', job.id)
 
-    # persist Claims to database
-    db_claims = []
-    for claim in claims:
-        # TODO: add class methods to Pydantic models to convert to persisted models
-        db_claim = Claim(
-            allowed_fees=claim.allowed_fees,
-            id=claim.id,
-            member_coinsurance=claim.member_coinsurance,
-            member_copay=claim.member_copay,
-            net_fee=claim.net_fee,
-            plan_group=claim.plan_group,
-            provider_fees=claim.provider_fees,
-            provider_npi=claim.provider_npi,
-            quadrant=claim.quadrant,
-            service_date=claim.service_date,
-            submitted_procedure=claim.submitted_procedure,
-            subscriber_number=claim.subscriber_number,
-        )
-        db_claims.append(db_claim)
-
-    # TODO: check for duplicate claims? Same date, procedure, provide, etc?
-    db.add_all(db_claims)
-    db.commit()
-
-    # PSEUDO CODE: I would consider an event driven approach for transferring Claim information
-    # to a downstream "Payments" service. GCP appears to have an equivalent to AWS' EventBridge + SQS which I've used
-    # extensively for use cases like this. The producer, in this case the Claims Service, need not care which or how
-    # many authorized downstream services consume this data. Also, the consumers only need to know the basic schema in
-    # which events are emitted in order to parse what is relevant to them. In my experience this scales better than
-    # orchestrating everything via API requests for non-client based services.
-    #
-    # This example would be a common utility to be used throughout the service,
-    # based on what I found here: https://cloud.google.com/pubsub/docs/publisher#python
-    #
-    # ```
-    # publisher = pubsub_v1.PublisherClient()
-    # topic_path = publisher.topic_path(project_id, topic_id)
-    # publish_futures = []
-    #
-    # def get_callback(
-    #         publish_future: pubsub_v1.publisher.futures.Future, data: str
-    # ) -> Callable[[pubsub_v1.publisher.futures.Future], None]:
-    #     def callback(publish_future: pubsub_v1.publisher.futures.Future) -> None:
-    #         try:
-    #             # Wait 60 seconds for the publish call to succeed.
-    #             print(f"Published message ID: {publish_future.result(timeout=60)} for data: {data}")
-    #         except futures.TimeoutError:
-    #             print(f"Publishing {data} timed out.")
-    #
-    #     return callback
-    #
-    # for claim in claims_data:
-    #     data = json.dumps(claim).encode("utf-8")
-    #
-    #     publish_future = publisher.publish(topic_path, data)
-    #
-    #     publish_future.add_done_callback(get_callback(publish_future, data))
-    #     publish_futures.append(publish_future)
-    #
-    # futures.wait(publish_futures, return_when=futures.ALL_COMPLETED)
-    # ```
-    #
-    # CONSIDERATIONS
-    #
-    # Q: "What needs to be done if there is a failure in either service and steps need to be unwinded?"
-    #
-    # A: GCP appears to offer similar solution to AWS's DLQ called "Dead-letter topic" in this case. Assuring that the
-    #    event/message is published is handled by the producer as shown in Google's example slightly modified above.
-    #    In the event that a service outage occurred and events/messages somehow were not emitted, in the past I've
-    #    written utility scripts or endpoints that can emit the events received for a given time or criteria which
-    #    allows us to essentially replay any missing data.
-    #
-    #    As far as the consumers go, they would want to implement the DLTs in this case and write to them if an
-    #    Exception has occurred. In a similar fashion to the above scenario, the consumers would have the ability to
-    #    replay the events/messages from the DLT after the underlying issue was addressed.
-    #
-    # Q: "Multiple instances of either service are running concurrently to handle a large volume of claims."
-    #
-    # A: consider using GCP's Cloud Functions as opposed to running containerized applications on dedicated instances
-    #    for the following reasons:
-    #      - automatically and infinitely scales
-    #      - pay only for what you use while volume is still building
-    #      - less time spent deploying, maintaining, and troubleshooting infrastructure
-    #      - if volume of requests reaches critical mass where it is more affordable to run a cluster of dedicated
-    #        instances with no impact to latency then we could always do that
-
-
-    logging.info(f'Processed {len(claims)} claims: {claim_dict}')
-
-    return {'claims': claim_dict}
-
-
-@app.get('/providers', dependencies=[Depends(RateLimiter(times=6, seconds=60))])
+    response.headers['Location'] = f'/ingest/{job.id}'
+    return job.dict()
+
+
+@app.get('/ingest/{job_id}')
+async def get_ingest_job(job_id: str, db: db_dependency) -> Dict[str, Any]:
+    """
+    Retrieve the status, progress, row counts, errors and throughput of an ingest job.
+
+    Raises:
+        HTTPException:
+            - 404: if there's no ingest job with the given job_id
+    """
+    job = await db.get(repo.IngestJob, job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail='Ingest job not found.')
+
+    return job.dict()
+
+
+@app.post('/events/replay')
+async def post_events_replay(
+    db: db_dependency,
+    start: datetime = Query(..., description='Replay the events created at or after this time'),
+    end: datetime = Query(..., description='Replay the events created before this time'),
+) -> Dict[str, int]:
+    """
+    Queue the claim events created in a time range to be published again.
+
+    Published events are marked pending and dead-lettered events are moved back to
+    the outbox; the publisher picks them up on its next poll.
+
+    Arguments:
+        db (AsyncSession): the database session used to update the outbox
+        start (datetime): the earliest creation time (UTC) of the events to replay
+        end (datetime): the creation time (UTC) the replayed events were created before
+
+    Raises:
+        HTTPException:
+            - 400: if the range is empty
+
+    Returns:
+        Dict[str, int]: the number of replayed outbox events and dead letters
+    """
+    logging.info('Received POST events replay request', extra={'start': start, 'end': end})
+
+    if start >= end:
+        raise HTTPException(status_code=400, detail='start must be before end.')
+
+    replayed, dead_letters = await replay_events(db, start, end)
+    await db.commit()
+
+    logging.info('Replaying %s event(s) and %s dead letter(s)', replayed, dead_letters)
+
+    return {'replayed': replayed, 'dead_letters': dead_letters}
+
+
+@app.get(
+    '/providers',
+    dependencies=[Depends(providers_rate_limiter)],
+    response_model=List[ProviderQuery],
+)
 async def providers_by_net_fee(
-    db: db_dependency, limit: int = Query(10, description='Number of top providers')
+    db: read_db_dependency, limit: int = Query(10, description='Number of top providers')
 ) -> List[dict]:
     """
     Retrieve the top providers by total net fee.
 
+    Providers are read from the incrementally maintained `provider_stats` rollup,
+    so latency doesn't grow with the number of claims.
+
     Arguments:
-        db (Session): the database dependency used to access the provider data
+        db (AsyncSession): the database dependency used to access the provider data
         limit (int): the maximum number of top providers to return (default is 10)
 
     Raises:
@@ -205,37 +652,91 @@ async def providers_by_net_fee(
         List[dict]: a list of dictionaries containing provider information, including
         provider NPI, total net fee, claim count, and average net fee
     """
-    logging.info(f'Querying top {limit} providers by net fee ...')
+    logging.info('Querying top providers by net fee', extra={'sample': True, 'limit': limit})
+
+    cached = await cache.get_serialized(PROVIDERS_KEY, field=str(limit))
+    if cached is not None:
+        return json_response(cached)
 
     # TODO: add pagination support
-    top_providers = (
-        db.query(
-            repo.Claim.provider_npi,
-            func.sum(repo.Claim.net_fee).label('total_net_fee'),
-            func.count(repo.Claim.id).label('claim_count'),
-            func.avg(repo.Claim.net_fee).label('avg_net_fee'),
-        )
-        .group_by(repo.Claim.provider_npi)
-        .order_by(desc('total_net_fee'))
-        .limit(limit)
-        .all()
-    )
-    # TODO: figure out rate limiting FastAPI w/o starlette dependency
-    top_provider_dict = [
-        ProviderQuery(
-            provider_npi=provider[0],
-            total_net_fee=provider[1],
-            claim_count=provider[2],
-            average_net_fee=provider[3],
-        ).dict()
-        for provider in top_providers
-    ]
+    with QUERY_SECONDS.labels('top_providers').time():
+        top_providers = await stats.top_providers(db, limit)
+
+    top_provider_dict = provider_rows(top_providers)
 
     if not top_providers:
         raise HTTPException(status_code=404, detail='No providers found')
 
-    logging.info(f'Query returned {len(top_provider_dict)} provider(s): {top_provider_dict}')
+    logging.info(
+        'Top providers query results',
+        extra={'sample': True, 'providers': summarize(top_provider_dict, key='provider_npi')},
+    )
+
+    body = dumps(top_provider_dict)
+    await cache.set_serialized(PROVIDERS_KEY, body, ttl=CACHE_PROVIDERS_TTL, field=str(limit))
+
+    return json_response(body)
+
+
+@app.get('/analytics', response_model=List[AnalyticsBucket])
+async def analytics(
+    db: read_db_dependency,
+    start: date = Query(..., description='The first day of the range'),
+    end: date = Query(..., description='The day after the last day of the range'),
+    granularity: Literal['day', 'week', 'month'] = 'day',
+    group_by: List[Literal['provider_npi', 'plan_group', 'submitted_procedure']] = Query(
+        [], description='Break the totals down by these dimensions'
+    ),
+    provider_npi: Optional[str] = None,
+    plan_group: Optional[str] = None,
+    submitted_procedure: Optional[str] = None,
+) -> List[dict]:
+    """
+    Total the net fees of the Claims serviced in a date range, per day, week or month.
+
+    Totals are summed from the `claim_daily_stats` rollup maintained by ingest, so the
+    cost depends on the number of days and groups in the range, not of claims. Weeks
+    start on Monday; the first and last periods only cover the days in the range.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the rollup
+        start (date): the first day of the range
+        end (date): the day after the last day of the range
+        granularity (str): `day`, `week` or `month`
+        group_by (List[str]): the dimensions to break the totals down by
+        provider_npi (str): only total the Claims of this provider
+        plan_group (str): only total the Claims of this plan group
+        submitted_procedure (str): only total the Claims of this procedure
+
+    Raises:
+        HTTPException:
+            - 400: if start isn't before end
 
-    return top_provider_dict
+    Returns:
+        List[dict]: the `period_start`, the `group_by` dimensions, claim count, total
+        net fee and average net fee of every period and group with claims
+    """
+    logging.info(
+        'Received GET analytics request',
+        extra={'sample': True, 'start': start, 'end': end, 'granularity': granularity},
+    )
 
+    if start >= end:
+        raise HTTPException(status_code=400, detail='start must be before end.')
+
+    with QUERY_SECONDS.labels('analytics').time():
+        rows = await query_daily_stats(
+            db,
+            start,
+            end,
+            granularity,
+            # NOTE: deduplicated in order, so `?group_by=x&group_by=x` groups once
+            list(dict.fromkeys(group_by)),
+            {
+                'provider_npi': provider_npi,
+                'plan_group': plan_group,
+                'submitted_procedure': submitted_procedure,
+            },
+        )
 
+    return json_response(dumps(analytics_rows(rows)))
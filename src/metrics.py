@@ -0,0 +1,228 @@
+import logging
+import os
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List
+
+from fastapi import Request
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false') == 'true'
+PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', 0.001))
+PROFILING_DIRECTORY = os.environ.get('PROFILING_DIRECTORY', '/tmp/claim-service-profiles')
+# NOTE: set by `src.server` when running several workers, whose metrics are then aggregated
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+THROUGHPUT_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'claim_service_http_request_duration_seconds',
+    'Time spent handling HTTP requests',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    'claim_service_ingest_stage_duration_seconds',
+    'Time spent in each stage of ingesting an upload, per batch',
+    ['stage'],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_ROWS = Counter(
+    'claim_service_ingest_rows', 'Rows ingested, by outcome', ['outcome']
+)
+INGEST_THROUGHPUT = Histogram(
+    'claim_service_ingest_throughput_rows_per_second',
+    'Rows per second of each upload',
+    buckets=THROUGHPUT_BUCKETS,
+)
+QUERY_SECONDS = Histogram(
+    'claim_service_query_duration_seconds',
+    'Time spent running the read queries of each endpoint',
+    ['query'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_SESSION_SECONDS = Histogram(
+    'claim_service_db_session_duration_seconds',
+    'Lifetime of the database session of each request',
+    buckets=LATENCY_BUCKETS,
+)
+DB_SESSIONS_ACTIVE = Gauge(
+    'claim_service_db_sessions_active',
+    'Database sessions currently open for requests',
+    multiprocess_mode='livesum',
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    'claim_service_db_pool_checkout_duration_seconds',
+    'Time spent waiting for a connection from the pool',
+    buckets=LATENCY_BUCKETS,
+)
+UPLOAD_REPLAYS = Counter(
+    'claim_service_upload_replays',
+    'Uploads answered with the stored summary of an earlier upload of the same batch',
+)
+RATE_LIMIT_DECISIONS = Counter(
+    'claim_service_rate_limit_decisions',
+    'Rate limited requests, by policy and whether they were allowed from the local '
+    'allowance, allowed after leasing from Redis, or rejected',
+    ['policy', 'decision'],
+)
+RATE_LIMIT_LEASES = Counter(
+    'claim_service_rate_limit_leases', 'Blocks of allowance leased from Redis', ['policy']
+)
+LOG_RECORDS_DROPPED = Counter(
+    'claim_service_log_records_dropped', 'Log records dropped because the log queue was full'
+)
+
+
+class CacheCollector(Collector):
+    """
+    Exposes the hit and miss counts `ResponseCache` already keeps, read at scrape time.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self) -> Iterator[Metric]:
+        requests = CounterMetricFamily(
+            'claim_service_cache_requests',
+            'Response cache lookups, by namespace and result',
+            labels=['namespace', 'result'],
+        )
+        for key, count in self.cache.hits.items():
+            namespace, _, tier = key.partition('.')
+            requests.add_metric([namespace, f'hit_{tier}'], count)
+        for namespace, count in self.cache.misses.items():
+            requests.add_metric([namespace, 'miss'], count)
+
+        yield requests
+
+
+class PoolCollector(Collector):
+    """
+    Exposes the size and usage of each engine's connection pool, read at scrape time.
+    """
+
+    def __init__(self, engines: Callable[[], Dict[str, AsyncEngine]]):
+        self.engines = engines
+
+    def collect(self) -> Iterator[Metric]:
+        metrics = {
+            name: GaugeMetricFamily(f'claim_service_db_pool_{name}', documentation, labels=['engine'])
+            for name, documentation in (
+                ('size', 'Connections the pool keeps open'),
+                ('checked_out', 'Connections currently checked out'),
+                ('overflow', 'Connections open beyond the pool size'),
+            )
+        }
+
+        for engine_name, engine in self.engines().items():
+            pool = engine.pool
+            # NOTE: SQLite's static/null pools don't keep connections
+            if not isinstance(pool, AsyncAdaptedQueuePool):
+                continue
+
+            metrics['size'].add_metric([engine_name], pool.size())
+            metrics['checked_out'].add_metric([engine_name], pool.checkedout())
+            metrics['overflow'].add_metric([engine_name], pool.overflow())
+
+        yield from metrics.values()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The async engine's default pool, recording how long each checkout waits.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+_collectors: List[Collector] = []
+
+
+def register_collectors(cache, engines: Callable[[], Dict[str, AsyncEngine]]):
+    """
+    Register the collectors reading the cache's counters and the pools of the engines
+    returned by `engines`, which are looked up at scrape time.
+    """
+    _collectors.extend([CacheCollector(cache), PoolCollector(engines)])
+    for collector in _collectors:
+        REGISTRY.register(collector)
+
+
+def render_metrics() -> bytes:
+    """
+    The metrics in the Prometheus text format.
+
+    With `PROMETHEUS_MULTIPROC_DIR`, counters, histograms and gauges are summed over
+    every worker process; the cache and pool collectors report the scraped worker.
+    """
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _collectors:
+        registry.register(collector)
+
+    return generate_latest(registry)
+
+
+def mark_process_dead():
+    """
+    Drop the exiting worker's live gauges from the aggregated metrics.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+async def instrument_request(request: Request, call_next):
+    """
+    Middleware timing each request by route, and profiling it when asked to.
+
+    With `PROFILING_ENABLED`, a request sending the `PROFILING_HEADER` header is run
+    under a sampling profiler; the HTML report is written to `PROFILING_DIRECTORY`
+    and its file name returned in the same header.
+    """
+    profiler = None
+    if PROFILING_ENABLED and request.headers.get(PROFILING_HEADER):
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=PROFILING_INTERVAL, async_mode='enabled')
+        profiler.start()
+
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get('route')
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route else 'unmatched', response.status_code
+    ).observe(elapsed)
+
+    if profiler is not None:
+        profiler.stop()
+        response.headers[PROFILING_HEADER] = _save_profile(profiler, request)
+
+    return response
+
+
+def _save_profile(profiler, request: Request) -> str:
+    os.makedirs(PROFILING_DIRECTORY, exist_ok=True)
+    name = f'{uuid.uuid4()}.html'
+
+    with open(os.path.join(PROFILING_DIRECTORY, name), 'w', encoding='utf-8') as f:
+        f.write(profiler.output_html())
+
+    logging.info('Profiled %s %s: %s', request.method, request.url.path, name)
+    return name
@@ -1,7 +1,9 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, computed_field, field_validator
+
+from src.money import parse_cents
 
 
 class ConfiguredModel(BaseModel):
@@ -12,12 +14,13 @@ class ConfiguredModel(BaseModel):
 
 
 class ClaimModel(ConfiguredModel):
-    allowed_fees: float = Field(..., alias='Allowed fees', ge=0)
+    # NOTE: amounts are in cents; the CSV's dollar amounts are parsed by `convert_currency`
+    allowed_fees: int = Field(..., alias='Allowed fees', ge=0)
     id: str = None
-    member_coinsurance: float = Field(..., alias='member coinsurance', ge=0)
-    member_copay: float = Field(..., alias='member copay', ge=0)
+    member_coinsurance: int = Field(..., alias='member coinsurance', ge=0)
+    member_copay: int = Field(..., alias='member copay', ge=0)
     plan_group: str = Field(..., alias='Plan/Group #')
-    provider_fees: float = Field(..., alias='provider fees', ge=0)
+    provider_fees: int = Field(..., alias='provider fees', ge=0)
     provider_npi: int = Field(..., alias='Provider NPI')
     quadrant: Optional[str] = Field(default='', alias='quadrant')
     service_date: datetime = Field(..., alias='service date')
@@ -33,7 +36,7 @@ class ClaimModel(ConfiguredModel):
     )
     def convert_currency(cls, value):
         if isinstance(value, str):
-            return float(value.replace('$', '').strip())
+            return parse_cents(value)
         return value
 
     @field_validator('service_date', mode='before')
@@ -54,16 +57,37 @@ class ClaimModel(ConfiguredModel):
             raise ValueError('The submitted procedure must start with the letter "D".')
         return value
 
+    # NOTE: a computed field, so `model_dump` includes it without patching the dict
+    @computed_field
     @property
-    def net_fee(self) -> float:
+    def net_fee(self) -> int:
         return (
             self.provider_fees + self.member_coinsurance + self.member_copay
         ) - self.allowed_fees
 
     def dict(self, **kwargs):
-        data = super().model_dump(**kwargs)
-        data['net_fee'] = self.net_fee
-        return data
+        return super().model_dump(**kwargs)
+
+    def to_record(self) -> dict:
+        """
+        Convert the Claim into the column values persisted to the `claim` table.
+        """
+        record = self.dict()
+        record['provider_npi'] = str(self.provider_npi)
+        return record
+
+
+class ClaimFilters(ConfiguredModel):
+    provider_npi: Optional[str] = None
+    subscriber_number: Optional[str] = None
+    plan_group: Optional[str] = None
+    # NOTE: the range includes `service_date_from` and excludes `service_date_to`
+    service_date_from: Optional[datetime] = None
+    service_date_to: Optional[datetime] = None
+
+
+class ClaimBatchRequest(ConfiguredModel):
+    ids: List[str] = Field(..., min_length=1)
 
 
 class ProviderQuery(ConfiguredModel):
@@ -72,14 +96,41 @@ class ProviderQuery(ConfiguredModel):
     claim_count: int
     average_net_fee: float
 
-    @field_validator(
-        'total_net_fee',
-        'average_net_fee',
-        check_fields=False,
-        mode='before',
-    )
-    def round_decimals(cls, value):
-        return round(value, 2)
+    def dict(self, **kwargs):
+        return super().model_dump(**kwargs)
+
+
+class AnalyticsBucket(ConfiguredModel):
+    period_start: date
+    provider_npi: Optional[str] = None
+    plan_group: Optional[str] = None
+    submitted_procedure: Optional[str] = None
+    claim_count: int
+    total_net_fee: float
+    average_net_fee: float
+
+
+class RowError(ConfiguredModel):
+    row: int
+    field: Optional[str] = None
+    message: str
+
+
+class IngestSummary(ConfiguredModel):
+    rows: int = 0
+    inserted: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    errors: List[RowError] = []
+    errors_truncated: bool = False
 
     def dict(self, **kwargs):
         return super().model_dump(**kwargs)
+
+
+class FileSummary(IngestSummary):
+    file: str
+
+
+class UploadSummary(IngestSummary):
+    files: List[FileSummary] = []
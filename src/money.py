@@ -0,0 +1,76 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Union
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+CENTS = Decimal('0.01')
+# NOTE: the largest amount a BIGINT holds
+MAX_CENTS = 2**63 - 1
+
+
+class Money(TypeDecorator):
+    """
+    An amount of money, stored as a BIGINT number of cents.
+
+    Values are Python `int`s of cents everywhere but at the API boundary, so amounts
+    are exact and sums are integer arithmetic, in the database as in Python.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+
+def parse_cents(value: str) -> int:
+    """
+    Parse a dollar amount such as `$100.00` to cents, without going through a float.
+
+    Amounts with more than two decimals are rounded half up, like a `Numeric(scale=2)`
+    column rounds them.
+
+    Raises:
+        ValueError: if the amount isn't a finite number
+    """
+    text = value.replace('$', '').strip()
+    try:
+        cents = int(Decimal(text).quantize(CENTS, rounding=ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, ValueError):
+        # NOTE: `quantize` rejects NaN, and `int` infinities
+        cents = None
+
+    if cents is None or abs(cents) > MAX_CENTS:
+        raise ValueError(f'Invalid amount: {text!r}')
+
+    return cents
+
+
+def average_cents(total: int, count: int) -> int:
+    """
+    The average of `count` amounts summing to `total` cents, rounded half to even.
+    """
+    quotient, remainder = divmod(int(total), count)
+    if 2 * remainder > count or (2 * remainder == count and quotient % 2):
+        quotient += 1
+
+    return quotient
+
+
+def to_decimal(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents: int) -> str:
+    """
+    Format cents as a decimal string with two decimals, e.g. `100.00`.
+    """
+    return str(to_decimal(cents).quantize(CENTS))
+
+
+def to_dollars(cents: Union[int, Decimal, None]) -> Union[float, None]:
+    """
+    Convert cents to a dollar amount for a JSON response.
+
+    Both operands are exact and the division is correctly rounded, so amounts of up
+    to 15 digits are serialized with their exact digits, e.g. `1234` cents as `12.34`.
+    """
+    return None if cents is None else int(cents) / 100
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from common.utilities import utcnow
+from src.brokers import Broker
+from src.money import to_dollars
+from src.repo import CLAIM_INTERNAL_COLUMNS, CLAIM_MONEY_COLUMNS, DeadLetter, OutboxEvent
+
+OUTBOX_ENABLED = os.environ.get('OUTBOX_ENABLED', 'true') == 'true'
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 1000))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_RETRY_DELAY = float(os.environ.get('OUTBOX_RETRY_DELAY', 1))
+OUTBOX_MAX_RETRY_DELAY = float(os.environ.get('OUTBOX_MAX_RETRY_DELAY', 300))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 0.5))
+
+CLAIM_CREATED = 'claims.created'
+
+
+async def enqueue_claim_events(db: AsyncSession, records: List[dict]):
+    """
+    Write a `claims.created` event per inserted Claim to the outbox.
+
+    The events are inserted in the session's current transaction, so they're
+    committed if and only if the claims are; publishing happens later, out of band.
+
+    Arguments:
+        db (AsyncSession): the database session the claims were inserted with
+        records (List[dict]): the column values of the inserted claims
+    """
+    if not OUTBOX_ENABLED or not records:
+        return
+
+    def payload(record: dict) -> dict:
+        # NOTE: events carry dollar amounts, like the API's responses
+        return jsonable_encoder(
+            {
+                name: to_dollars(value) if name in CLAIM_MONEY_COLUMNS else value
+                for name, value in record.items()
+                if name not in CLAIM_INTERNAL_COLUMNS
+            }
+        )
+
+    now = utcnow()
+    await db.execute(
+        insert(OutboxEvent),
+        [
+            {
+                'topic': CLAIM_CREATED,
+                'key': record['id'],
+                'payload': payload(record),
+                'created_at': now,
+                'attempts': 0,
+                'available_at': now,
+            }
+            for record in records
+        ],
+    )
+
+
+async def publish_pending(db: AsyncSession, broker: Broker, limit: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Publish the next batch of pending outbox events.
+
+    Events are locked with `SKIP LOCKED`, so several publishers can drain the outbox
+    concurrently. Failed events are retried with exponential backoff and moved to the
+    dead-letter table after `OUTBOX_MAX_ATTEMPTS`.
+
+    Arguments:
+        db (AsyncSession): the database session used to read and update the outbox
+        broker (Broker): the broker the events are published to
+        limit (int): the maximum number of events to publish
+
+    Returns:
+        int: the number of events that were attempted
+    """
+    now = utcnow()
+    events = (
+        await db.scalars(
+            select(OutboxEvent)
+            .where(OutboxEvent.published_at.is_(None), OutboxEvent.available_at <= now)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not events:
+        await db.commit()
+        return 0
+
+    results = await broker.publish(events)
+
+    published = [event.id for event, error in zip(events, results) if error is None]
+    if published:
+        await db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(published))
+            .values(published_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    retries, dead = [], []
+    for event, error in zip(events, results):
+        if error is None:
+            continue
+
+        attempts = event.attempts + 1
+        (dead if attempts >= OUTBOX_MAX_ATTEMPTS else retries).append((event, attempts, error))
+
+    if retries:
+        await db.execute(
+            update(OutboxEvent.__table__)
+            .where(OutboxEvent.id == bindparam('event_id'))
+            .values(
+                attempts=bindparam('event_attempts'),
+                available_at=bindparam('event_available_at'),
+                error=bindparam('event_error'),
+            ),
+            [
+                {
+                    'event_id': event.id,
+                    'event_attempts': attempts,
+                    'event_available_at': now + timedelta(seconds=_retry_delay(attempts)),
+                    'event_error': repr(error),
+                }
+                for event, attempts, error in retries
+            ],
+        )
+
+    if dead:
+        await db.execute(
+            insert(DeadLetter),
+            [
+                {
+                    'id': event.id,
+                    'topic': event.topic,
+                    'key': event.key,
+                    'payload': event.payload,
+                    'created_at': event.created_at,
+                    'attempts': attempts,
+                    'failed_at': now,
+                    'error': repr(error),
+                }
+                for event, attempts, error in dead
+            ],
+        )
+        await db.execute(
+            delete(OutboxEvent)
+            .where(OutboxEvent.id.in_([event.id for event, _, _ in dead]))
+            .execution_options(synchronize_session=False)
+        )
+        logging.warning('Moved %s outbox event(s) to the dead-letter table', len(dead))
+
+    await db.commit()
+
+    if retries or dead:
+        logging.warning(
+            'Failed to publish %s of %s event(s)', len(retries) + len(dead), len(events)
+        )
+
+    return len(events)
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_DELAY)
+
+
+async def run_publisher(session_factory: async_sessionmaker, broker: Broker, stop: asyncio.Event):
+    """
+    Drain the outbox until `stop` is set, polling while it's empty.
+    """
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                if await publish_pending(db, broker) == OUTBOX_BATCH_SIZE:
+                    continue
+
+        except Exception:
+            logging.exception('Failed to publish outbox events')
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def replay_events(db: AsyncSession, start: datetime, end: datetime) -> Tuple[int, int]:
+    """
+    Queue the events created in `[start, end)` to be published again.
+
+    Published events are marked pending, and dead letters are moved back to the
+    outbox with their attempts reset. The caller commits.
+
+    Arguments:
+        db (AsyncSession): the database session used to update the outbox
+        start (datetime): the earliest creation time of the events to replay
+        end (datetime): the creation time the replayed events were created before
+
+    Returns:
+        Tuple[int, int]: the number of replayed outbox events and dead letters
+    """
+    now = utcnow()
+
+    replayed = await db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.created_at >= start, OutboxEvent.created_at < end)
+        .values(published_at=None, attempts=0, available_at=now, error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    in_range = (DeadLetter.created_at >= start, DeadLetter.created_at < end)
+    revived = await db.execute(
+        insert(OutboxEvent).from_select(
+            ['id', 'topic', 'key', 'payload', 'created_at', 'attempts', 'available_at'],
+            select(
+                DeadLetter.id,
+                DeadLetter.topic,
+                DeadLetter.key,
+                DeadLetter.payload,
+                DeadLetter.created_at,
+                literal(0),
+                literal(now),
+            ).where(*in_range),
+        )
+    )
+    await db.execute(delete(DeadLetter).where(*in_range))
+
+    return replayed.rowcount, revived.rowcount
+
+
+async def purge_published(db: AsyncSession, before: datetime) -> int:
+    """
+    Delete the events published before `before`; they can no longer be replayed.
+
+    Returns:
+        int: the number of deleted events
+    """
+    result = await db.execute(
+        delete(OutboxEvent).where(
+            OutboxEvent.published_at.is_not(None), OutboxEvent.created_at < before
+        )
+    )
+    await db.commit()
+    return result.rowcount
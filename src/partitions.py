@@ -0,0 +1,193 @@
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.utilities import utcnow
+from src.repo import Claim
+
+CLAIM_PARTITION_PREMAKE = int(os.environ.get('CLAIM_PARTITION_PREMAKE', 3))
+
+DEFAULT_PARTITION = 'claim_default'
+PARTITION_NAME = re.compile(r'^claim_y(\d{4})m(\d{2})$')
+
+# NOTE: an arbitrary key serializing partition maintenance across processes
+PARTITION_LOCK = 7_143_001
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def partition_name(month: date) -> str:
+    return f'claim_y{month.year:04d}m{month.month:02d}'
+
+
+def partition_month(name: str) -> Optional[date]:
+    """
+    The month a partition named by `partition_name` holds, or `None` for any other table.
+    """
+    match = PARTITION_NAME.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def is_partitioned(db: AsyncSession) -> bool:
+    """
+    Whether `claim` is partitioned; only on PostgreSQL, it's a plain table elsewhere.
+    """
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+async def list_partitions(db: AsyncSession) -> List[str]:
+    """
+    The names of the monthly partitions of `claim`, oldest first.
+    """
+    if not is_partitioned(db):
+        return []
+
+    names = await db.scalars(
+        text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            "WHERE pg_inherits.inhparent = 'claim'::regclass"
+        )
+    )
+    return sorted(name for name in names if partition_month(name) is not None)
+
+
+async def create_partitions(db: AsyncSession, start: date, end: date) -> List[str]:
+    """
+    Create the missing monthly partitions of `claim` for the months from `start`
+    through `end`.
+
+    Each partition is created as a plain table, filled with the rows of its month
+    that fell into the default partition before it existed, and attached. The default
+    partition is created too if it's missing, e.g. for a schema made by `create_all`.
+    The caller commits; concurrent callers are serialized by an advisory lock.
+
+    Arguments:
+        db (AsyncSession): the database session used to alter the schema
+        start (date): a day of the first month to create
+        end (date): a day of the last month to create
+
+    Returns:
+        List[str]: the names of the created partitions
+    """
+    if not is_partitioned(db):
+        return []
+
+    await db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_LOCK})
+    await db.execute(
+        text(f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF claim DEFAULT')
+    )
+    existing = set(await list_partitions(db))
+
+    created = []
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(month)
+        if name not in existing:
+            await _create_partition(db, name, month, next_month(month))
+            created.append(name)
+        month = next_month(month)
+
+    if created:
+        logging.info('Created claim partition(s): %s', ', '.join(created))
+
+    return created
+
+
+async def _create_partition(db: AsyncSession, name: str, start: date, end: date):
+    bounds = {'start': _midnight(start), 'end': _midnight(end)}
+
+    # NOTE: the partition gets the parent's indexes and primary key when it's attached
+    await db.execute(text(f'CREATE TABLE {name} (LIKE claim INCLUDING DEFAULTS)'))
+    # NOTE: rows can't be attached while the default partition holds rows of the same range
+    await db.execute(
+        text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            'WHERE service_date >= :start AND service_date < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ),
+        bounds,
+    )
+    # NOTE: the bounds are literals; `ATTACH PARTITION` doesn't take parameters
+    await db.execute(
+        text(
+            f"ALTER TABLE claim ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+
+async def create_future_partitions(
+    db: AsyncSession, months: int = CLAIM_PARTITION_PREMAKE
+) -> List[str]:
+    """
+    Create the partitions of the current month and of the next `months` months.
+    """
+    today = utcnow().date()
+
+    end = month_start(today)
+    for _ in range(months):
+        end = next_month(end)
+
+    return await create_partitions(db, today, end)
+
+
+async def drop_partitions(
+    db: AsyncSession, before: date, detach_only: bool = False
+) -> Tuple[List[str], int]:
+    """
+    Remove the claims serviced before the month of `before`.
+
+    On PostgreSQL whole monthly partitions are detached and dropped, which is O(1)
+    per partition, rather than deleted row by row; with `detach_only` they're kept
+    as standalone tables, e.g. to be archived. Older rows in the default partition,
+    and every claim on SQLite, are deleted. The caller commits.
+
+    Rollups (`provider_stats`, `claim_daily_stats`) keep the totals of removed claims.
+
+    Arguments:
+        db (AsyncSession): the database session used to alter the schema
+        before (date): claims serviced before the first day of this month are removed
+        detach_only (bool): detach the partitions without dropping them
+
+    Returns:
+        Tuple[List[str], int]: the detached or dropped partitions, and the number of
+        claims deleted row by row
+    """
+    cutoff = _midnight(month_start(before))
+
+    if not is_partitioned(db):
+        result = await db.execute(delete(Claim).where(Claim.service_date < cutoff))
+        return [], result.rowcount
+
+    await db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_LOCK})
+
+    removed = []
+    for name in await list_partitions(db):
+        if partition_month(name) >= cutoff.date():
+            break
+
+        await db.execute(text(f'ALTER TABLE claim DETACH PARTITION {name}'))
+        if not detach_only:
+            await db.execute(text(f'DROP TABLE {name}'))
+        removed.append(name)
+
+    result = await db.execute(
+        text(f'DELETE FROM {DEFAULT_PARTITION} WHERE service_date < :cutoff'), {'cutoff': cutoff}
+    )
+    return removed, result.rowcount
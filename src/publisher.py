@@ -0,0 +1,53 @@
+"""
+Outbox publisher: publishes the claim events written by ingest to the broker.
+
+Usage:
+    python -m src.publisher
+
+The broker is configured with `OUTBOX_BROKER_URL` (Redis streams on `REDIS_URL` by
+default); see `src.brokers.build_broker`.
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+from src.brokers import build_broker
+from src.db import session
+from src.logs import configure_logging, stop_logging
+from src.outbox import run_publisher
+
+OUTBOX_BROKER_URL = os.environ.get('OUTBOX_BROKER_URL') or os.environ.get('REDIS_URL', '')
+
+
+async def serve():
+    """
+    Publish outbox events until the process receives SIGTERM or SIGINT.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    broker = build_broker(OUTBOX_BROKER_URL)
+    logging.info('Publishing outbox events with %s', type(broker).__name__)
+
+    try:
+        await run_publisher(session, broker, stop)
+    finally:
+        await broker.close()
+
+
+def main() -> int:
+    configure_logging()
+    try:
+        asyncio.run(serve())
+    finally:
+        stop_logging()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
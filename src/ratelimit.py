@@ -0,0 +1,282 @@
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.metrics import RATE_LIMIT_DECISIONS, RATE_LIMIT_LEASES
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true') == 'true'
+RATE_LIMIT_PREFIX = os.environ.get('RATE_LIMIT_PREFIX', 'claim-service:ratelimit')
+# NOTE: clients are told apart by this header when it's sent, and by address otherwise
+RATE_LIMIT_CLIENT_HEADER = os.environ.get('RATE_LIMIT_CLIENT_HEADER', 'X-Client-Id')
+# the share of a policy's limit a worker leases from Redis at a time
+RATE_LIMIT_LEASE_RATIO = float(os.environ.get('RATE_LIMIT_LEASE_RATIO', 0.05))
+# NOTE: so policies with small limits (e.g. 6/60) still decide most requests locally
+RATE_LIMIT_MIN_LEASE = int(os.environ.get('RATE_LIMIT_MIN_LEASE', 5))
+# e.g. `providers=6/60,claim_rows=100000/60`: the allowance per number of seconds of each
+# policy, optionally followed by the units leased at a time, e.g. `providers=6/60/2`
+RATE_LIMITS = os.environ.get('RATE_LIMITS', 'providers=6/60,claim_rows=100000/60')
+# e.g. `partner-a:claim_rows=1000000/60`: the policies of particular clients
+RATE_LIMIT_CLIENTS = os.environ.get('RATE_LIMIT_CLIENTS', '')
+# the number of buckets a worker keeps before dropping those of past windows
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', 10000))
+
+
+class RatePolicy:
+    """
+    An allowance of `limit` units (requests, rows, ...) per client every `period` seconds.
+    """
+
+    def __init__(self, name: str, limit: int, period: int, block: Optional[int] = None):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        # NOTE: the units a worker leases from Redis at a time, and can leave unused
+        self.block = block or max(
+            1, min(limit, RATE_LIMIT_MIN_LEASE), int(limit * RATE_LIMIT_LEASE_RATIO)
+        )
+
+    @classmethod
+    def parse(cls, name: str, value: str) -> 'RatePolicy':
+        """
+        Parse a policy written as `<limit>/<period>[/<block>]`, e.g. `6/60` or `6/60/2`.
+        """
+        try:
+            limit, period, *block = value.split('/')
+            if len(block) > 1:
+                raise ValueError(value)
+            return cls(name, int(limit), int(period), int(block[0]) if block else None)
+        except ValueError:
+            raise ValueError(
+                f'Invalid rate limit for {name}: {value}, expected <limit>/<period>[/<block>]'
+            )
+
+
+def parse_policies(value: str) -> Dict[str, RatePolicy]:
+    """
+    Parse the policies of `RATE_LIMITS`, e.g. `providers=6/60,claim_rows=100000/60`.
+    """
+    policies = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        name, _, limit = item.partition('=')
+        policies[name] = RatePolicy.parse(name, limit)
+
+    return policies
+
+
+def parse_client_policies(value: str) -> Dict[Tuple[str, str], RatePolicy]:
+    """
+    Parse the per-client policies of `RATE_LIMIT_CLIENTS`, e.g. `partner-a:claim_rows=1000000/60`.
+    """
+    policies = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        client, _, policy = item.rpartition(':')
+        name, _, limit = policy.partition('=')
+        policies[(client, name)] = RatePolicy.parse(name, limit)
+
+    return policies
+
+
+class _Bucket:
+    """
+    The allowance a worker leased for a client in the current window.
+    """
+
+    def __init__(self, window: int, period: int):
+        self.window = window
+        self.expires_at = (window + 1) * period
+        self.tokens = 0
+        # NOTE: set once Redis has no allowance left, so the window's rejections stay local
+        self.exhausted = False
+
+
+class RateLimiter:
+    """
+    Two-tier rate limiter: an in-process token bucket per policy and client, which
+    leases allowance from a fixed window counter in Redis a block at a time.
+
+    Most requests are decided from the local bucket without any network I/O; only
+    when it runs out is a block of `policy.block` units leased with an `INCRBY`. Every
+    worker can leave part of a block unused when a window ends, so a client may be
+    held to slightly less than the limit, never to more. Redis failures are logged and
+    the request is allowed, like the response cache treats them as misses.
+    """
+
+    def __init__(
+        self,
+        redis_connection: Optional[Redis] = None,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        prefix: str = RATE_LIMIT_PREFIX,
+    ):
+        self.redis = redis_connection
+        self.enabled = enabled
+        self.prefix = prefix
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+
+    def connect(self, redis_connection: Redis):
+        self.redis = redis_connection
+
+    async def acquire(self, policy: RatePolicy, client: str, cost: int = 1) -> float:
+        """
+        Take `cost` units of a client's allowance.
+
+        Arguments:
+            policy (RatePolicy): the policy the units count against
+            client (str): the client they're taken from
+            cost (int): the number of units
+
+        Returns:
+            float: 0 if the units were taken, or the number of seconds until the
+            client's allowance is renewed otherwise
+        """
+        if not self.enabled:
+            return 0
+
+        now = time.time()
+        bucket = self._bucket(policy, client, now)
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            RATE_LIMIT_DECISIONS.labels(policy.name, 'local').inc()
+            return 0
+
+        if not bucket.exhausted:
+            await self._lease(policy, client, bucket, max(policy.block, cost - bucket.tokens))
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                RATE_LIMIT_DECISIONS.labels(policy.name, 'leased').inc()
+                return 0
+
+        RATE_LIMIT_DECISIONS.labels(policy.name, 'rejected').inc()
+        return bucket.expires_at - now
+
+    def _bucket(self, policy: RatePolicy, client: str, now: float) -> _Bucket:
+        window = int(now // policy.period)
+        bucket = self._buckets.get((policy.name, client))
+
+        # NOTE: the leased allowance expires with the window it was leased in
+        if bucket is None or bucket.window != window:
+            if len(self._buckets) >= RATE_LIMIT_MAX_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets[(policy.name, client)] = _Bucket(window, policy.period)
+
+        return bucket
+
+    def _prune(self, now: float):
+        for key in [key for key, bucket in self._buckets.items() if bucket.expires_at <= now]:
+            del self._buckets[key]
+
+    async def _lease(self, policy: RatePolicy, client: str, bucket: _Bucket, amount: int):
+        """
+        Lease up to `amount` units of the client's window from Redis into its bucket.
+        """
+        if self.redis is None:
+            bucket.tokens += amount
+            return
+
+        key = f'{self.prefix}:{policy.name}:{client}:{bucket.window}'
+        try:
+            async with self.redis.pipeline(transaction=True) as pipeline:
+                pipeline.incrby(key, amount)
+                pipeline.expire(key, policy.period, nx=True)
+                used, _ = await pipeline.execute()
+
+        except RedisError as error:
+            logging.warning('Failed to lease %s allowance of %s: %s', policy.name, client, error)
+            bucket.tokens += amount
+            return
+
+        # NOTE: the counter keeps counting past the limit, only what's left of it is granted
+        granted = max(0, min(amount, policy.limit - (used - amount)))
+        bucket.tokens += granted
+        bucket.exhausted = granted < amount
+        RATE_LIMIT_LEASES.labels(policy.name).inc()
+
+
+rate_limiter = RateLimiter()
+
+POLICIES = parse_policies(RATE_LIMITS)
+CLIENT_POLICIES = parse_client_policies(RATE_LIMIT_CLIENTS)
+
+
+def client_id(request: Request) -> str:
+    """
+    Identify the client of a request, by `RATE_LIMIT_CLIENT_HEADER` or its address.
+    """
+    return request.headers.get(RATE_LIMIT_CLIENT_HEADER) or (
+        request.client.host if request.client else 'unknown'
+    )
+
+
+def policy_for(name: str, client: str) -> RatePolicy:
+    """
+    The policy named `name` of a client: its own if it has one, the default otherwise.
+    """
+    return CLIENT_POLICIES.get((client, name)) or POLICIES[name]
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail='Too many requests.',
+        headers={'Retry-After': str(math.ceil(retry_after))},
+    )
+
+
+class ClientAllowance:
+    """
+    A client's allowance under a policy, returned by `RateLimit` to spend more units.
+    """
+
+    def __init__(self, limiter: RateLimiter, policy: RatePolicy, client: str):
+        self.limiter = limiter
+        self.policy = policy
+        self.client = client
+        # NOTE: the unit taken for the request counts towards the units it spends
+        self.prepaid = 1
+
+    async def spend(self, cost: int):
+        """
+        Take `cost` more units as they're used, e.g. the rows of an upload batch by batch.
+
+        Raises:
+            HTTPException:
+                - 429: if the client's allowance is spent
+        """
+        cost, self.prepaid = max(cost - self.prepaid, 0), max(self.prepaid - cost, 0)
+        if not cost:
+            return
+
+        retry_after = await self.limiter.acquire(self.policy, self.client, cost)
+        if retry_after:
+            raise too_many_requests(retry_after)
+
+
+class RateLimit:
+    """
+    FastAPI dependency applying a rate limit policy to the requesting client.
+
+    A unit is taken for every request, which is rejected with `429` and a
+    `Retry-After` header once the client's allowance is spent; handlers measuring in
+    other units (e.g. rows) spend the rest through the returned `ClientAllowance`.
+    """
+
+    def __init__(self, policy: str, limiter: RateLimiter = rate_limiter):
+        self.policy = policy
+        self.limiter = limiter
+
+    async def __call__(self, request: Request) -> ClientAllowance:
+        client = client_id(request)
+        policy = policy_for(self.policy, client)
+
+        retry_after = await self.limiter.acquire(policy, client)
+        if retry_after:
+            raise too_many_requests(retry_after)
+
+        return ClientAllowance(self.limiter, policy, client)
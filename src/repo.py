@@ -1,36 +1,65 @@
 import uuid
 
-from sqlalchemy import Column, String, DateTime, Float, Numeric
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    text,
+)
 
 from src.db import Base
+from src.money import Money, to_dollars
 
 
 class Claim(Base):
     __tablename__ = 'claim'
+    __table_args__ = (
+        Index('ix_claim_provider_npi', 'provider_npi', postgresql_include=['net_fee']),
+        Index('ix_claim_subscriber_number_service_date', 'subscriber_number', 'service_date'),
+        Index('ix_claim_plan_group_service_date', 'plan_group', 'service_date'),
+        Index('ix_claim_service_date_id', 'service_date', 'id'),
+        Index('ix_claim_provider_npi_service_date_id', 'provider_npi', 'service_date', 'id'),
+        # NOTE: unique indexes of a partitioned table must include the partition key;
+        # fingerprints hash `service_date`, so duplicates always share it anyway
+        Index('ix_claim_fingerprint', 'fingerprint', 'service_date', unique=True),
+        # NOTE: partitioned by month on PostgreSQL, see `src.partitions`; SQLite ignores it
+        {'postgresql_partition_by': 'RANGE (service_date)'},
+    )
 
     id = Column(String, primary_key=True, default=uuid.uuid4)
 
-    allowed_fees = Column(Float, nullable=False)
-    member_coinsurance = Column(Float, nullable=False)
-    member_copay = Column(Float, nullable=False)
-    net_fee = Column(Numeric(precision=10, scale=2), nullable=True)
+    # NOTE: amounts are in cents, see `src.money`
+    allowed_fees = Column(Money, nullable=False)
+    member_coinsurance = Column(Money, nullable=False)
+    member_copay = Column(Money, nullable=False)
+    net_fee = Column(Money, nullable=True)
     plan_group = Column(String, nullable=False)
-    provider_fees = Column(Float, nullable=False)
+    provider_fees = Column(Money, nullable=False)
     provider_npi = Column(String, nullable=False)
     quadrant = Column(String, nullable=True)
-    service_date = Column(DateTime, nullable=False)
+    service_date = Column(DateTime, primary_key=True)
     submitted_procedure = Column(String, nullable=False)
     subscriber_number = Column(String, nullable=False)
+    # NOTE: the content hash duplicate claims are detected by; see `claim_fingerprint`
+    fingerprint = Column(String(64), nullable=True)
+    # NOTE: the upload that inserted the claim, if it was uploaded to `POST /claims`
+    ingest_batch_id = Column(String, nullable=True)
 
     def dict(self):
         return {
             'id': self.id,
-            'allowed_fees': self.allowed_fees,
-            'member_coinsurance': self.member_coinsurance,
-            'member_copay': self.member_copay,
-            'net_fee': self.net_fee,
+            'allowed_fees': to_dollars(self.allowed_fees),
+            'member_coinsurance': to_dollars(self.member_coinsurance),
+            'member_copay': to_dollars(self.member_copay),
+            'net_fee': to_dollars(self.net_fee),
             'plan_group': self.plan_group,
-            'provider_fees': self.provider_fees,
+            'provider_fees': to_dollars(self.provider_fees),
             'provider_npi': self.provider_npi,
             'quadrant': self.quadrant,
             'service_date': (
@@ -39,3 +68,154 @@ class Claim(Base):
             'submitted_procedure': self.submitted_procedure,
             'subscriber_number': self.subscriber_number,
         }
+
+
+# the columns of `Claim` holding amounts, in cents
+CLAIM_MONEY_COLUMNS = tuple(
+    column.name for column in Claim.__table__.columns if isinstance(column.type, Money)
+)
+# the columns of `Claim` that are never returned, exported or published
+CLAIM_INTERNAL_COLUMNS = ('fingerprint', 'ingest_batch_id')
+
+
+class ProviderStats(Base):
+    __tablename__ = 'provider_stats'
+    __table_args__ = (Index('ix_provider_stats_total_net_fee', 'total_net_fee'),)
+
+    provider_npi = Column(String, primary_key=True)
+
+    claim_count = Column(Integer, nullable=False, default=0)
+    total_net_fee = Column(Money, nullable=False, default=0)
+
+    def dict(self):
+        return {
+            'provider_npi': self.provider_npi,
+            'claim_count': self.claim_count,
+            'total_net_fee': to_dollars(self.total_net_fee),
+        }
+
+
+class ClaimDailyStats(Base):
+    __tablename__ = 'claim_daily_stats'
+
+    # NOTE: `day` leads the key, so date ranges are read off the primary key index
+    day = Column(Date, primary_key=True)
+    provider_npi = Column(String, primary_key=True)
+    plan_group = Column(String, primary_key=True)
+    submitted_procedure = Column(String, primary_key=True)
+
+    claim_count = Column(Integer, nullable=False, default=0)
+    total_net_fee = Column(Money, nullable=False, default=0)
+
+
+class IngestJob(Base):
+    __tablename__ = 'ingest_job'
+    __table_args__ = (Index('ix_ingest_job_status_created_at', 'status', 'created_at'),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    status = Column(String, nullable=False)
+    filename = Column(String, nullable=True)
+    path = Column(String, nullable=False)
+    batch_size = Column(Integer, nullable=False)
+
+    rows = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    errors_truncated = Column(Boolean, nullable=False, default=False)
+    error = Column(String, nullable=True)
+
+    # NOTE: a worker owns a running job until its lease expires; `attempts` fences
+    # off workers whose lease was taken over
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def rows_per_second(self) -> float:
+        end = self.finished_at or self.updated_at
+        if not self.started_at or not end or end <= self.started_at:
+            return 0.0
+        return round(self.rows / (end - self.started_at).total_seconds(), 2)
+
+    def dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'batch_size': self.batch_size,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated,
+            'error': self.error,
+            'attempts': self.attempts,
+            'rows_per_second': self.rows_per_second,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class IngestBatch(Base):
+    __tablename__ = 'ingest_batch'
+
+    # NOTE: `key:<Idempotency-Key>` or `sha256:<content hash>`, see `src.idempotency`
+    id = Column(String, primary_key=True)
+
+    content_sha256 = Column(String(64), nullable=False)
+    summary = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+# NOTE: SQLite only autoincrements `INTEGER` primary keys
+EventId = BigInteger().with_variant(Integer, 'sqlite')
+
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        Index(
+            'ix_outbox_pending',
+            'id',
+            postgresql_where=text('published_at IS NULL'),
+            sqlite_where=text('published_at IS NULL'),
+        ),
+        Index('ix_outbox_created_at', 'created_at'),
+    )
+
+    id = Column(EventId, primary_key=True, autoincrement=True)
+
+    topic = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    error = Column(String, nullable=True)
+
+
+class DeadLetter(Base):
+    __tablename__ = 'dead_letter'
+    __table_args__ = (Index('ix_dead_letter_created_at', 'created_at'),)
+
+    id = Column(EventId, primary_key=True, autoincrement=False)
+
+    topic = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    attempts = Column(Integer, nullable=False)
+    failed_at = Column(DateTime, nullable=False)
+    error = Column(String, nullable=True)
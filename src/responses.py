@@ -0,0 +1,107 @@
+from decimal import Decimal
+from typing import Any, Iterable, List, Union
+
+import orjson
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+from fastapi.responses import Response
+from sqlalchemy import BigInteger, Row, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+from src.money import Money, average_cents, to_dollars
+from src.repo import CLAIM_INTERNAL_COLUMNS, Claim
+
+
+class Dollars(TypeDecorator):
+    """
+    Read a `Money` column's cents as a dollar amount, for JSON responses.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return to_dollars(value)
+
+
+# NOTE: amounts are converted to dollars by the result processor, the only place
+# they're not cents; the internal columns are never returned
+CLAIM_COLUMNS = [
+    type_coerce(column, Dollars()).label(column.name)
+    if isinstance(column.type, Money)
+    else column
+    for column in Claim.__table__.columns
+    if column.name not in CLAIM_INTERNAL_COLUMNS
+]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize a response to JSON bytes.
+
+    Datetimes are encoded in ISO 8601 and `Decimal`s as numbers, the way
+    `jsonable_encoder` does, but without first copying the content into JSON types.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(serialized: Union[bytes, str]) -> Any:
+    return orjson.loads(serialized)
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    """
+    The application's default response class, encoding with `dumps`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    """
+    Return an already serialized JSON body as is, skipping FastAPI's response encoding.
+    """
+    return Response(body, status_code=status_code, media_type='application/json')
+
+
+def claim_rows(rows: Iterable[Row]) -> List[dict]:
+    """
+    Convert rows selected with `CLAIM_COLUMNS` to the response shape of a Claim.
+    """
+    return [row._asdict() for row in rows]
+
+
+def provider_rows(rows: Iterable[Row]) -> List[dict]:
+    """
+    Convert `provider_stats` rows to the response shape of `ProviderQuery`.
+    """
+    return [
+        {
+            'provider_npi': row.provider_npi,
+            'total_net_fee': to_dollars(row.total_net_fee),
+            'claim_count': row.claim_count,
+            # NOTE: averaged in cents, so half-cent averages round the same on every platform
+            'average_net_fee': to_dollars(average_cents(row.total_net_fee, row.claim_count)),
+        }
+        for row in rows
+    ]
+
+
+def analytics_rows(rows: Iterable[Row]) -> List[dict]:
+    """
+    Convert rows summed from `claim_daily_stats` to the response shape of `AnalyticsBucket`.
+    """
+    return [
+        {
+            **row._asdict(),
+            'total_net_fee': to_dollars(row.total_net_fee),
+            'average_net_fee': to_dollars(average_cents(row.total_net_fee, row.claim_count)),
+        }
+        for row in rows
+    ]
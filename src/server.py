@@ -0,0 +1,111 @@
+"""
+Production server: runs the API in a pool of worker processes.
+
+Usage:
+    python -m src.server [--workers N] [--host HOST] [--port PORT] [--graceful-timeout SECONDS]
+
+The schema is checked and the coming `claim` partitions are created once, before the
+workers start, so a worker's startup only warms its connection pool and connects to
+Redis. Workers are spawned rather than forked, so none inherits the launcher's
+connections. On SIGTERM, each worker stops accepting connections and finishes its
+in-flight requests, for up to the graceful timeout, before closing its connections.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+import uvicorn
+
+from src.db import dispose_engine, init_db, session
+from src.logs import configure_logging, stop_logging
+from src.partitions import create_future_partitions
+
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', 8000))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+
+
+async def prepare():
+    """
+    Do the database work every worker would otherwise repeat on startup.
+
+    Raises:
+        RuntimeError: if the database hasn't been migrated to the latest revision
+    """
+    try:
+        await init_db()
+
+        async with session() as db:
+            await create_future_partitions(db)
+            await db.commit()
+    finally:
+        await dispose_engine()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.server', description=__doc__)
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=WEB_CONCURRENCY,
+        help='number of worker processes (default: WEB_CONCURRENCY, or the number of CPUs)',
+    )
+    parser.add_argument('--host', default=SERVER_HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help='port to listen on')
+    parser.add_argument(
+        '--graceful-timeout',
+        type=int,
+        default=SERVER_GRACEFUL_TIMEOUT,
+        help='seconds to wait for in-flight requests on shutdown (default: 30)',
+    )
+    return parser
+
+
+def serve(arguments: argparse.Namespace):
+    """
+    Prepare the database, then run the workers until the server is shut down.
+    """
+    asyncio.run(prepare())
+
+    # NOTE: read by spawned workers when they import the application; a single worker
+    # runs in this process, which already read it, and only checks the revision again
+    os.environ['DB_CHECK_SCHEMA'] = 'false'
+
+    with tempfile.TemporaryDirectory(prefix='claim-service-metrics-') as metrics_directory:
+        # NOTE: each worker writes its metrics there, and `/metrics` sums them
+        if arguments.workers > 1:
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_directory
+
+        logging.info(
+            'Starting %s worker(s) on %s:%s', arguments.workers, arguments.host, arguments.port
+        )
+        uvicorn.run(
+            'src.main:app',
+            host=arguments.host,
+            port=arguments.port,
+            workers=arguments.workers,
+            timeout_graceful_shutdown=arguments.graceful_timeout,
+            # NOTE: keep the application's logging, uvicorn's records propagate to it
+            log_config=None,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = build_parser().parse_args(argv)
+
+    configure_logging()
+    try:
+        serve(arguments)
+    finally:
+        stop_logging()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
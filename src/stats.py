@@ -0,0 +1,136 @@
+from collections import defaultdict
+from typing import List
+
+from sqlalchemy import Row, delete, desc, func, insert, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bulk import upsert_insert
+from src.repo import Claim, ProviderStats
+
+
+async def update_provider_stats(db: AsyncSession, records: List[dict]):
+    """
+    Fold newly inserted Claims into the `provider_stats` rollup.
+
+    The per-provider totals of the batch are applied with a single upsert in the
+    session's current transaction, so the rollup commits together with the claims.
+
+    Arguments:
+        db (AsyncSession): the database session the claims were inserted with
+        records (List[dict]): the column values of the inserted claims
+    """
+    if not records:
+        return
+
+    totals = defaultdict(lambda: {'claim_count': 0, 'total_net_fee': 0})
+    for record in records:
+        provider = totals[record['provider_npi']]
+        provider['claim_count'] += 1
+        provider['total_net_fee'] += record['net_fee']
+
+    statement = upsert_insert(db, ProviderStats.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProviderStats.provider_npi],
+        set_={
+            'claim_count': ProviderStats.claim_count + statement.excluded.claim_count,
+            'total_net_fee': ProviderStats.total_net_fee + statement.excluded.total_net_fee,
+        },
+    )
+
+    # NOTE: upsert in a consistent order so concurrent ingests lock rows in the same order
+    await db.execute(
+        statement,
+        [{'provider_npi': npi, **totals[npi]} for npi in sorted(totals)],
+    )
+
+
+async def top_providers(db: AsyncSession, limit: int) -> List[Row]:
+    """
+    Read the providers with the highest total net fee off the `provider_stats` index.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the rollup
+        limit (int): the maximum number of providers to return
+
+    Returns:
+        List[Row]: the `provider_stats` rows of the top providers, highest total net fee first
+    """
+    result = await db.execute(
+        select(ProviderStats.provider_npi, ProviderStats.claim_count, ProviderStats.total_net_fee)
+        .order_by(desc(ProviderStats.total_net_fee), ProviderStats.provider_npi)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def rebuild_provider_stats(db: AsyncSession):
+    """
+    Recompute the `provider_stats` rollup from the `claim` table.
+
+    Arguments:
+        db (AsyncSession): the database session used to rebuild the rollup; the
+        caller is responsible for committing the transaction
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        # NOTE: block concurrent ingests so none of their claims are missed
+        await db.execute(text(f'LOCK TABLE {Claim.__tablename__} IN SHARE MODE'))
+
+    await db.execute(delete(ProviderStats))
+    await db.execute(
+        insert(ProviderStats).from_select(
+            ['provider_npi', 'claim_count', 'total_net_fee'],
+            select(
+                Claim.provider_npi,
+                func.count(Claim.id),
+                func.coalesce(func.sum(Claim.net_fee), 0),
+            ).group_by(Claim.provider_npi),
+        )
+    )
+
+
+async def provider_stats_drift(db: AsyncSession) -> List[dict]:
+    """
+    Compare the `provider_stats` rollup against the totals computed from `claim`.
+
+    Arguments:
+        db (AsyncSession): the database session used to query the tables
+
+    Returns:
+        List[dict]: the providers whose rollup is missing, stale or orphaned, with
+        the expected and stored values
+    """
+    totals = (
+        select(
+            Claim.provider_npi,
+            func.count(Claim.id).label('claim_count'),
+            func.coalesce(func.sum(Claim.net_fee), 0).label('total_net_fee'),
+        )
+        .group_by(Claim.provider_npi)
+        .subquery()
+    )
+    columns = (
+        totals.c.claim_count.label('expected_claim_count'),
+        totals.c.total_net_fee.label('expected_total_net_fee'),
+        ProviderStats.claim_count,
+        ProviderStats.total_net_fee,
+    )
+
+    missing_or_stale = (
+        select(totals.c.provider_npi, *columns)
+        .outerjoin(ProviderStats, ProviderStats.provider_npi == totals.c.provider_npi)
+        .where(
+            or_(
+                ProviderStats.provider_npi.is_(None),
+                ProviderStats.claim_count != totals.c.claim_count,
+                ProviderStats.total_net_fee != totals.c.total_net_fee,
+            )
+        )
+    )
+    orphaned = (
+        select(ProviderStats.provider_npi, *columns)
+        .outerjoin(totals, ProviderStats.provider_npi == totals.c.provider_npi)
+        .where(totals.c.provider_npi.is_(None))
+    )
+
+    result = await db.execute(missing_or_stale.union_all(orphaned))
+    return [dict(row._mapping) for row in result]
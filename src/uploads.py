@@ -0,0 +1,121 @@
+import gzip
+import logging
+import posixpath
+import zipfile
+from typing import IO, Iterator, Optional, Tuple
+
+from src.ingest import INGEST_MAX_REPORTED_ERRORS
+from src.models import FileSummary, IngestSummary, UploadSummary
+
+CSV = 'csv'
+GZIP = 'gzip'
+ZIP = 'zip'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+def upload_format(file: IO, filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Tell whether an upload is a CSV file, a gzip compressed one or a zip archive.
+
+    Compressed uploads are recognized by their content, since clients often send them
+    as `application/octet-stream`; plain CSV files by their content type or extension.
+
+    Returns:
+        Optional[str]: `csv`, `gzip` or `zip`, or `None` for any other file
+    """
+    head = file.read(len(ZIP_MAGIC))
+    file.seek(0)
+
+    if head.startswith(GZIP_MAGIC):
+        return GZIP
+    if head.startswith(ZIP_MAGIC):
+        return ZIP
+    if content_type == 'text/csv' or (filename or '').lower().endswith('.csv'):
+        return CSV
+
+    return None
+
+
+def _is_csv_member(member: zipfile.ZipInfo) -> bool:
+    name = posixpath.basename(member.filename)
+    # NOTE: skip directories and the metadata macOS adds to archives
+    return (
+        not member.is_dir()
+        and not member.filename.startswith('__MACOSX/')
+        and not name.startswith('.')
+        and name.lower().endswith('.csv')
+    )
+
+
+def iter_csv_files(file: IO, filename: Optional[str], format: str) -> Iterator[Tuple[str, IO]]:
+    """
+    Open the CSV files of an upload one at a time, decompressing them as they're read.
+
+    A gzip upload yields one file and a zip archive each of its `.csv` members, in
+    archive order. Nothing is decompressed up front: each file is a stream read by the
+    CSV parser, and it's closed once the next file is requested.
+
+    Arguments:
+        file (IO): the uploaded file; a zip archive must be seekable to read its index
+        filename (str): the name of the uploaded file
+        format (str): the format returned by `upload_format`
+
+    Raises:
+        ValueError: if a zip archive is malformed or contains no CSV files
+
+    Yields:
+        Tuple[str, IO]: the name and binary content of each CSV file
+    """
+    filename = filename or 'upload'
+
+    if format == CSV:
+        yield filename, file
+
+    elif format == GZIP:
+        with gzip.GzipFile(fileobj=file, mode='rb') as stream:
+            yield filename, stream
+
+    elif format == ZIP:
+        try:
+            archive = zipfile.ZipFile(file)
+        except zipfile.BadZipFile as error:
+            raise ValueError(f'{filename} is not a valid zip archive: {error}')
+
+        with archive:
+            members = [member for member in archive.infolist() if _is_csv_member(member)]
+            if not members:
+                raise ValueError(f'{filename} contains no CSV files')
+
+            skipped = len(archive.infolist()) - len(members)
+            if skipped:
+                logging.info(
+                    'Skipping %s member(s) of %s that are not CSV files', skipped, filename
+                )
+
+            for member in members:
+                with archive.open(member) as stream:
+                    yield f'{filename}/{member.filename}', stream
+
+    else:
+        raise ValueError(f'Unsupported upload format: {format}')
+
+
+def add_file_summary(total: UploadSummary, file: str, summary: IngestSummary):
+    """
+    Add the ingest of one CSV file to the summary of an upload.
+
+    The upload's row errors are those of all of its files, capped at
+    `INGEST_MAX_REPORTED_ERRORS`; each file's own are in its entry of `files`.
+    """
+    total.files.append(FileSummary(file=file, **summary.model_dump()))
+
+    total.rows += summary.rows
+    total.inserted += summary.inserted
+    total.failed += summary.failed
+    total.duplicates += summary.duplicates
+
+    remaining = INGEST_MAX_REPORTED_ERRORS - len(total.errors)
+    total.errors.extend(summary.errors[:max(remaining, 0)])
+    total.errors_truncated |= summary.errors_truncated or len(summary.errors) > remaining
@@ -0,0 +1,263 @@
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from src.models import ClaimModel, RowError
+from src.money import parse_cents
+
+MISSING = object()
+
+ALIASES = {name: field.alias for name, field in ClaimModel.model_fields.items()}
+CURRENCY_FIELDS = ('allowed_fees', 'member_coinsurance', 'member_copay', 'provider_fees')
+STRING_FIELDS = ('plan_group', 'submitted_procedure', 'subscriber_number')
+NPI_LENGTH = 10
+# NOTE: longer dollar amounts are parsed one at a time, so they can't overflow an int64
+MAX_FAST_DOLLAR_DIGITS = 15
+SERVICE_DATE_FORMAT = '%m/%d/%y %H:%M'
+
+FIELD_REQUIRED = 'Field required'
+INVALID_DATETIME = 'Input should be a valid datetime'
+INVALID_INTEGER = 'Input should be a valid integer'
+INVALID_STRING = 'Input should be a valid string'
+NEGATIVE_AMOUNT = 'Input should be greater than or equal to 0'
+INVALID_NPI = 'Value error, The Providers NPI number is invalid; should be 10 digits long.'
+INVALID_PROCEDURE = 'Value error, The submitted procedure must start with the letter "D".'
+
+_int_adapter = TypeAdapter(int)
+
+
+def validate_claim_columns(
+    rows: Sequence[Tuple[int, dict]]
+) -> Tuple[List[dict], List[RowError]]:
+    """
+    Validate a batch of raw CSV rows column by column.
+
+    This is a batch equivalent of constructing a `ClaimModel` per row: every column
+    is parsed and checked with array operations, and the same per-row errors are
+    reported, in the same order, as `ClaimModel` would raise.
+
+    Arguments:
+        rows (Sequence[Tuple[int, dict]]): the 1-based row number and raw values of each row
+
+    Returns:
+        Tuple[List[dict], List[RowError]]: the `claim` column values of the valid rows,
+        in row order, and the errors of the rows that failed validation
+    """
+    size = len(rows)
+    if not size:
+        return [], []
+
+    errors: Dict[str, Dict[int, str]] = {name: {} for name in ALIASES}
+    columns = {}
+
+    for name in CURRENCY_FIELDS:
+        columns[name] = _currency_column(_raw_column(rows, name), errors[name])
+
+    for name in STRING_FIELDS:
+        columns[name] = _string_column(_raw_column(rows, name), errors[name])
+
+    columns['provider_npi'] = _npi_column(
+        _raw_column(rows, 'provider_npi'), errors['provider_npi']
+    )
+    columns['service_date'] = _service_date_column(
+        _raw_column(rows, 'service_date'), errors['service_date']
+    )
+    columns['quadrant'] = [
+        '' if value is MISSING else value for value in _raw_column(rows, 'quadrant')
+    ]
+
+    procedures = columns['submitted_procedure']
+    for index in np.flatnonzero(~np.char.startswith(procedures, 'D')):
+        errors['submitted_procedure'].setdefault(int(index), INVALID_PROCEDURE)
+
+    invalid = np.zeros(size, dtype=bool)
+    for field_errors in errors.values():
+        invalid[list(field_errors)] = True
+
+    net_fee = (
+        columns['provider_fees'] + columns['member_coinsurance'] + columns['member_copay']
+    ) - columns['allowed_fees']
+
+    valid = np.flatnonzero(~invalid)
+    values = {
+        name: _take(column, valid)
+        for name, column in {**columns, 'net_fee': net_fee}.items()
+    }
+    values['provider_npi'] = [str(npi) for npi in values['provider_npi']]
+    values['id'] = [str(uuid.uuid4()) for _ in range(len(valid))]
+    records = [dict(zip(values, row)) for row in zip(*values.values())]
+
+    return records, _row_errors(rows, errors, np.flatnonzero(invalid))
+
+
+def _raw_column(rows: Sequence[Tuple[int, dict]], name: str) -> list:
+    alias = ALIASES[name]
+    return [row.get(alias, MISSING) for _, row in rows]
+
+
+def _text_array(values: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert raw values to a unicode array, returning it with a mask of the string entries.
+    """
+    if _all_present(values):
+        return np.array(values, dtype=str), np.ones(len(values), dtype=bool)
+
+    present = np.fromiter((isinstance(value, str) for value in values), bool, len(values))
+    text = np.array([value if isinstance(value, str) else '' for value in values], dtype=str)
+    return text, present
+
+
+def _all_present(values: list) -> bool:
+    return None not in values and MISSING not in values
+
+
+def _absent_errors(values: list, field_errors: Dict[int, str], invalid_type: str):
+    if _all_present(values):
+        return
+
+    for index, value in enumerate(values):
+        if value is MISSING:
+            field_errors[index] = FIELD_REQUIRED
+        elif value is None:
+            field_errors[index] = invalid_type
+
+
+def _currency_column(values: list, field_errors: Dict[int, str]) -> np.ndarray:
+    """
+    Parse dollar amounts such as `$100.00` to integer cents, digit-wise rather than as floats.
+    """
+    _absent_errors(values, field_errors, INVALID_INTEGER)
+    text, present = _text_array(values)
+    cents = np.zeros(len(values), dtype=np.int64)
+
+    indices = np.flatnonzero(present)
+    if not indices.size:
+        return cents
+
+    cleaned = np.char.strip(np.char.replace(text[present], '$', ''))
+    whole, _, fraction = np.char.partition(cleaned, '.').T
+
+    # NOTE: plain amounts (`100`, `100.5`, `.50`) are converted with array operations;
+    # signs, exponents, extra decimals and invalid amounts go through `parse_cents`
+    plain = (
+        (np.char.isdecimal(whole) | ((whole == '') & (fraction != '')))
+        & (np.char.isdecimal(fraction) | (fraction == ''))
+        & (np.char.str_len(whole) <= MAX_FAST_DOLLAR_DIGITS)
+        & (np.char.str_len(fraction) <= 2)
+    )
+    # NOTE: numpy's string functions fail on empty selections, e.g. a blank column
+    if plain.any():
+        cents[indices[plain]] = (
+            np.char.add('0', whole[plain]).astype(np.int64) * 100
+            + np.char.ljust(fraction[plain], 2, '0').astype(np.int64)
+        )
+
+    for index, value in zip(indices[~plain], cleaned[~plain].tolist()):
+        cents[index], message = _parse_currency(value)
+        if message:
+            field_errors[int(index)] = message
+
+    for index in np.flatnonzero(present & (cents < 0)):
+        field_errors.setdefault(int(index), NEGATIVE_AMOUNT)
+
+    return cents
+
+
+def _string_column(values: list, field_errors: Dict[int, str]) -> np.ndarray:
+    _absent_errors(values, field_errors, INVALID_STRING)
+    text, _ = _text_array(values)
+    return text
+
+
+def _npi_column(values: list, field_errors: Dict[int, str]) -> np.ndarray:
+    _absent_errors(values, field_errors, INVALID_INTEGER)
+    text, present = _text_array(values)
+    npis = np.zeros(len(values), dtype=np.int64)
+
+    stripped = np.char.strip(text)
+    codes = stripped.astype(f'U{NPI_LENGTH}').view(np.uint32).reshape(len(values), NPI_LENGTH)
+    well_formed = (
+        present
+        & (np.char.str_len(stripped) == NPI_LENGTH)
+        & np.all((codes >= ord('0')) & (codes <= ord('9')), axis=1)
+        & (codes[:, 0] != ord('0'))
+    )
+    npis[well_formed] = stripped[well_formed].astype(np.int64)
+
+    # NOTE: anything but a plain 10-digit number goes through pydantic's own int parsing
+    for index in np.flatnonzero(present & ~well_formed):
+        npis[index], message = _parse_npi(str(text[index]))
+        if message:
+            field_errors[int(index)] = message
+
+    return npis
+
+
+def _service_date_column(values: list, field_errors: Dict[int, str]) -> list:
+    _absent_errors(values, field_errors, INVALID_DATETIME)
+    dates = []
+
+    for index, value in enumerate(values):
+        parsed, message = _parse_service_date(value) if isinstance(value, str) else (None, None)
+        if message:
+            field_errors[index] = message
+        dates.append(parsed)
+
+    return dates
+
+
+@lru_cache(maxsize=4096)
+def _parse_currency(value: str) -> Tuple[int, Optional[str]]:
+    try:
+        return parse_cents(value), None
+    except ValueError as error:
+        return 0, f'Value error, {error}'
+
+
+@lru_cache(maxsize=4096)
+def _parse_npi(value: str) -> Tuple[int, Optional[str]]:
+    try:
+        npi = _int_adapter.validate_python(value)
+    except ValidationError as error:
+        return 0, error.errors()[0]['msg']
+
+    if len(str(npi)) != NPI_LENGTH:
+        return 0, INVALID_NPI
+    return npi, None
+
+
+@lru_cache(maxsize=4096)
+def _parse_service_date(value: str) -> Tuple[Optional[datetime], Optional[str]]:
+    """
+    Parse a service date, caching the result since files reuse a handful of dates.
+    """
+    try:
+        return datetime.strptime(value, SERVICE_DATE_FORMAT), None
+    except ValueError as error:
+        return None, f'Value error, {error}'
+
+
+def _take(column, indices: np.ndarray) -> list:
+    if isinstance(column, np.ndarray):
+        return column[indices].tolist()
+    return [column[index] for index in indices]
+
+
+def _row_errors(
+    rows: Sequence[Tuple[int, dict]],
+    errors: Dict[str, Dict[int, str]],
+    invalid: np.ndarray,
+) -> List[RowError]:
+    """
+    Collect the errors of each invalid row, ordered like `ClaimModel` reports them.
+    """
+    return [
+        RowError(row=rows[index][0], field=ALIASES[name], message=field_errors[index])
+        for index in invalid.tolist()
+        for name, field_errors in errors.items()
+        if index in field_errors
+    ]
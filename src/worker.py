@@ -0,0 +1,86 @@
+"""
+Ingest worker pool: processes the jobs queued by `POST /ingest`.
+
+Usage:
+    python -m src.worker [--processes N]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from src.cache import cache
+from src.db import session
+from src.jobs import run_worker
+from src.logs import configure_logging, stop_logging
+
+INGEST_WORKER_PROCESSES = int(os.environ.get('INGEST_WORKER_PROCESSES', os.cpu_count() or 1))
+
+
+async def serve():
+    """
+    Run a worker until the process receives SIGTERM or SIGINT.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    redis_connection = redis.from_url(
+        os.environ['REDIS_URL'], encoding='utf-8', decode_responses=True
+    )
+    cache.connect(redis_connection)
+
+    try:
+        await run_worker(session, stop)
+    finally:
+        await redis_connection.aclose()
+
+
+def work():
+    configure_logging()
+    try:
+        logging.info('Ingest worker %s started', os.getpid())
+        asyncio.run(serve())
+        logging.info('Ingest worker %s stopped', os.getpid())
+    finally:
+        stop_logging()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.worker', description=__doc__)
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=INGEST_WORKER_PROCESSES,
+        help='number of worker processes (default: the number of CPUs)',
+    )
+    arguments = parser.parse_args(argv)
+
+    # NOTE: spawned workers import the application afresh, each with its own engine
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=work) for _ in range(arguments.processes)]
+
+    for worker in workers:
+        worker.start()
+
+    def terminate(signum, frame):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    for worker in workers:
+        worker.join()
+
+    return max((abs(worker.exitcode or 0) for worker in workers), default=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
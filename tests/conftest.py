@@ -1,15 +1,27 @@
-from unittest.mock import MagicMock, patch
+import os
+from unittest.mock import patch
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('REDIS_URL', 'redis://localhost:6379')
+os.environ.setdefault('CACHE_ENABLED', 'false')
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from src.db import _get_db
-from src.main import app
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.db import (
+    _get_db,
+    _get_read_db,
+    _get_read_session_factory,
+    _get_session_factory,
+    async_database_url,
+)
+from src.logs import stop_logging
+from src.main import app, providers_rate_limiter
 from src.repo import Base
 
-DATABASE_URL = 'sqlite:///:memory:'
 PREDEFINED_UUIDS = [
     'ccf696f7-dcdd-4e4a-a79e-37360507211a',
     'af487174-b85c-4ffc-8127-5dc035fb8f2f',
@@ -24,44 +36,77 @@ def mock_uuid4():
         yield
 
 
+@pytest.fixture(autouse=True)
+def reset_logging():
+    yield
+    # NOTE: a listener started by a test writes to that test's captured stderr
+    stop_logging()
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
 # heavily borrowed the following from: https://stackoverflow.com/questions/67255653/how-to-set-up-and-tear-down-a-database-between-tests-in-fastapi
 @pytest.fixture(scope='session')
-def engine():
-    engine = create_engine(DATABASE_URL)
+def database_url(tmp_path_factory):
+    # NOTE: a file database so connections opened on the test client's event loop share it
+    return f"sqlite:///{tmp_path_factory.mktemp('db') / 'claim.db'}"
+
+
+@pytest.fixture(scope='session')
+def sync_engine(database_url):
+    engine = create_engine(database_url)
     yield engine
     engine.dispose()
 
 
 @pytest.fixture(scope='session')
-def tables(engine):
-    Base.metadata.create_all(bind=engine)
+def engine(database_url):
+    return create_async_engine(async_database_url(database_url), poolclass=NullPool)
+
+
+@pytest.fixture(scope='session')
+def tables(sync_engine):
+    Base.metadata.create_all(bind=sync_engine)
     yield
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=sync_engine)
 
 
 @pytest.fixture
-def db_session(engine, tables):
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def session_factory(engine, sync_engine, tables):
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    with sync_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
 
 
 @pytest.fixture
-def client(db_session):
-    app.dependency_overrides[_get_db] = lambda: db_session
-    with TestClient(app) as c:
-        yield c
+async def db_session(session_factory):
+    async with session_factory() as db:
+        yield db
 
 
-@pytest.fixture
-def mock_db():
-    mock = MagicMock()
-    return mock
+@pytest.fixture(autouse=True)
+def override_db_dependency(session_factory):
+    async def _get_test_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[_get_db] = _get_test_db
+    app.dependency_overrides[_get_session_factory] = lambda: session_factory
+    app.dependency_overrides[_get_read_db] = _get_test_db
+    app.dependency_overrides[_get_read_session_factory] = lambda: session_factory
 
 
 @pytest.fixture(autouse=True)
-def override_db_dependency(mock_db):
-    app.dependency_overrides[_get_db] = lambda: mock_db
+def override_rate_limiter():
+    app.dependency_overrides[providers_rate_limiter] = lambda: None
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
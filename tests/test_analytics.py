@@ -0,0 +1,141 @@
+import io
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from src.admin import main as admin
+from src.analytics import month_windows, rebuild_daily_stats
+from src.ingest import ingest_claims
+from src.main import app
+from src.repo import ClaimDailyStats
+
+client = TestClient(app)
+
+HEADER = (
+    'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+    'provider fees,Allowed fees,member coinsurance,member copay\n'
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    yield
+
+
+def _claims_csv(*claims) -> bytes:
+    return (
+        HEADER
+        + ''.join(
+            f'{service_date},{procedure},,{plan_group},3730189502,{provider_npi},'
+            f'${provider_fees},$100.00,$0.00,$0.00\n'
+            for service_date, procedure, plan_group, provider_npi, provider_fees in claims
+        )
+    ).encode()
+
+
+CLAIMS = _claims_csv(
+    # a Wednesday, the following Sunday and the Monday after that
+    ('3/28/18 0:00', 'D0180', 'GRP-1000', '1497775530', '110.00'),
+    ('3/28/18 9:30', 'D0210', 'GRP-1000', '1497775530', '120.00'),
+    ('4/1/18 0:00', 'D0180', 'GRP-2000', '1497775530', '130.00'),
+    ('4/2/18 0:00', 'D0180', 'GRP-1000', '1234567893', '140.00'),
+)
+
+
+@pytest.fixture
+async def claims(db_session):
+    await ingest_claims(db_session, io.BytesIO(CLAIMS))
+    await db_session.commit()
+
+
+def _analytics(**params):
+    response = client.get('/analytics', params={'start': '2018-03-01', 'end': '2018-05-01', **params})
+    assert response.status_code == 200
+    return [
+        (bucket['period_start'], bucket['claim_count'], bucket['total_net_fee'])
+        for bucket in response.json()
+    ]
+
+
+@pytest.mark.anyio
+async def test_totals_are_summed_per_period(claims):
+    assert _analytics(granularity='day') == [
+        ('2018-03-28', 2, 30.0),
+        ('2018-04-01', 1, 30.0),
+        ('2018-04-02', 1, 40.0),
+    ]
+    assert _analytics(granularity='week') == [('2018-03-26', 3, 60.0), ('2018-04-02', 1, 40.0)]
+    assert _analytics(granularity='month') == [('2018-03-01', 2, 30.0), ('2018-04-01', 2, 70.0)]
+    assert _analytics(granularity='month', end='2018-04-02') == [
+        ('2018-03-01', 2, 30.0),
+        ('2018-04-01', 1, 30.0),
+    ]
+
+
+@pytest.mark.anyio
+async def test_totals_are_grouped_and_filtered(claims):
+    response = client.get(
+        '/analytics',
+        params={
+            'start': '2018-03-01',
+            'end': '2018-05-01',
+            'granularity': 'month',
+            'group_by': ['plan_group', 'plan_group'],
+            'provider_npi': '1497775530',
+        },
+    )
+
+    assert response.json() == [
+        {
+            'period_start': '2018-03-01',
+            'plan_group': 'GRP-1000',
+            'claim_count': 2,
+            'total_net_fee': 30.0,
+            'average_net_fee': 15.0,
+        },
+        {
+            'period_start': '2018-04-01',
+            'plan_group': 'GRP-2000',
+            'claim_count': 1,
+            'total_net_fee': 30.0,
+            'average_net_fee': 30.0,
+        },
+    ]
+
+
+def test_analytics_range_is_validated():
+    response = client.get('/analytics', params={'start': '2018-04-01', 'end': '2018-04-01'})
+
+    assert response.status_code == 400
+    assert client.get('/analytics', params={'start': '2018-04-01'}).status_code == 422
+
+
+@pytest.mark.anyio
+async def test_rebuild_matches_incremental_rollup(claims, db_session):
+    async def rollup():
+        return (await db_session.execute(select(ClaimDailyStats.__table__))).all()
+
+    incremental = await rollup()
+    await db_session.execute(delete(ClaimDailyStats))
+
+    for start, end in month_windows(date(2018, 3, 15), date(2018, 4, 2)):
+        await rebuild_daily_stats(db_session, start, end)
+
+    assert len(await rollup()) == 3
+
+    assert await rebuild_daily_stats(db_session) == 4
+    assert await rollup() == incremental
+
+
+def test_month_windows():
+    assert month_windows(date(2018, 1, 15), date(2018, 3, 2)) == [
+        (date(2018, 1, 15), date(2018, 2, 1)),
+        (date(2018, 2, 1), date(2018, 3, 1)),
+        (date(2018, 3, 1), date(2018, 3, 2)),
+    ]
+
+
+def test_rebuild_command_requires_a_full_range():
+    assert admin(['rebuild-daily-stats', '--start', '2018-03-01']) == 2
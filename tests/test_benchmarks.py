@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.generate import claims_csv, npi_check_digit
+from benchmarks.report import summarize
+from common.utilities import iter_csv_rows
+from src.validation import validate_claim_columns
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: each validated row needs a distinct id
+    yield
+
+
+def test_npi_check_digit():
+    # NOTE: the example NPI of the CMS check digit specification
+    assert npi_check_digit('123456789') == 3
+
+
+@pytest.mark.parametrize('bad_ratio, failed', [(0, 0), (1, 200)])
+def test_generated_claims_validate(bad_ratio, failed):
+    content = claims_csv(200, bad_ratio=bad_ratio, seed=1)
+    rows = list(enumerate(iter_csv_rows(io.BytesIO(content)), start=1))
+
+    records, errors = validate_claim_columns(rows)
+
+    assert len(records) == 200 - failed
+    assert len({error.row for error in errors}) == failed
+    assert claims_csv(200, bad_ratio=bad_ratio, seed=1) == content
+
+
+def test_summarize():
+    summary = summarize([0.001 * latency for latency in range(1, 101)], elapsed=2, units=10)
+
+    assert summary['count'] == 100
+    assert summary['throughput'] == 500
+    assert summary['latency_ms']['p50'] == pytest.approx(50.5)
+    assert summary['latency_ms']['p99'] == pytest.approx(99.01)
+
+
+def test_compare_flags_regressions():
+    def report(throughput, p95):
+        return {'results': {'ingest': {'throughput': throughput, 'latency_ms': {'p95': p95}}}}
+
+    assert compare(report(100, 10), report(95, 10.5), threshold=0.1)[1] is False
+    assert compare(report(100, 10), report(80, 10), threshold=0.1)[1] is True
+    assert compare(report(100, 10), report(100, 12), threshold=0.1)[1] is True
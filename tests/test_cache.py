@@ -0,0 +1,132 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+from fastapi.testclient import TestClient
+
+from src.cache import PROVIDERS_KEY, LocalCache, ResponseCache, cache, claim_key
+from src.main import app
+from src.repo import ProviderStats
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: fakeredis generates real uuids for its connections
+    yield
+
+
+@pytest.fixture
+def redis_connection():
+    return FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.mark.anyio
+async def test_cache_reads_through_local_and_redis_tiers(redis_connection):
+    cache = ResponseCache(redis_connection, enabled=True)
+    await cache.set(claim_key('1'), [{'id': '1'}], ttl=60)
+
+    assert await cache.get(claim_key('1')) == [{'id': '1'}]
+    cache.local.clear()
+    assert await cache.get(claim_key('1')) == [{'id': '1'}]
+    assert await cache.get(claim_key('2')) is None
+
+    assert cache.stats() == {
+        'hits': {'claim.local': 1, 'claim.redis': 1},
+        'misses': {'claim': 1},
+    }
+
+
+@pytest.mark.anyio
+async def test_cache_invalidates_grouped_entries(redis_connection):
+    cache = ResponseCache(redis_connection, enabled=True)
+    other_worker = ResponseCache(redis_connection, enabled=True)
+    await cache.set(PROVIDERS_KEY, [{'provider_npi': '1'}], ttl=60, field='10')
+    await cache.set(PROVIDERS_KEY, [], ttl=60, field='5')
+
+    await other_worker.invalidate(PROVIDERS_KEY)
+    cache.local.clear()
+
+    assert await cache.get(PROVIDERS_KEY, field='10') is None
+    assert await cache.get(PROVIDERS_KEY, field='5') is None
+
+
+@pytest.mark.anyio
+async def test_disabled_cache_never_hits(redis_connection):
+    cache = ResponseCache(redis_connection, enabled=False)
+    await cache.set(claim_key('1'), [{'id': '1'}], ttl=60)
+
+    assert await cache.get(claim_key('1')) is None
+    assert await redis_connection.keys() == []
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = LocalCache(size=2, ttl=60)
+    local.set('a', 1)
+    local.set('b', 2)
+    local.get('a')
+    local.set('c', 3)
+
+    assert (local.get('a'), local.get('b'), local.get('c')) == (1, None, 3)
+
+
+@pytest.fixture
+def app_cache(redis_connection):
+    cache.connect(redis_connection)
+    cache.enabled = True
+    cache.local.clear()
+    cache.hits.clear()
+    cache.misses.clear()
+    yield cache
+    cache.connect(None)
+    cache.enabled = False
+    cache.local.clear()
+
+
+def test_providers_are_served_from_cache_until_claims_are_posted(app_cache, sync_engine):
+    _post_claims()
+    first = client.get('/providers')
+
+    with sync_engine.begin() as connection:
+        connection.execute(ProviderStats.__table__.delete())
+    second = client.get('/providers')
+
+    assert second.json() == first.json()
+    assert app_cache.hits['providers.local'] == 1
+
+    # NOTE: claims of another subscriber, so they aren't skipped as duplicates
+    _post_claims(subscriber_number='3730189503')
+
+    assert client.get('/providers').json()[0]['claim_count'] == 4
+
+
+@pytest.mark.anyio
+async def test_post_claims_drops_the_provider_leaderboard(app_cache, redis_connection):
+    await app_cache.set(PROVIDERS_KEY, [], ttl=60, field='10')
+
+    _post_claims()
+
+    assert await redis_connection.exists(f'{app_cache.prefix}:{PROVIDERS_KEY}') == 0
+    assert await app_cache.get(PROVIDERS_KEY, field='10') is None
+
+
+def test_local_cache_deletes_exact_keys_and_groups():
+    local = LocalCache(size=10, ttl=60)
+    local.set('a', 1)
+    local.set('ab', 2)
+    local.set(('a', '10'), 3)
+    local.set(('a', '5'), 4)
+
+    local.delete('a')
+    local.delete_group('a')
+
+    assert (local.get('a'), local.get('ab'), local.get(('a', '10'))) == (None, 2, None)
+
+
+def _post_claims(subscriber_number: str = '3730189502'):
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        content = f.read().replace(b'3730189502', subscriber_number.encode())
+
+    response = client.post(
+        '/claims', files={'csv_file': ('claim_1234.csv', content, 'text/csv')}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+
+import src.db
+from src.db import (
+    DB_READ_PRIMARY_COOKIE,
+    async_database_url,
+    check_replicas,
+    dispose_engine,
+    get_engine,
+    get_engines,
+    get_read_session_factory,
+    get_session_factory,
+    monitor_replicas,
+    reads_primary,
+    warm_pool,
+)
+from src.main import app
+
+
+@pytest.mark.parametrize(
+    'url, expected',
+    [
+        ('postgresql://user:pass@db/claim', 'postgresql+asyncpg://user:***@db/claim'),
+        ('postgresql+psycopg2://user:pass@db/claim', 'postgresql+asyncpg://user:***@db/claim'),
+        ('sqlite:///claim.db', 'sqlite+aiosqlite:///claim.db'),
+    ],
+)
+def test_async_database_url(url, expected):
+    assert str(async_database_url(url)) == expected
+
+
+@pytest.fixture
+async def process_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'process.db'}")
+    monkeypatch.delenv('DATABASE_REPLICA_URLS', raising=False)
+    yield
+    await dispose_engine()
+
+
+@pytest.mark.anyio
+async def test_engine_is_built_once_per_process(process_engine, monkeypatch):
+    engine = get_engine()
+    assert get_engine() is engine
+    assert get_session_factory().kw['bind'] is engine
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+
+    assert get_engine() is not engine
+
+
+@pytest.mark.anyio
+async def test_dispose_engine_rebuilds_on_next_use(process_engine):
+    engine = get_engine()
+    await dispose_engine()
+
+    assert get_engine() is not engine
+
+
+@pytest.fixture
+def pooled_engine(process_engine, monkeypatch):
+    # NOTE: SQLite doesn't pool connections by default, PostgreSQL's pool is emulated
+    monkeypatch.setattr(
+        src.db,
+        'build_engine',
+        lambda url: create_async_engine(
+            async_database_url(url), poolclass=AsyncAdaptedQueuePool, pool_size=5
+        ),
+    )
+
+
+@pytest.mark.anyio
+async def test_warm_pool(pooled_engine):
+    assert await warm_pool(3) == 3
+    assert get_engine().pool.checkedin() == 3
+
+
+@pytest.mark.anyio
+async def test_warm_pool_is_capped_at_pool_size(pooled_engine):
+    assert await warm_pool(8) == 5
+    assert get_engine().pool.checkedin() == 5
+
+
+@pytest.fixture
+async def replicated(tmp_path, monkeypatch):
+    urls = {}
+    for name in ('primary', 'replica-1', 'replica-2'):
+        path = tmp_path / f'{name}.db'
+        with sqlite3.connect(path) as connection:
+            connection.execute('CREATE TABLE origin (name TEXT)')
+            connection.execute('INSERT INTO origin VALUES (?)', (name,))
+        urls[name] = f'sqlite:///{path}'
+
+    monkeypatch.setenv('DATABASE_URL', urls['primary'])
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"{urls['replica-1']},{urls['replica-2']}")
+    yield urls
+    await dispose_engine()
+
+
+async def _origin(session_factory) -> str:
+    async with session_factory() as db:
+        return await db.scalar(text('SELECT name FROM origin'))
+
+
+@pytest.mark.anyio
+async def test_reads_are_spread_over_replicas(replicated):
+    origins = [await _origin(get_read_session_factory()) for _ in range(4)]
+
+    assert sorted(origins) == ['replica-1', 'replica-1', 'replica-2', 'replica-2']
+    assert origins[0] != origins[1]
+    assert await _origin(get_session_factory()) == 'primary'
+    assert list(get_engines()) == ['primary', 'replica-1', 'replica-2']
+
+
+@pytest.mark.anyio
+async def test_unhealthy_replicas_are_skipped(replicated, tmp_path, monkeypatch):
+    missing = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"{replicated['replica-1']},{missing}")
+
+    assert await check_replicas() == ['replica-1']
+    assert {await _origin(get_read_session_factory()) for _ in range(3)} == {'replica-1'}
+
+
+@pytest.mark.anyio
+async def test_reads_fall_back_to_the_primary(replicated, tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+    assert await check_replicas() == []
+    assert await _origin(get_read_session_factory()) == 'primary'
+
+
+@pytest.mark.anyio
+async def test_monitor_keeps_checking_after_a_failure(monkeypatch):
+    checks = []
+
+    async def check_replicas():
+        checks.append(len(checks))
+        if len(checks) == 1:
+            raise RuntimeError('unexpected')
+        if len(checks) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(src.db, 'check_replicas', check_replicas)
+
+    with pytest.raises(asyncio.CancelledError):
+        await monitor_replicas(interval=0)
+    assert checks == [0, 1, 2]
+
+
+@pytest.mark.anyio
+async def test_reads_without_replicas_use_the_primary(process_engine):
+    assert get_read_session_factory() is get_session_factory()
+
+
+@pytest.mark.parametrize(
+    'headers, expected',
+    [
+        ([], False),
+        ([(b'cookie', f'{DB_READ_PRIMARY_COOKIE}=1'.encode())], True),
+        ([(b'x-read-primary', b'true')], True),
+    ],
+)
+def test_reads_primary(headers, expected):
+    request = Request({'type': 'http', 'headers': headers})
+
+    assert reads_primary(request) == expected
+
+
+@pytest.mark.anyio
+async def test_writes_pin_the_client_to_the_primary(replicated):
+    client = TestClient(app)
+
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        response = client.post('/claims', files={'csv_file': ('claim_1234.csv', f, 'text/csv')})
+
+    assert response.status_code == 200
+    assert DB_READ_PRIMARY_COOKIE in response.cookies
+    assert DB_READ_PRIMARY_COOKIE not in client.get('/claims').cookies
@@ -0,0 +1,130 @@
+import gzip
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.parquet
+import pytest
+from fastapi.testclient import TestClient
+
+from src.admin import main as admin
+from src.export import EXPORT_SCHEMA
+from src.main import app
+from src.repo import CLAIM_INTERNAL_COLUMNS, CLAIM_MONEY_COLUMNS, Claim
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def claims(sync_engine, session_factory):
+    records = [
+        _record('c', '1497775530', datetime(2018, 3, 28), 1015),
+        _record('a', '1497775530', datetime(2018, 3, 28), 10),
+        _record('b', '1234567890', datetime(2018, 3, 27), 9999999999999),
+        _record('d', '1497775530', datetime(2018, 4, 2), None),
+    ]
+    with sync_engine.begin() as connection:
+        connection.execute(Claim.__table__.insert(), records)
+
+
+def test_schema_matches_claim_columns():
+    assert EXPORT_SCHEMA.names == [
+        column.name
+        for column in Claim.__table__.columns
+        if column.name not in CLAIM_INTERNAL_COLUMNS
+    ]
+    for name in CLAIM_MONEY_COLUMNS:
+        assert EXPORT_SCHEMA.field(name).type == pa.decimal128(19, 2)
+    assert EXPORT_SCHEMA.field('service_date').type == pa.timestamp('us')
+    assert not EXPORT_SCHEMA.field('id').nullable
+
+
+def test_claims_are_exported_as_parquet(claims, monkeypatch):
+    monkeypatch.setattr('src.export.EXPORT_BATCH_SIZE', 2)
+
+    response = client.get('/claims/export')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+    assert 'claims.parquet' in response.headers['content-disposition']
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(response.content))
+    assert parquet.schema_arrow == EXPORT_SCHEMA
+    assert parquet.num_row_groups == 2
+    table = parquet.read()
+    assert table.column('id').to_pylist() == ['b', 'a', 'c', 'd']
+    assert table.column('net_fee').to_pylist() == [
+        Decimal('99999999999.99'),
+        Decimal('0.10'),
+        Decimal('10.15'),
+        None,
+    ]
+
+
+def test_claims_are_exported_as_arrow(claims):
+    response = client.get(
+        '/claims/export',
+        params={
+            'format': 'arrow',
+            'provider_npi': '1497775530',
+            'service_date_to': '2018-04-01T00:00:00',
+        },
+    )
+
+    assert response.status_code == 200
+    table = pyarrow.ipc.open_stream(response.content).read_all()
+    assert table.schema == EXPORT_SCHEMA
+    assert table.column('id').to_pylist() == ['a', 'c']
+    assert table.column('service_date').to_pylist() == [datetime(2018, 3, 28)] * 2
+
+
+def test_claims_are_exported_as_gzip_csv(claims):
+    response = client.get('/claims/export', params={'format': 'csv', 'plan_group': 'GRP-1000'})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/gzip'
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert lines[0].startswith('"id","allowed_fees"')
+    assert lines[1].startswith('"b",90.00,0.00,0.00,99999999999.99,')
+    assert len(lines) == 5
+
+
+def test_empty_export(session_factory):
+    response = client.get('/claims/export')
+
+    assert pyarrow.parquet.read_table(io.BytesIO(response.content)).num_rows == 0
+
+
+def test_unsupported_format_is_rejected(session_factory):
+    assert client.get('/claims/export', params={'format': 'xlsx'}).status_code == 422
+
+
+def test_export_command(claims, session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr('src.admin.session', session_factory)
+    output = tmp_path / 'claims.csv.gz'
+
+    arguments = ['--format', 'csv', '--output', str(output), '--start', '2018-03-28']
+
+    assert admin(['export-claims', *arguments]) == 0
+
+    table = pyarrow.csv.read_csv(output)
+    assert table.column('id').to_pylist() == ['a', 'c', 'd']
+
+
+def _record(claim_id: str, provider_npi: str, service_date: datetime, net_fee) -> dict:
+    return {
+        'id': claim_id,
+        'allowed_fees': 9000,
+        'member_coinsurance': 0,
+        'member_copay': 0,
+        'net_fee': net_fee,
+        'plan_group': 'GRP-1000',
+        'provider_fees': 10000,
+        'provider_npi': provider_npi,
+        'quadrant': '',
+        'service_date': service_date,
+        'submitted_procedure': 'D0180',
+        'subscriber_number': '3730189502',
+    }
@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from src.idempotency import begin_ingest_batch, upload_digest
+from src.main import app
+from src.repo import Claim, IngestBatch
+
+client = TestClient(app)
+
+CLAIMS = (
+    b'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+    b'provider fees,Allowed fees,member coinsurance,member copay\n'
+    b'3/28/18 0:00,D0180,,GRP-1000,3730189502,1497775530,$100.00,$90.00,$0.00,$0.00\n'
+    b'3/28/18 0:00,D0210,,GRP-1000,3730189502,1497775530,$100.00,$90.00,$0.00,$0.00\n'
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    yield
+
+
+def _upload(content: bytes = CLAIMS, headers=None):
+    return client.post(
+        '/claims', files={'csv_file': ('claims.csv', content, 'text/csv')}, headers=headers
+    )
+
+
+def test_upload_digest_rewinds_the_files():
+    files = [io.BytesIO(b'a'), io.BytesIO(b'b')]
+
+    assert upload_digest(files[:1]) == upload_digest([io.BytesIO(b'a')])
+    assert upload_digest(files) != upload_digest(files[::-1])
+    assert [file.read() for file in files] == [b'a', b'b']
+
+
+@pytest.mark.anyio
+async def test_retried_upload_returns_the_stored_summary(session_factory):
+    first = _upload()
+    retry = _upload()
+
+    assert retry.status_code == 200
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.json() == first.json()
+    assert (first.json()['inserted'], first.json()['duplicates']) == (2, 0)
+
+    async with session_factory() as db:
+        [batch] = (await db.scalars(select(IngestBatch))).all()
+        linked = await db.scalar(
+            select(func.count()).where(Claim.ingest_batch_id == batch.id)
+        )
+
+    assert batch.id == f'sha256:{upload_digest([io.BytesIO(CLAIMS)])}'
+    assert batch.summary == first.json()
+    assert linked == 2
+
+
+def test_idempotency_key_identifies_the_upload(session_factory):
+    first = _upload(headers={'Idempotency-Key': 'upload-1'})
+    # NOTE: the same files under another key are a new upload, whose claims are duplicates
+    other = _upload(headers={'Idempotency-Key': 'upload-2'})
+
+    assert (first.json()['inserted'], other.json()['duplicates']) == (2, 2)
+    assert 'Idempotent-Replayed' not in other.headers
+
+    retry = _upload(headers={'Idempotency-Key': 'upload-1'})
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+    response = _upload(CLAIMS.replace(b'D0210', b'D0220'), {'Idempotency-Key': 'upload-1'})
+    assert response.status_code == 422
+
+
+def test_failed_upload_is_not_recorded(session_factory):
+    response = _upload(b'\x1f\x8b truncated gzip')
+    assert response.status_code == 400
+
+    retry = _upload(b'\x1f\x8b truncated gzip')
+    assert retry.status_code == 400
+    assert 'Idempotent-Replayed' not in retry.headers
+
+
+@pytest.mark.anyio
+async def test_batch_is_begun_once(db_session):
+    assert await begin_ingest_batch(db_session, 'key:upload-1', 'digest')
+    await db_session.commit()
+
+    assert not await begin_ingest_batch(db_session, 'key:upload-1', 'digest')
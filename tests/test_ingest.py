@@ -0,0 +1,128 @@
+import io
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, insert, select, update
+
+from common.utilities import iter_csv_rows
+from src.bulk import _to_copy_buffer
+from src.ingest import backfill_fingerprints, claim_fingerprint, ingest_claims
+from src.repo import Claim
+
+HEADER = (
+    'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+    'provider fees,Allowed fees,member coinsurance,member copay\n'
+)
+ROW = '3/28/18 0:00,D0180,,GRP-1000,3730189502,1497775530,$100.00,$90.00,$0.00,$0.00\n'
+
+
+def test_iter_csv_rows_decodes_incrementally():
+    content = 'a,b\r\n1,"multi\r\nline"\n2,é\n'.encode('utf-8')
+
+    rows = list(iter_csv_rows(io.BufferedReader(io.BytesIO(content), buffer_size=2)))
+
+    assert rows == [{'a': '1', 'b': 'multi\r\nline'}, {'a': '2', 'b': 'é'}]
+
+
+@pytest.mark.anyio
+async def test_ingest_claims_persists_in_batches(db_session):
+    rows = [ROW, ROW.replace('D0180', 'D0210'), ROW.replace('D0180', 'D4346')]
+    csv_file = io.BytesIO((HEADER + ''.join(rows) + ROW.replace('D0180', 'X0180')).encode())
+
+    summary = await ingest_claims(db_session, csv_file, batch_size=2)
+
+    assert (summary.rows, summary.inserted, summary.failed) == (4, 3, 1)
+    assert summary.errors[0].row == 4
+    assert await db_session.scalar(select(func.count()).select_from(Claim)) == 3
+
+
+@pytest.mark.anyio
+async def test_ingest_claims_skips_duplicates(db_session):
+    await ingest_claims(db_session, io.BytesIO((HEADER + ROW).encode()))
+    # NOTE: the same claim with its amounts formatted differently
+    resubmitted = ROW.replace('$100.00', '100')
+    csv_file = io.BytesIO((HEADER + ROW.replace('D0180', 'D0210') * 2 + resubmitted).encode())
+
+    summary = await ingest_claims(db_session, csv_file, batch_size=2)
+
+    assert (summary.rows, summary.inserted, summary.failed, summary.duplicates) == (3, 1, 0, 2)
+    assert await db_session.scalar(select(func.count()).select_from(Claim)) == 2
+
+
+@pytest.mark.anyio
+async def test_backfill_fingerprints(db_session):
+    await ingest_claims(db_session, io.BytesIO((HEADER + ROW).encode()))
+    await db_session.execute(update(Claim).values(fingerprint=None))
+    await db_session.execute(
+        insert(Claim),
+        [
+            {**_stored_claim('b'), 'submitted_procedure': 'D0210'},
+            _stored_claim('c'),
+        ],
+    )
+
+    assert await backfill_fingerprints(db_session, batch_size=2) == (2, 1)
+    assert await db_session.scalar(
+        select(func.count()).where(Claim.fingerprint.is_(None))
+    ) == 1
+
+
+def test_claim_fingerprint_covers_the_claim_content():
+    record = {
+        'service_date': datetime(2018, 3, 28),
+        'submitted_procedure': 'D0180',
+        'quadrant': None,
+        'provider_npi': '1497775530',
+        'subscriber_number': '3730189502',
+        'provider_fees': 10000,
+        'allowed_fees': 9000,
+        'member_coinsurance': 0,
+        'member_copay': 0,
+        'plan_group': 'GRP-1000',
+    }
+
+    assert claim_fingerprint(record) == claim_fingerprint({**record, 'quadrant': ''})
+    assert claim_fingerprint(record) == claim_fingerprint({**record, 'plan_group': 'GRP-2000'})
+    assert claim_fingerprint(record) != claim_fingerprint({**record, 'allowed_fees': 9001})
+
+
+def test_copy_buffer_distinguishes_empty_strings_from_nulls():
+    record = {
+        'id': 'claim-1',
+        'allowed_fees': 9000,
+        'member_coinsurance': 0,
+        'member_copay': 0,
+        'net_fee': 1000,
+        'plan_group': 'GRP-1000',
+        'provider_fees': 10000,
+        'provider_npi': '1497775530',
+        'quadrant': '',
+        'service_date': datetime(2018, 3, 28),
+        'submitted_procedure': 'D0180',
+        'subscriber_number': None,
+        'fingerprint': 'f' * 64,
+    }
+
+    line = _to_copy_buffer([record]).getvalue()
+
+    assert line == (
+        'claim-1,9000,0,0,1000,GRP-1000,10000,1497775530,,'
+        f"2018-03-28T00:00:00,D0180,\\N,{'f' * 64},\\N\n"
+    )
+
+
+def _stored_claim(claim_id: str) -> dict:
+    return {
+        'id': claim_id,
+        'allowed_fees': 9000,
+        'member_coinsurance': 0,
+        'member_copay': 0,
+        'net_fee': 1000,
+        'plan_group': 'GRP-1000',
+        'provider_fees': 10000,
+        'provider_npi': '1497775530',
+        'quadrant': '',
+        'service_date': datetime(2018, 3, 28),
+        'submitted_procedure': 'D0180',
+        'subscriber_number': '3730189502',
+    }
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from src import jobs
+from src.main import app
+from src.repo import Claim, IngestJob
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: each job and claim needs a distinct id
+    yield
+
+
+@pytest.fixture(autouse=True)
+def spool_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'INGEST_SPOOL_DIRECTORY', str(tmp_path))
+    return tmp_path
+
+
+def test_ingest_job_is_queued_and_processed(session_factory, spool_directory):
+    job = _post_ingest('./resources/claim_1234.csv', batch_size=3)
+
+    assert job['status'] == 'queued'
+    assert list(spool_directory.iterdir()) == [spool_directory / f"{job['id']}.csv"]
+
+    assert asyncio.run(jobs.process_next_job(session_factory))
+    assert not asyncio.run(jobs.process_next_job(session_factory))
+
+    response = client.get(f"/ingest/{job['id']}")
+
+    assert response.status_code == 200
+    assert response.json() | {'rows_per_second': 0} == job | {
+        'status': 'succeeded',
+        'rows': 4,
+        'inserted': 4,
+        'attempts': 1,
+        'rows_per_second': 0,
+        'started_at': response.json()['started_at'],
+        'finished_at': response.json()['finished_at'],
+    }
+    assert list(spool_directory.iterdir()) == []
+
+
+def test_ingest_job_reports_unparseable_files(session_factory, tmp_path):
+    csv_path = tmp_path / 'invalid.csv'
+    csv_path.write_bytes(b'\xff\xfe\x00')
+    job = _post_ingest(csv_path)
+
+    asyncio.run(jobs.process_next_job(session_factory))
+
+    response = client.get(f"/ingest/{job['id']}").json()
+    assert response['status'] == 'failed'
+    assert response['error'].startswith('Error processing file:')
+
+
+@pytest.mark.anyio
+async def test_expired_job_resumes_after_the_committed_rows(
+    session_factory, db_session, monkeypatch
+):
+    monkeypatch.setattr(jobs, 'INGEST_JOB_MAX_ATTEMPTS', 5)
+    job = _post_ingest('./resources/claim_1234.csv', batch_size=3)
+
+    stop = asyncio.Event()
+    stop.set()
+    async with session_factory() as db:
+        claimed = await jobs.claim_next_job(db)
+    assert await jobs.run_ingest_job(session_factory, claimed, stop) == 'queued'
+
+    async with session_factory() as db:
+        claimed = await jobs.claim_next_job(db)
+
+    # NOTE: a worker whose lease was taken over can no longer commit progress
+    await db_session.execute(update(IngestJob).values(attempts=IngestJob.attempts + 1))
+    await db_session.commit()
+    assert await jobs.run_ingest_job(session_factory, claimed) == 'running'
+
+    await db_session.execute(
+        update(IngestJob).values(lease_expires_at=jobs.utcnow() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+    assert await jobs.process_next_job(session_factory)
+
+    result = await db_session.get(IngestJob, job['id'], populate_existing=True)
+    assert (result.status, result.rows, result.inserted, result.attempts) == ('succeeded', 4, 4, 4)
+    assert await db_session.scalar(select(func.count()).select_from(Claim)) == 4
+
+
+def test_ingest_job_not_found():
+    assert client.get('/ingest/unknown').status_code == 404
+
+
+def _post_ingest(path, **params) -> dict:
+    with open(path, 'rb') as f:
+        response = client.post(
+            '/ingest', params=params, files={'csv_file': ('claims.csv', f, 'text/csv')}
+        )
+
+    assert response.status_code == 202
+    assert response.headers['location'] == f"/ingest/{response.json()['id']}"
+    return response.json()
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main
+from src.listing import decode_cursor
+from src.main import app
+from src.repo import Claim
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def claims(sync_engine, session_factory):
+    records = [
+        _record('c', '1497775530', datetime(2018, 3, 28)),
+        _record('a', '1497775530', datetime(2018, 3, 28)),
+        _record('b', '1234567890', datetime(2018, 3, 27), subscriber_number='1000000001'),
+        _record('d', '1497775530', datetime(2018, 4, 2)),
+        _record('e', '1497775530', datetime(2018, 3, 29)),
+    ]
+    with sync_engine.begin() as connection:
+        connection.execute(Claim.__table__.insert(), records)
+
+
+def test_claims_are_paginated_by_keyset(claims):
+    first = client.get('/claims', params={'limit': 2}).json()
+    second = client.get('/claims', params={'limit': 2, 'cursor': first['next_cursor']}).json()
+    last = client.get('/claims', params={'limit': 2, 'cursor': second['next_cursor']}).json()
+
+    assert [claim['id'] for claim in first['claims']] == ['b', 'a']
+    assert [claim['id'] for claim in second['claims']] == ['c', 'e']
+    assert [claim['id'] for claim in last['claims']] == ['d']
+    assert last['next_cursor'] is None
+
+
+def test_claims_are_filtered(claims):
+    response = client.get(
+        '/claims',
+        params={
+            'provider_npi': '1497775530',
+            'service_date_from': '2018-03-28T00:00:00',
+            'service_date_to': '2018-04-01T00:00:00',
+        },
+    )
+
+    assert response.status_code == 200
+    assert [claim['id'] for claim in response.json()['claims']] == ['a', 'c', 'e']
+
+
+def test_claims_are_streamed_as_ndjson(claims):
+    cursor = client.get('/claims', params={'limit': 1}).json()['next_cursor']
+
+    response = client.get('/claims', params={'format': 'ndjson', 'cursor': cursor})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [claim['id'] for claim in lines] == ['a', 'c', 'e', 'd']
+    assert lines[0]['net_fee'] == 10.0
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'W10', 'WyJ4IiwgImEiXQ'])
+def test_malformed_cursor_is_rejected(claims, cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+    for format in ('json', 'ndjson'):
+        response = client.get('/claims', params={'cursor': cursor, 'format': format})
+        assert response.status_code == 400
+
+
+def test_claims_are_retrieved_in_batch(claims):
+    response = client.post('/claims/batch', json={'ids': ['e', 'missing', 'b', 'e', 'a']})
+
+    assert response.status_code == 200
+    assert [claim['id'] for claim in response.json()['claims']] == ['e', 'b', 'a']
+    assert response.json()['missing'] == ['missing']
+
+
+def test_claims_batch_is_limited(claims, monkeypatch):
+    monkeypatch.setattr(src.main, 'CLAIMS_BATCH_MAX_IDS', 2)
+
+    assert client.post('/claims/batch', json={'ids': ['a', 'b', 'c']}).status_code == 400
+    assert client.post('/claims/batch', json={'ids': []}).status_code == 422
+
+
+def test_subscriber_claims_are_listed_most_recent_first(claims):
+    path = '/subscribers/3730189502/claims'
+    first = client.get(path, params={'limit': 3}).json()
+    last = client.get(path, params={'limit': 3, 'cursor': first['next_cursor']}).json()
+
+    assert [claim['id'] for claim in first['claims']] == ['d', 'e', 'c']
+    assert [claim['id'] for claim in last['claims']] == ['a']
+    assert last['next_cursor'] is None
+
+    response = client.get(path, params={'service_date_to': '2018-03-29T00:00:00'})
+    assert [claim['id'] for claim in response.json()['claims']] == ['c', 'a']
+
+
+def _record(
+    claim_id: str,
+    provider_npi: str,
+    service_date: datetime,
+    subscriber_number: str = '3730189502',
+) -> dict:
+    return {
+        'id': claim_id,
+        'allowed_fees': 9000,
+        'member_coinsurance': 0,
+        'member_copay': 0,
+        'net_fee': 1000,
+        'plan_group': 'GRP-1000',
+        'provider_fees': 10000,
+        'provider_npi': provider_npi,
+        'quadrant': '',
+        'service_date': service_date,
+        'submitted_procedure': 'D0180',
+        'subscriber_number': subscriber_number,
+    }
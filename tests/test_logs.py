@@ -0,0 +1,97 @@
+import json
+import logging
+import queue
+
+from src import logs
+from src.metrics import LOG_RECORDS_DROPPED
+
+
+def make_record(level=logging.INFO, **fields):
+    record = logging.LogRecord('claims', level, __file__, 1, 'Processed %s claims', (3,), None)
+    record.__dict__.update(fields)
+    return record
+
+
+class CountingList(list):
+    renders = 0
+
+    def __getitem__(self, index):
+        CountingList.renders += 1
+        return super().__getitem__(index)
+
+
+def test_summarize_logs_count_and_first_ids():
+    claims = [{'id': f'claim-{index}'} for index in range(8)]
+
+    assert str(logs.summarize(claims, limit=2)) == '8 [claim-0, claim-1, +6 more]'
+    assert str(logs.summarize(claims[:1])) == '1 [claim-0]'
+    assert str(logs.summarize([], key='provider_npi')) == '0 []'
+
+
+def test_summaries_are_only_rendered_when_emitted():
+    logger = logging.getLogger('tests.logs.lazy')
+    logger.setLevel(logging.WARNING)
+    claims = CountingList({'id': 'claim'} for _ in range(3))
+
+    logger.info('GET claims results', extra={'claims': logs.summarize(claims)})
+
+    assert CountingList.renders == 0
+
+
+def test_text_format_appends_fields():
+    formatter = logs.TextFormatter('%(levelname)s - %(message)s')
+
+    assert formatter.format(make_record()) == 'INFO - Processed 3 claims'
+    assert (
+        formatter.format(make_record(rows=3, sample=True, claims=logs.summarize([{'id': 'a'}])))
+        == 'INFO - Processed 3 claims rows=3 claims=1 [a]'
+    )
+
+
+def test_json_format_includes_fields():
+    entry = json.loads(logs.JsonFormatter().format(make_record(rows=3, upload='claims.csv')))
+
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'claims'
+    assert entry['message'] == 'Processed 3 claims'
+    assert entry['rows'] == 3
+    assert entry['upload'] == 'claims.csv'
+    assert 'sample' not in entry
+
+
+def test_sampling_only_drops_sampled_records():
+    never = logs.SamplingFilter(0)
+    always = logs.SamplingFilter(1)
+
+    assert not never.filter(make_record(sample=True))
+    assert never.filter(make_record())
+    assert always.filter(make_record(sample=True))
+
+
+def test_background_handler_drops_records_when_queue_is_full():
+    handler = logs.BackgroundHandler(queue.Queue(1))
+    dropped = LOG_RECORDS_DROPPED._value.get()
+
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert LOG_RECORDS_DROPPED._value.get() == dropped + 1
+
+
+def test_records_are_written_by_the_listener_thread(capsys):
+    assert logs.configure_logging(level='INFO', format='json', sample_rate=1)
+    assert not logs.configure_logging()
+
+    logging.getLogger('tests.logs').info('Processed %s claims', 3, extra={'rows': 3})
+    logs.stop_logging()
+
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry['message'] == 'Processed 3 claims'
+    assert entry['rows'] == 3
+
+
+def test_importing_the_application_starts_no_listener():
+    import src.main  # noqa: F401
+
+    assert logs._listener is None
@@ -10,7 +10,7 @@ client = TestClient(app)
 
 
 @freezegun.freeze_time('2018-03-28T00:00:00+00:00')
-def test_post_claims(mock_db, valid_claim_data):
+def test_post_claims(valid_claim_data):
     with open('./resources/claim_1234.csv', 'rb') as f:
         response = client.post(
             '/claims',
@@ -27,65 +27,77 @@ def test_post_claims(mock_db, valid_claim_data):
     assert response.json() == valid_claim_data
 
 
+def test_get_claims():
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        client.post('/claims', files={'csv_file': ('claim_1234.csv', f, 'text/csv')})
+
+    response = client.get('/claims/abb64fc8-cc5f-40d2-9a04-6116a4820b2e')
+
+    assert response.status_code == 200
+    assert response.json()[0]['submitted_procedure'] == 'D4346'
+    assert client.get('/claims/unknown').status_code == 404
+
+
+def test_providers_by_net_fee():
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        client.post('/claims', files={'csv_file': ('claim_1234.csv', f, 'text/csv')})
+
+    response = client.get('/providers', params={'limit': 5})
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            'provider_npi': '1497775530',
+            'total_net_fee': 116.85,
+            'claim_count': 4,
+            'average_net_fee': 29.21,
+        }
+    ]
+
+
+def test_providers_by_net_fee_not_found():
+    assert client.get('/providers').status_code == 404
+
+
+def test_post_claims_reports_row_errors():
+    content = (
+        b'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+        b'provider fees,Allowed fees,member coinsurance,member copay\n'
+        b'3/28/18 0:00,D0180,,GRP-1000,3730189502,1497775530,$100.00,$100.00,$0.00,$0.00\n'
+        b'3/28/18 0:00,X0210,,GRP-1000,3730189502,1497775530,$108.00,$108.00,$0.00,$0.00\n'
+        b'3/28/18 0:00,D4346,,GRP-1000,3730189502,12345,$130.00,$65.00,$16.25,$0.00\n'
+    )
+    response = client.post(
+        '/claims',
+        params={'batch_size': 2},
+        files={'csv_file': ('claims.csv', content, 'text/csv')},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['rows'], body['inserted'], body['failed']) == (3, 1, 2)
+    assert [(error['row'], error['field']) for error in body['errors']] == [
+        (2, 'submitted procedure'),
+        (3, 'Provider NPI'),
+    ]
+
+
+def test_post_claims_rejects_non_csv():
+    response = client.post(
+        '/claims', files={'csv_file': ('claims.txt', b'not a csv', 'text/plain')}
+    )
+
+    assert response.status_code == 400
+
+
 @pytest.fixture
 def valid_claim_data():
-    return {
-        'claims': [
-            {
-                'allowed_fees': 100.0,
-                'id': 'ccf696f7-dcdd-4e4a-a79e-37360507211a',
-                'member_coinsurance': 0.0,
-                'member_copay': 0.0,
-                'plan_group': 'GRP-1000',
-                'provider_fees': 100.0,
-                'provider_npi': 1497775530,
-                'quadrant': '',
-                'service_date': '2018-03-28T00:00:00',
-                'submitted_procedure': 'D0180',
-                'subscriber_number': '3730189502',
-                'net_fee': 0.0,
-            },
-            {
-                'allowed_fees': 108.0,
-                'id': 'af487174-b85c-4ffc-8127-5dc035fb8f2f',
-                'member_coinsurance': 0.0,
-                'member_copay': 0.0,
-                'plan_group': 'GRP-1000',
-                'provider_fees': 108.0,
-                'provider_npi': 1497775530,
-                'quadrant': '',
-                'service_date': '2018-03-28T00:00:00',
-                'submitted_procedure': 'D0210',
-                'subscriber_number': '3730189502',
-                'net_fee': 0.0,
-            },
-            {
-                'allowed_fees': 65.0,
-                'id': 'abb64fc8-cc5f-40d2-9a04-6116a4820b2e',
-                'member_coinsurance': 16.25,
-                'member_copay': 0.0,
-                'plan_group': 'GRP-1000',
-                'provider_fees': 130.0,
-                'provider_npi': 1497775530,
-                'quadrant': '',
-                'service_date': '2018-03-28T00:00:00',
-                'submitted_procedure': 'D4346',
-                'subscriber_number': '3730189502',
-                'net_fee': 81.25,
-            },
-            {
-                'allowed_fees': 178.0,
-                'id': 'd40267d6-132c-4d55-a070-f4a5f00645df',
-                'member_coinsurance': 35.6,
-                'member_copay': 0.0,
-                'plan_group': 'GRP-1000',
-                'provider_fees': 178.0,
-                'provider_npi': 1497775530,
-                'quadrant': 'UR',
-                'service_date': '2018-03-28T00:00:00',
-                'submitted_procedure': 'D4211',
-                'subscriber_number': '3730189502',
-                'net_fee': 35.599999999999994,
-            },
-        ]
+    summary = {
+        'rows': 4,
+        'inserted': 4,
+        'failed': 0,
+        'duplicates': 0,
+        'errors': [],
+        'errors_truncated': False,
     }
+    return {**summary, 'files': [{**summary, 'file': 'claim_1234.csv'}]}
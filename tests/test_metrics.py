@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from src import metrics
+from src.main import app
+
+client = TestClient(app)
+
+
+def test_metrics_expose_stages_queries_and_cache():
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        client.post('/claims', files={'csv_file': ('claim_1234.csv', f, 'text/csv')})
+    client.get('/providers')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    for sample in (
+        'claim_service_ingest_stage_duration_seconds_count{stage="validate"}',
+        'claim_service_ingest_stage_duration_seconds_count{stage="commit"}',
+        'claim_service_ingest_rows_total{outcome="inserted"}',
+        'claim_service_query_duration_seconds_count{query="top_providers"}',
+        'claim_service_http_request_duration_seconds_count{method="POST",route="/claims",status="200"}',
+        'claim_service_db_session_duration_seconds_count',
+    ):
+        assert sample in response.text
+
+
+def test_requests_are_profiled_on_demand(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(metrics, 'PROFILING_DIRECTORY', str(tmp_path))
+
+    assert 'X-Profile' not in client.get('/providers').headers
+
+    response = client.get('/providers', headers={'X-Profile': '1'})
+
+    assert response.status_code == 404
+    assert (tmp_path / response.headers['X-Profile']).read_text().startswith('<!DOCTYPE html>')
+
+
+def test_profiling_is_disabled_by_default():
+    assert metrics.PROFILING_ENABLED is False
+    assert 'X-Profile' not in client.get('/providers', headers={'X-Profile': '1'}).headers
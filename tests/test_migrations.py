@@ -0,0 +1,120 @@
+import io
+import re
+
+import freezegun
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db import async_database_url, init_db, schema_head, schema_version
+from src.repo import Base
+
+
+@pytest.fixture
+def migrated_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    command.upgrade(_config(url), 'head')
+    return url
+
+
+@pytest.fixture
+async def migrated_engine(migrated_url):
+    engine = create_async_engine(async_database_url(migrated_url))
+    yield engine
+    await engine.dispose()
+
+
+def test_migrations_match_models(migrated_url):
+    engine = create_engine(migrated_url)
+
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+    assert diff == []
+
+
+def test_provider_stats_backfill(tmp_path):
+    url = f"sqlite:///{tmp_path / 'backfilled.db'}"
+    command.upgrade(_config(url), '0002')
+    engine = create_engine(url)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO claim VALUES ('1', 90, 0, 0, 10, 'GRP-1000', 100, "
+                "'1497775530', '', '2018-03-28 00:00:00', 'D0180', '3730189502')"
+            )
+        )
+    command.upgrade(_config(url), 'head')
+
+    with engine.connect() as connection:
+        stats = connection.execute(text('SELECT * FROM provider_stats')).all()
+
+    assert stats == [('1497775530', 1, 1000)]
+
+
+def test_daily_stats_backfill(tmp_path):
+    url = f"sqlite:///{tmp_path / 'backfilled.db'}"
+    command.upgrade(_config(url), '0007')
+    engine = create_engine(url)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO claim (id, allowed_fees, member_coinsurance, member_copay, net_fee, "
+                "plan_group, provider_fees, provider_npi, quadrant, service_date, "
+                "submitted_procedure, subscriber_number) VALUES "
+                "('1', 90, 0, 0, 10, 'GRP-1000', 100, '1497775530', '', '2018-03-28 09:30:00', "
+                "'D0180', '3730189502'), "
+                "('2', 90, 0, 0, 20, 'GRP-1000', 110, '1497775530', '', '2018-03-28 16:00:00', "
+                "'D0180', '3730189502')"
+            )
+        )
+    command.upgrade(_config(url), 'head')
+
+    with engine.connect() as connection:
+        stats = connection.execute(text('SELECT * FROM claim_daily_stats')).all()
+
+    assert stats == [('2018-03-28', '1497775530', 'GRP-1000', 'D0180', 2, 3000)]
+
+
+@freezegun.freeze_time('2018-03-28')
+def test_offline_upgrade_creates_the_coming_partitions():
+    config = _config('postgresql://user:pass@db/claim')
+    config.output_buffer = io.StringIO()
+
+    command.upgrade(config, 'head', sql=True)
+
+    script = config.output_buffer.getvalue()
+    partitions = re.findall(r'CREATE TABLE (claim_\w+) PARTITION OF claim', script)
+    assert partitions == [
+        'claim_y2018m03',
+        'claim_y2018m04',
+        'claim_y2018m05',
+        'claim_y2018m06',
+        'claim_default',
+    ]
+
+
+@pytest.mark.anyio
+async def test_schema_version(migrated_engine, engine):
+    assert await schema_version(migrated_engine) == schema_head()
+    assert await schema_version(engine) is None
+
+
+@pytest.mark.anyio
+async def test_init_db(migrated_engine, engine):
+    await init_db(migrated_engine)
+
+    with pytest.raises(RuntimeError, match='alembic upgrade head'):
+        await init_db(engine)
+
+
+def _config(url):
+    config = Config('alembic.ini')
+    config.set_main_option('sqlalchemy.url', url)
+    return config
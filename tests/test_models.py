@@ -10,19 +10,19 @@ def test_valid_claim_model():
     data = _valid_claim_data()
     claim = ClaimModel(**data)
 
-    assert claim.allowed_fees == data['allowed_fees']
+    assert claim.allowed_fees == 10000
     assert claim.provider_npi == data['provider_npi']
-    assert claim.net_fee == -15.0
+    assert claim.net_fee == -1500
     assert claim.submitted_procedure == data['submitted_procedure']
 
 
 @pytest.mark.parametrize(
     'field, value',
     [
-        ('allowed_fees', -10.0),
-        ('member_coinsurance', -5.0),
-        ('member_copay', -3.0),
-        ('provider_fees', -7.0),
+        ('allowed_fees', '-$10.00'),
+        ('member_coinsurance', -500),
+        ('member_copay', 'nan'),
+        ('provider_fees', '$7.0.0'),
         ('provider_npi', '12345'),
         ('provider_npi', '12345678901'),
         ('service_date', 'invalid_date'),
@@ -40,12 +40,12 @@ def test_invalid_claim_model(field, value):
 
 def _valid_claim_data(overrides=None):
     data = {
-        'allowed_fees': 100.0,
+        'allowed_fees': '$100.00',
         'id': 'some-unique-id',
-        'member_coinsurance': 20.0,
-        'member_copay': 15.0,
+        'member_coinsurance': '$20.00',
+        'member_copay': '15',
         'plan_group': 'ABC123',
-        'provider_fees': 50.0,
+        'provider_fees': ' $50.00 ',
         'provider_npi': 1497775530,
         'quadrant': 'Q1',
         'service_date': datetime.now(),
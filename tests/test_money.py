@@ -0,0 +1,41 @@
+import pytest
+
+from src.money import average_cents, format_cents, parse_cents, to_dollars
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        ('$100.00', 10000),
+        (' $16.25 ', 1625),
+        ('100', 10000),
+        ('.5', 50),
+        ('-$1.00', -100),
+        ('1.005', 101),
+        ('1e2', 10000),
+    ],
+)
+def test_parse_cents(value, expected):
+    assert parse_cents(value) == expected
+
+
+@pytest.mark.parametrize('value', ['', 'abc', '$1.2.3', 'nan', 'inf', '1e30'])
+def test_parse_cents_rejects_invalid_amounts(value):
+    with pytest.raises(ValueError, match='Invalid amount'):
+        parse_cents(value)
+
+
+@pytest.mark.parametrize(
+    'total, count, expected',
+    [(5, 2, 2), (7, 2, 4), (10, 3, 3), (11, 3, 4), (-5, 2, -2)],
+)
+def test_average_cents_rounds_half_to_even(total, count, expected):
+    assert average_cents(total, count) == expected
+
+
+def test_amounts_are_converted_exactly():
+    assert format_cents(11685) == '116.85'
+    assert format_cents(-5) == '-0.05'
+    assert to_dollars(11685) == 116.85
+    assert str(to_dollars(999999999999999)) == '9999999999999.99'
+    assert to_dollars(None) is None
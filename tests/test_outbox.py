@@ -0,0 +1,140 @@
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from common.utilities import utcnow
+from src import outbox
+from src.brokers import Broker, FileBroker, RedisStreamBroker, build_broker
+from src.ingest import ingest_claims
+from src.main import app
+from src.repo import DeadLetter, OutboxEvent
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: fakeredis generates uuids of its own
+    yield
+
+
+class FailingBroker(Broker):
+    async def publish_one(self, event):
+        raise ConnectionError('broker unavailable')
+
+
+@pytest.mark.anyio
+async def test_ingest_writes_events_in_the_claims_transaction(db_session):
+    await _ingest(db_session)
+    await db_session.rollback()
+    assert await _count(db_session, OutboxEvent) == 0
+
+    await _ingest(db_session)
+    await db_session.commit()
+
+    events = (await db_session.scalars(select(OutboxEvent))).all()
+    assert len(events) == 4
+    assert events[0].topic == 'claims.created'
+    assert events[0].payload['id'] == events[0].key
+    assert events[0].payload['service_date'] == '2018-03-28T00:00:00'
+
+
+@pytest.mark.anyio
+async def test_events_are_published_to_a_file(db_session, tmp_path):
+    await _ingest(db_session)
+    await db_session.commit()
+    broker = FileBroker(str(tmp_path / 'events.jsonl'))
+
+    assert await outbox.publish_pending(db_session, broker, limit=3) == 3
+    assert await outbox.publish_pending(db_session, broker) == 1
+    assert await outbox.publish_pending(db_session, broker) == 0
+
+    lines = (tmp_path / 'events.jsonl').read_text().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [1, 2, 3, 4]
+    assert await db_session.scalar(
+        select(func.count()).where(OutboxEvent.published_at.is_(None))
+    ) == 0
+
+
+@pytest.mark.anyio
+async def test_brokers_publish_single_events(tmp_path):
+    with pytest.raises(TypeError, match='publish_one'):
+        Broker()
+
+    event = OutboxEvent(id=1, topic='claims.created', key='claim-1', payload={})
+    await FileBroker(str(tmp_path / 'events.jsonl')).publish_one(event)
+    assert json.loads((tmp_path / 'events.jsonl').read_text())['key'] == 'claim-1'
+
+    with pytest.raises(IsADirectoryError):
+        await FileBroker(str(tmp_path)).publish_one(event)
+
+
+@pytest.mark.anyio
+async def test_events_are_published_to_redis_streams(db_session):
+    await _ingest(db_session)
+    await db_session.commit()
+    redis_connection = FakeAsyncRedis(decode_responses=True)
+
+    await outbox.publish_pending(db_session, RedisStreamBroker(redis_connection, prefix='events'))
+
+    entries = await redis_connection.xrange('events:claims.created')
+    assert len(entries) == 4
+    assert json.loads(entries[0][1]['event'])['payload']['provider_npi'] == '1497775530'
+
+
+@pytest.mark.anyio
+async def test_failed_events_are_retried_then_dead_lettered(db_session, monkeypatch):
+    monkeypatch.setattr(outbox, 'OUTBOX_MAX_ATTEMPTS', 2)
+    await _ingest(db_session)
+    await db_session.commit()
+
+    assert await outbox.publish_pending(db_session, FailingBroker()) == 4
+    # NOTE: retries are backed off
+    assert await outbox.publish_pending(db_session, FailingBroker()) == 0
+
+    await db_session.execute(update(OutboxEvent).values(available_at=utcnow()))
+    await outbox.publish_pending(db_session, FailingBroker())
+
+    assert await _count(db_session, OutboxEvent) == 0
+    [dead_letter, *_] = (await db_session.scalars(select(DeadLetter))).all()
+    assert (dead_letter.attempts, dead_letter.error) == (
+        2, "ConnectionError('broker unavailable')"
+    )
+
+
+@pytest.mark.anyio
+async def test_replay_republishes_events_and_dead_letters(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, 'OUTBOX_MAX_ATTEMPTS', 1)
+    await _ingest(db_session)
+    await db_session.commit()
+    await outbox.publish_pending(db_session, FileBroker(str(tmp_path / 'events.jsonl')), limit=2)
+    await outbox.publish_pending(db_session, FailingBroker())
+
+    now = utcnow()
+    params = {'start': (now - timedelta(hours=1)).isoformat(), 'end': now.isoformat()}
+    response = client.post('/events/replay', params=params)
+
+    assert response.status_code == 200
+    assert response.json() == {'replayed': 2, 'dead_letters': 2}
+    assert await outbox.publish_pending(db_session, FileBroker(str(tmp_path / 'replayed.jsonl'))) == 4
+    assert client.post('/events/replay', params={**params, 'end': params['start']}).status_code == 400
+
+
+def test_build_broker(tmp_path):
+    assert isinstance(build_broker('redis://localhost:6379'), RedisStreamBroker)
+    assert build_broker(f'file://{tmp_path}/events.jsonl').path == f'{tmp_path}/events.jsonl'
+    assert isinstance(build_broker('tests.test_outbox:FailingBroker'), FailingBroker)
+
+
+async def _ingest(db_session):
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        await ingest_claims(db_session, io.BytesIO(f.read()))
+
+
+async def _count(db_session, model) -> int:
+    return await db_session.scalar(select(func.count()).select_from(model))
@@ -0,0 +1,48 @@
+import io
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from src.ingest import ingest_claims
+from src.partitions import (
+    create_future_partitions,
+    drop_partitions,
+    list_partitions,
+    next_month,
+    partition_month,
+    partition_name,
+)
+from src.repo import Claim
+
+CLAIMS = (
+    'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+    'provider fees,Allowed fees,member coinsurance,member copay\n'
+    '2/28/18 23:59,D0180,,GRP-1000,3730189502,1497775530,$100.00,$100.00,$0.00,$0.00\n'
+    '3/1/18 0:00,D0180,,GRP-1000,3730189502,1497775530,$100.00,$100.00,$0.00,$0.00\n'
+    '3/28/18 0:00,D0210,,GRP-1000,3730189502,1497775530,$100.00,$100.00,$0.00,$0.00\n'
+).encode()
+
+
+def test_partition_names():
+    assert partition_name(date(2018, 3, 28)) == 'claim_y2018m03'
+    assert partition_month('claim_y2018m03') == date(2018, 3, 1)
+    assert partition_month('claim_default') is None
+    assert next_month(date(2018, 12, 31)) == date(2019, 1, 1)
+
+
+@pytest.mark.anyio
+async def test_sqlite_claims_are_a_single_table(db_session):
+    assert await create_future_partitions(db_session) == []
+    assert await list_partitions(db_session) == []
+
+
+@pytest.mark.anyio
+async def test_retention_deletes_claims_before_the_month(db_session):
+    await ingest_claims(db_session, io.BytesIO(CLAIMS))
+
+    # NOTE: the cutoff is the first day of the month of `before`
+    assert await drop_partitions(db_session, before=date(2018, 3, 15)) == ([], 1)
+
+    service_dates = await db_session.scalars(select(Claim.service_date).order_by(Claim.service_date))
+    assert [value.date() for value in service_dates] == [date(2018, 3, 1), date(2018, 3, 28)]
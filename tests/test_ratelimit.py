@@ -0,0 +1,139 @@
+import freezegun
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from src.main import app
+from src.ratelimit import (
+    POLICIES,
+    ClientAllowance,
+    RateLimiter,
+    RatePolicy,
+    parse_client_policies,
+    parse_policies,
+    rate_limiter,
+)
+from src.repo import IngestBatch
+
+client = TestClient(app)
+
+PREFIX = 'claim-service:ratelimit'
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: fakeredis generates real uuids for its connections
+    yield
+
+
+@pytest.fixture
+def redis_connection():
+    return FakeAsyncRedis()
+
+
+def test_parse_policies():
+    policies = parse_policies('providers=6/60, claim_rows=100000/60, login=1/60, search=30/60/2')
+    clients = parse_client_policies('partner:a:claim_rows=1000/1')
+
+    assert [(p.name, p.limit, p.period, p.block) for p in policies.values()] == [
+        # NOTE: small limits are leased in blocks of RATE_LIMIT_MIN_LEASE, capped at the limit
+        ('providers', 6, 60, 5),
+        ('claim_rows', 100000, 60, 5000),
+        ('login', 1, 60, 1),
+        ('search', 30, 60, 2),
+    ]
+    assert clients[('partner:a', 'claim_rows')].limit == 1000
+
+    for value in ('6', '6/60/2/1'):
+        with pytest.raises(ValueError, match='expected <limit>/<period>'):
+            parse_policies(f'providers={value}')
+
+
+@pytest.mark.anyio
+@freezegun.freeze_time('2018-03-28T00:00:10')
+async def test_allowance_is_leased_in_blocks(redis_connection):
+    limiter = RateLimiter(redis_connection)
+    policy = RatePolicy('test', limit=100, period=60, block=10)
+
+    for _ in range(25):
+        assert await limiter.acquire(policy, 'client') == 0
+
+    # NOTE: 3 round trips to Redis for 25 requests
+    assert int(await redis_connection.get(f'{PREFIX}:test:client:25369920')) == 30
+
+
+@pytest.mark.anyio
+async def test_workers_share_the_limit(redis_connection):
+    workers = [RateLimiter(redis_connection), RateLimiter(redis_connection)]
+    policy = RatePolicy('test', limit=10, period=60, block=4)
+
+    with freezegun.freeze_time('2018-03-28T00:00:10') as frozen:
+        allowed = [await workers[i % 2].acquire(policy, 'client') == 0 for i in range(12)]
+        assert allowed.count(True) == 10
+
+        retry_after = await workers[0].acquire(policy, 'client')
+        assert retry_after == 50
+        assert int(await redis_connection.get(f'{PREFIX}:test:client:25369920')) == 16
+
+        # NOTE: rejections are decided locally for the rest of the window
+        await workers[0].acquire(policy, 'client')
+        assert int(await redis_connection.get(f'{PREFIX}:test:client:25369920')) == 16
+
+        frozen.tick(50)
+        assert await workers[0].acquire(policy, 'client') == 0
+        assert await workers[0].acquire(policy, 'other') == 0
+
+
+@pytest.mark.anyio
+@freezegun.freeze_time('2018-03-28T00:00:10')
+async def test_allowance_is_spent_as_it_is_used(redis_connection):
+    limiter = RateLimiter(redis_connection)
+    allowance = ClientAllowance(limiter, RatePolicy('rows', limit=100, period=60), 'client')
+
+    # NOTE: the unit taken for the request is the first one spent
+    assert await limiter.acquire(allowance.policy, 'client') == 0
+    await allowance.spend(1)
+    await allowance.spend(99)
+
+    with pytest.raises(HTTPException) as error:
+        await allowance.spend(1)
+    assert error.value.status_code == 429
+    assert error.value.headers['Retry-After'] == '50'
+
+
+@pytest.mark.anyio
+async def test_redis_failures_allow_requests():
+    server = FakeServer()
+    server.connected = False
+    limiter = RateLimiter(FakeAsyncRedis(server=server))
+
+    assert await limiter.acquire(RatePolicy('test', limit=1, period=60), 'client') == 0
+
+
+@freezegun.freeze_time('2018-03-28T00:00:10')
+def test_post_claims_is_limited_by_rows(redis_connection, monkeypatch, sync_engine):
+    monkeypatch.setattr(rate_limiter, 'redis', redis_connection)
+    monkeypatch.setattr(rate_limiter, '_buckets', {})
+    monkeypatch.setitem(POLICIES, 'claim_rows', RatePolicy('claim_rows', limit=6, period=60))
+
+    def upload(key):
+        with open('./resources/claim_1234.csv', 'rb') as f:
+            return client.post(
+                '/claims',
+                files={'csv_file': ('claim_1234.csv', f, 'text/csv')},
+                # NOTE: distinct keys, so the uploads aren't replays of the first
+                headers={'X-Client-Id': 'clearinghouse', 'Idempotency-Key': key},
+            )
+
+    assert upload('1').status_code == 200
+
+    # NOTE: 4 of 6 rows were used; this upload goes over the allowance part way
+    response = upload('2')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '50'
+
+    # NOTE: the rejected upload is rolled back, so it can be retried as is
+    with sync_engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(IngestBatch)) == 1
@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+
+from src.repo import Claim, ProviderStats
+from src.responses import CLAIM_COLUMNS, claim_rows, dumps, provider_rows
+from src.stats import top_providers
+
+CLAIM = {
+    'id': 'a',
+    'allowed_fees': 10000,
+    'member_coinsurance': 0,
+    'member_copay': 0,
+    'net_fee': 1050,
+    'plan_group': 'GRP-1000',
+    'provider_fees': 11050,
+    'provider_npi': '1497775530',
+    'quadrant': None,
+    'service_date': datetime(2018, 3, 28, 16, 12),
+    'submitted_procedure': 'D0180',
+    'subscriber_number': '3730189502',
+    'fingerprint': 'f' * 64,
+}
+
+
+def test_dumps_encodes_decimals_and_datetimes_like_jsonable_encoder():
+    content = {'net_fee': Decimal('10.50'), 'service_date': datetime(2018, 3, 28, 16, 12, 5, 1)}
+
+    assert json.loads(dumps(content)) == jsonable_encoder(content)
+
+
+@pytest.mark.anyio
+async def test_claim_rows_match_the_orm_response_shape(db_session):
+    await db_session.execute(insert(Claim), [CLAIM])
+
+    [claim] = (await db_session.scalars(select(Claim))).all()
+    [row] = claim_rows((await db_session.execute(select(*CLAIM_COLUMNS))).all())
+
+    assert json.loads(dumps([row])) == jsonable_encoder([claim.dict()])
+    assert row['net_fee'] == 10.5 and isinstance(row['net_fee'], float)
+    assert 'fingerprint' not in row
+
+
+@pytest.mark.anyio
+async def test_provider_rows_round_the_average_in_cents(db_session):
+    await db_session.execute(
+        insert(ProviderStats),
+        [{'provider_npi': '1497775530', 'claim_count': 2, 'total_net_fee': 5}],
+    )
+
+    assert provider_rows(await top_providers(db_session, limit=10)) == [
+        {
+            'provider_npi': '1497775530',
+            'total_net_fee': 0.05,
+            'claim_count': 2,
+            'average_net_fee': 0.02,
+        }
+    ]
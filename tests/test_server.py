@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+from src.db import MIGRATIONS_DIRECTORY
+from src.server import build_parser, prepare
+
+
+def test_parser_defaults():
+    arguments = build_parser().parse_args([])
+
+    assert arguments.workers >= 1
+    assert arguments.port == 8000
+    assert arguments.graceful_timeout == 30
+
+
+@pytest.mark.anyio
+async def test_prepare_rejects_unmigrated_database(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'empty.db'}")
+
+    with pytest.raises(RuntimeError, match='alembic upgrade head'):
+        await prepare()
+
+
+def test_prepare_migrated_database(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIRECTORY)
+    config.set_main_option('sqlalchemy.url', url)
+    monkeypatch.setenv('DATABASE_URL', url)
+    command.upgrade(config, 'head')
+
+    asyncio.run(prepare())
@@ -0,0 +1,34 @@
+import io
+
+import pytest
+from sqlalchemy import update
+
+from src.ingest import ingest_claims
+from src.repo import ProviderStats
+from src.stats import provider_stats_drift, rebuild_provider_stats, top_providers
+
+
+@pytest.mark.anyio
+async def test_ingest_maintains_provider_stats(db_session):
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        await ingest_claims(db_session, io.BytesIO(f.read()), batch_size=3)
+
+    [provider] = await top_providers(db_session, limit=10)
+
+    assert provider.provider_npi == '1497775530'
+    assert provider.claim_count == 4
+    assert provider.total_net_fee == 11685
+    assert await provider_stats_drift(db_session) == []
+
+
+@pytest.mark.anyio
+async def test_rebuild_provider_stats_repairs_drift(db_session):
+    with open('./resources/claim_1234.csv', 'rb') as f:
+        await ingest_claims(db_session, io.BytesIO(f.read()))
+    await db_session.execute(update(ProviderStats).values(claim_count=1))
+
+    [drifted] = await provider_stats_drift(db_session)
+    await rebuild_provider_stats(db_session)
+
+    assert (drifted['claim_count'], drifted['expected_claim_count']) == (1, 4)
+    assert await provider_stats_drift(db_session) == []
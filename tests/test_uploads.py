@@ -0,0 +1,149 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.uploads import CSV, GZIP, ZIP, iter_csv_files, upload_format
+
+client = TestClient(app)
+
+HEADER = (
+    b'service date,submitted procedure,quadrant,Plan/Group #,Subscriber#,Provider NPI,'
+    b'provider fees,Allowed fees,member coinsurance,member copay\n'
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    yield
+
+
+def _csv(*procedures: str, npi: str = '1497775530') -> bytes:
+    return HEADER + b''.join(
+        f'3/28/18 0:00,{procedure},,GRP-1000,3730189502,{npi},$100.00,$90.00,$0.00,$0.00\n'.encode()
+        for procedure in procedures
+    )
+
+
+def _zip(members: dict) -> bytes:
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return content.getvalue()
+
+
+@pytest.mark.parametrize(
+    'content, filename, content_type, expected',
+    [
+        (b'a,b\n', 'claims.csv', 'text/csv', CSV),
+        (b'a,b\n', 'claims.csv', 'application/octet-stream', CSV),
+        (gzip.compress(b'a,b\n'), 'claims.csv.gz', 'application/octet-stream', GZIP),
+        (_zip({'claims.csv': b'a,b\n'}), 'claims.zip', 'application/zip', ZIP),
+        (b'not a csv', 'claims.txt', 'text/plain', None),
+    ],
+)
+def test_upload_format(content, filename, content_type, expected):
+    file = io.BytesIO(content)
+
+    assert upload_format(file, filename, content_type) == expected
+    assert file.tell() == 0
+
+
+def test_zip_members_are_streamed_one_at_a_time():
+    archive = _zip(
+        {
+            'b/claims.csv': b'b',
+            'a.csv': b'a',
+            'readme.txt': b'skipped',
+            '__MACOSX/._a.csv': b'skipped',
+        }
+    )
+
+    files = iter_csv_files(io.BytesIO(archive), 'bundle.zip', ZIP)
+    name, stream = next(files)
+    assert (name, stream.read()) == ('bundle.zip/b/claims.csv', b'b')
+
+    name, next_stream = next(files)
+    assert stream.closed
+    assert (name, next_stream.read()) == ('bundle.zip/a.csv', b'a')
+    assert next(files, None) is None
+
+
+def test_post_gzip_csv():
+    content = gzip.compress(_csv('D0180', 'D0210'))
+
+    response = client.post(
+        '/claims', files={'csv_file': ('claims.csv.gz', content, 'application/gzip')}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['rows'], body['inserted']) == (2, 2)
+    assert [file['file'] for file in body['files']] == ['claims.csv.gz']
+
+
+def test_post_zip_and_multiple_files():
+    archive = _zip(
+        {
+            'provider-1.csv': _csv('D0180', 'D0210'),
+            'provider-2.csv': _csv('D0180', 'X0000', npi='1234567893'),
+        }
+    )
+
+    response = client.post(
+        '/claims',
+        files=[
+            ('csv_file', ('bundle.zip', archive, 'application/zip')),
+            ('csv_file', ('more.csv', _csv('D4346'), 'text/csv')),
+        ],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['rows'], body['inserted'], body['failed']) == (5, 4, 1)
+    assert [(file['file'], file['rows'], file['failed']) for file in body['files']] == [
+        ('bundle.zip/provider-1.csv', 2, 0),
+        ('bundle.zip/provider-2.csv', 2, 1),
+        ('more.csv', 1, 0),
+    ]
+    assert [error['row'] for error in body['files'][1]['errors']] == [2]
+    assert [error['row'] for error in body['errors']] == [2]
+
+
+@pytest.mark.parametrize(
+    'filename, content, detail',
+    [
+        ('claims.csv.gz', gzip.compress(_csv('D0180'))[:-8], 'Error decompressing CSV file'),
+        ('claims.zip', _zip({'readme.txt': b'no claims'}), 'contains no CSV files'),
+        ('claims.zip', b'PK\x03\x04 truncated', 'not a valid zip archive'),
+    ],
+)
+def test_malformed_archive_is_rejected(filename, content, detail):
+    response = client.post(
+        '/claims',
+        files=[
+            ('csv_file', ('first.csv', _csv('D0180'), 'text/csv')),
+            ('csv_file', (filename, content, 'application/octet-stream')),
+        ],
+    )
+
+    assert response.status_code == 400
+    assert detail in response.json()['detail']
+    # NOTE: the upload is committed as a whole, so the valid file isn't kept either
+    assert client.get('/claims').json()['claims'] == []
+
+
+def test_unsupported_file_in_upload_is_rejected():
+    response = client.post(
+        '/claims',
+        files=[
+            ('csv_file', ('claims.csv', _csv('D0180'), 'text/csv')),
+            ('csv_file', ('claims.xlsx', b'not a csv', 'application/vnd.ms-excel')),
+        ],
+    )
+
+    assert response.status_code == 400
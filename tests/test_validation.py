@@ -0,0 +1,91 @@
+import pytest
+
+from src.ingest import validate_claims
+from src.validation import validate_claim_columns
+
+VALID_ROW = {
+    'service date': '3/28/18 0:00',
+    'submitted procedure': 'D4346',
+    'quadrant': '',
+    'Plan/Group #': 'GRP-1000',
+    'Subscriber#': '3730189502',
+    'Provider NPI': '1497775530',
+    'provider fees': '$130.00 ',
+    'Allowed fees': '$65.00 ',
+    'member coinsurance': '$16.25 ',
+    'member copay': '$0.00 ',
+}
+
+
+@pytest.fixture(autouse=True)
+def mock_uuid4():
+    # NOTE: ids are compared separately; let both paths generate as many as they need
+    yield
+
+
+@pytest.mark.parametrize(
+    'overrides',
+    [
+        {},
+        {'quadrant': 'UR', 'Provider NPI': ' 1497775530 '},
+        {'quadrant': None},
+        {'Provider NPI': '12345'},
+        {'Provider NPI': '0149777553'},
+        {'Provider NPI': 'abc'},
+        {'Provider NPI': None},
+        {'provider fees': 'abc'},
+        {'Allowed fees': '-$1.00'},
+        {'member copay': 'nan'},
+        {'member coinsurance': None},
+        {'service date': 'invalid_date'},
+        {'service date': None},
+        {'submitted procedure': 'X12345'},
+        {'Subscriber#': None},
+        {'Plan/Group #': None, 'submitted procedure': 'X1', 'provider fees': '$-5'},
+    ],
+)
+def test_vectorized_validation_matches_claim_model(overrides):
+    rows = [(1, VALID_ROW), (2, {**VALID_ROW, **overrides}), (3, VALID_ROW)]
+
+    expected_records, expected_errors = validate_claims(rows)
+    records, errors = validate_claim_columns(rows)
+
+    assert errors == expected_errors
+    assert _without_ids(records) == _without_ids(expected_records)
+
+
+@pytest.mark.parametrize('validate', [validate_claims, validate_claim_columns])
+@pytest.mark.parametrize(
+    'amount, cents',
+    [('$1,000.00', None), ('$100.005', 10001), ('-$1.00', None), ('1e2', 10000)],
+)
+def test_single_row_batch_with_an_amount_that_is_not_plain(validate, amount, cents):
+    records, errors = validate([(1, {**VALID_ROW, 'provider fees': amount})])
+
+    if cents is None:
+        assert records == [] and [error.field for error in errors] == ['provider fees']
+    else:
+        assert [record['provider_fees'] for record in records] == [cents] and errors == []
+
+
+@pytest.mark.parametrize('validate', [validate_claims, validate_claim_columns])
+def test_blank_column_is_reported_per_row(validate):
+    rows = [(1, {**VALID_ROW, 'member copay': ''}), (2, {**VALID_ROW, 'member copay': ' $ '})]
+
+    records, errors = validate(rows)
+
+    assert records == []
+    assert [(error.row, error.field) for error in errors] == [
+        (1, 'member copay'),
+        (2, 'member copay'),
+    ]
+
+
+def test_vectorized_validation_reports_missing_columns():
+    row = {key: value for key, value in VALID_ROW.items() if key != 'Plan/Group #'}
+
+    assert validate_claim_columns([(1, row)]) == validate_claims([(1, row)])
+
+
+def _without_ids(records):
+    return [{key: value for key, value in record.items() if key != 'id'} for record in records]